@@ -1,10 +1,15 @@
 from flask import Flask, render_template, session, redirect
-from pymongo import MongoClient
+from app.utils.mongo_connection import get_client
+from app.utils.indexes import ensure_indexes
+from app.utils.store_registry import store_registry
+from app.utils.json_provider import FastJSONProvider
+from app.utils.compression import init_compression
 from config import (
     SECRET_KEY, 
     MONGODB_CONNECTION_STRING, 
     MONGODB_DATABASE_NAME, 
-    MONGO_AUTH_DATABASE
+    MONGO_AUTH_DATABASE,
+    MONGO_ENSURE_INDEXES_ON_STARTUP
 )
 
 def create_app():
@@ -15,11 +20,35 @@ def create_app():
     )
     app.secret_key = SECRET_KEY
 
-    # Setup DB dulu
-    client = MongoClient(MONGODB_CONNECTION_STRING)
+    # Encoder JSON satu pass (ObjectId, datetime, Decimal128)
+    app.json = FastJSONProvider(app)
+
+    # Kompresi gzip/brotli untuk response JSON & ekspor
+    init_compression(app)
+
+    # Setup DB dulu (client bersama dengan SessionManager)
+    client = get_client(MONGODB_CONNECTION_STRING)
     app.db = client[MONGODB_DATABASE_NAME]
     app.auth_db = client[MONGO_AUTH_DATABASE]
 
+    # Bootstrap index sekali saat startup (bukan di setiap request)
+    if MONGO_ENSURE_INDEXES_ON_STARTUP:
+        try:
+            report = ensure_indexes(app.db, app.auth_db)
+            if report["conflict"]:
+                print(f"[Indexes] Drift terdeteksi: {report['conflict']}")
+        except Exception as e:
+            print(f"[Indexes] Gagal membuat index: {e}")
+
+    # Registry toko dimuat sekali; selanjutnya di-refresh berkala
+    try:
+        store_registry.load(app.db)
+    except Exception as e:
+        print(f"[StoreRegistry] Gagal memuat toko saat startup: {e}")
+
+    from app.cli import db_cli
+    app.cli.add_command(db_cli)
+
     from app.routes import (
         auth_routes,
         inventory_routes,
@@ -28,6 +57,7 @@ def create_app():
         sales_routes,
         karyawan_routes,
         dashboard_routes,
+        export_routes,
         landingpage
     )
 
@@ -38,6 +68,7 @@ def create_app():
     app.register_blueprint(inventory_out_routes.inventory_out_bp)
     app.register_blueprint(sales_routes.sales_bp)
     app.register_blueprint(karyawan_routes.karyawan_bp)
+    app.register_blueprint(export_routes.export_bp)
     app.register_blueprint(landingpage.landingpage_bp)
 
     @app.route("/")
@@ -0,0 +1,306 @@
+"""
+cli.py
+=====================================================
+Perintah CLI Flask untuk Pemeliharaan Database
+=====================================================
+
+Contoh penggunaan:
+
+    flask --app run db ensure-indexes
+    flask --app run db check-indexes
+    flask --app run db seed-sku-counter
+    flask --app run db backfill-stock-state
+    flask --app run db backfill-search-keys
+    flask --app run db backfill-sales-store
+    flask --app run db import-products data/toko_baru.csv
+    flask --app run db stress-stock --stock 100 --sales 500 --workers 64
+    flask --app run db bench-transactions --ops 1000
+    flask --app run db bench-json --docs 50000
+=====================================================
+"""
+
+import click
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from bson import ObjectId
+from flask import current_app
+from flask.cli import AppGroup
+from flask.json.provider import DefaultJSONProvider
+
+from app.utils.indexes import ensure_indexes, check_indexes
+from app.utils.json_provider import FastJSONProvider
+from app.utils.sku_allocator import seed_sku_counter
+from app.utils.stock_state import backfill_stock_state
+from app.utils.search_keys import backfill_search_keys, find_duplicate_names
+from app.utils.product_import import detect_format, import_products, iter_rows
+from app.utils.stock_service import adjust_stock, InsufficientStock
+from app.utils.transactions import run_movement
+from config import IMPORT_CHUNK_SIZE
+
+
+db_cli = AppGroup("db", help="Pemeliharaan database MongoDB.")
+
+
+def _print_report(report):
+    for key, items in report.items():
+        click.echo(f"{key}: {len(items)}")
+        for item in items:
+            click.echo(f"  - {item}")
+
+
+@db_cli.command("ensure-indexes")
+def ensure_indexes_command():
+    """Membuat index yang terdaftar di registry (idempotent)."""
+    report = ensure_indexes(current_app.db, current_app.auth_db)
+    _print_report(report)
+
+
+@db_cli.command("check-indexes")
+def check_indexes_command():
+    """Melaporkan drift antara registry dan index di database."""
+    report = check_indexes(current_app.db, current_app.auth_db)
+    _print_report(report)
+    if report["missing"] or report["conflict"]:
+        raise SystemExit(1)
+
+
+@db_cli.command("seed-sku-counter")
+def seed_sku_counter_command():
+    """Menyamakan counter SKU dengan SKU terbesar yang sudah ada."""
+    seq = seed_sku_counter(current_app.db)
+    click.echo(f"Counter SKU sekarang: {seq}")
+
+
+@db_cli.command("backfill-stock-state")
+def backfill_stock_state_command():
+    """Mengisi field stock_state untuk seluruh produk."""
+    modified = backfill_stock_state(current_app.db)
+    click.echo(f"stock_state diperbarui: {modified} produk")
+
+
+@db_cli.command("backfill-search-keys")
+def backfill_search_keys_command():
+    """
+    Mengisi field kunci pencarian (name_key, supplier_key) pada data lama,
+    lalu melaporkan nama produk ganda per toko yang menghalangi unique index
+    (store_id, name_key). Jalankan `ensure-indexes` setelah data bersih.
+    """
+    db = current_app.db
+    for collection, count in backfill_search_keys(db).items():
+        click.echo(f"{collection}: {count} dokumen diperbarui")
+
+    duplicates = find_duplicate_names(db)
+    click.echo(f"Nama produk ganda: {len(duplicates)}")
+    for d in duplicates:
+        click.echo(f"  - {d['store_id']} / '{d['name_key']}': {', '.join(map(str, d['skus']))}")
+    if duplicates:
+        raise SystemExit(1)
+
+
+@db_cli.command("backfill-sales-store")
+def backfill_sales_store_command():
+    """
+    Menyamakan store_id/store_name transaksi penjualan lama dengan produknya
+    (dibutuhkan filter toko di /api/sales).
+    """
+    db = current_app.db
+    db["sales"].aggregate([
+        {"$lookup": {
+            "from": "master_product",
+            "localField": "product_id",
+            "foreignField": "_id",
+            "as": "product",
+        }},
+        {"$unwind": "$product"},
+        {"$match": {"$expr": {"$ne": ["$store_id", "$product.store_id"]}}},
+        {"$project": {"store_id": "$product.store_id", "store_name": "$product.store_name"}},
+        {"$merge": {"into": "sales", "on": "_id", "whenMatched": "merge", "whenNotMatched": "discard"}},
+    ])
+    missing = db["sales"].count_documents({"store_id": {"$in": [None, ""]}})
+    click.echo(f"Selesai. Transaksi tanpa toko (produk sudah dihapus): {missing}")
+
+
+@db_cli.command("import-products")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", default=None, help="csv | ndjson (default dari ekstensi file).")
+@click.option("--chunk-size", default=IMPORT_CHUNK_SIZE, show_default=True, help="Baris per bulk_write.")
+def import_products_command(path, fmt, chunk_size):
+    """
+    Impor massal barang masuk dari file CSV / NDJSON (streaming).
+    Keluar dengan kode 1 jika ada baris yang gagal.
+    """
+    try:
+        fmt = detect_format(fmt, path)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+    start = time.perf_counter()
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        report = import_products(current_app.db, iter_rows(f, fmt), chunk_size)
+    elapsed = time.perf_counter() - start
+
+    click.echo(f"Baris dibaca      : {report.rows}")
+    click.echo(f"Baris masuk       : {report.imported} ({report.imported / max(elapsed, 1e-9):.0f} baris/detik)")
+    click.echo(f"Produk baru       : {report.created}")
+    click.echo(f"Produk di-restock : {report.restocked}")
+    click.echo(f"Baris gagal       : {report.error_count}")
+    for err in report.errors:
+        click.echo(f"  - baris {err['row']}: {err['error']}")
+    click.echo(f"Waktu             : {elapsed:.2f} detik")
+    if report.error_count:
+        raise SystemExit(1)
+
+
+@db_cli.command("stress-stock")
+@click.option("--stock", default=100, show_default=True, help="Stok awal produk uji.")
+@click.option("--sales", default=500, show_default=True, help="Jumlah penjualan paralel.")
+@click.option("--qty", default=1, show_default=True, help="Jumlah unit per penjualan.")
+@click.option("--workers", default=64, show_default=True, help="Jumlah thread paralel.")
+def stress_stock_command(stock, sales, qty, workers):
+    """
+    Uji konkurensi adjust_stock: ratusan penjualan paralel pada satu produk
+    di database terpisah (<db>_stress). Gagal jika stok pernah negatif
+    atau jumlah penjualan sukses tidak sesuai stok awal.
+    """
+    client = current_app.db.client
+    stress_db = client[f"{current_app.db.name}_stress"]
+    sku = "SKU-000"
+    stress_db["master_product"].delete_one({"_id": sku})
+    stress_db["master_product"].insert_one(
+        {"_id": sku, "name": "Stress Test", "stock": stock, "min_stock": 0}
+    )
+
+    def sell(_):
+        try:
+            adjust_stock(stress_db, sku, -qty)
+            return True
+        except InsufficientStock:
+            return False
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            succeeded = sum(executor.map(sell, range(sales)))
+        final_stock = stress_db["master_product"].find_one({"_id": sku})["stock"]
+    finally:
+        client.drop_database(stress_db.name)
+
+    expected = min(sales, stock // qty)
+    click.echo(f"Penjualan sukses : {succeeded} (harapan {expected})")
+    click.echo(f"Penjualan ditolak: {sales - succeeded}")
+    click.echo(f"Stok akhir       : {final_stock} (harapan {stock - expected * qty})")
+
+    if final_stock < 0 or succeeded != expected or final_stock != stock - expected * qty:
+        click.echo("GAGAL: terjadi lost update / overselling")
+        raise SystemExit(1)
+    click.echo("OK: stok tidak pernah negatif")
+
+
+@db_cli.command("bench-transactions")
+@click.option("--ops", default=500, show_default=True, help="Jumlah pergerakan per mode.")
+@click.option("--workers", default=1, show_default=True, help="Jumlah thread paralel.")
+def bench_transactions_command(ops, workers):
+    """
+    Bandingkan latensi pergerakan barang (stok + riwayat) dengan dan tanpa
+    transaksi di database terpisah (<db>_bench). Butuh replica set, contoh
+    single-node lokal: `mongod --replSet rs0` lalu `rs.initiate()`.
+    """
+    client = current_app.db.client
+    bench_db = client[f"{current_app.db.name}_bench"]
+    sku = "SKU-000"
+
+    def movement(session):
+        change = adjust_stock(bench_db, sku, -1, session=session)
+        bench_db["sales"].insert_one(
+            {"product_id": sku, "quantity": 1, "stock_after": change.stock_after,
+             "created_at": datetime.now()},
+            session=session,
+        )
+
+    def run_mode(transactional):
+        client.drop_database(bench_db.name)
+        bench_db["master_product"].insert_one(
+            {"_id": sku, "name": "Bench", "stock": ops, "min_stock": 0}
+        )
+        bench_db["sales"].insert_one({"_id": "warmup"})  # koleksi harus ada sebelum transaksi
+
+        def timed(_):
+            start = time.perf_counter()
+            run_movement(bench_db, movement, transactional=transactional)
+            return (time.perf_counter() - start) * 1000
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            latencies = sorted(executor.map(timed, range(ops)))
+
+        stock = bench_db["master_product"].find_one({"_id": sku})["stock"]
+        ledger = bench_db["sales"].count_documents({"product_id": sku})
+        return latencies, stock, ledger
+
+    if not client.admin.command("hello").get("setName"):
+        click.echo("GAGAL: transaksi butuh replica set (mongod --replSet rs0 + rs.initiate())")
+        raise SystemExit(1)
+
+    try:
+        for label, transactional in (("tanpa transaksi", False), ("dengan transaksi", True)):
+            latencies, stock, ledger = run_mode(transactional)
+            p50 = latencies[len(latencies) // 2]
+            p95 = latencies[int(len(latencies) * 0.95) - 1]
+            click.echo(
+                f"{label:<17}: p50 {p50:.2f} ms | p95 {p95:.2f} ms | "
+                f"stok akhir {stock} | riwayat {ledger}"
+            )
+    finally:
+        client.drop_database(bench_db.name)
+
+
+@db_cli.command("bench-json")
+@click.option("--docs", default=50000, show_default=True, help="Jumlah dokumen produk.")
+@click.option("--rounds", default=5, show_default=True, help="Jumlah pengulangan (diambil median).")
+def bench_json_command(docs, rounds):
+    """
+    Bandingkan waktu serialisasi daftar dokumen: cara lama (loop per dokumen
+    `str(_id)` + `strftime` tanggal, lalu encoder bawaan Flask) dengan
+    FastJSONProvider (satu pass). Tidak menyentuh database.
+    """
+    def make_docs():
+        base = datetime.now()
+        return [
+            {
+                "_id": ObjectId(), "name": f"Produk {i}", "name_key": f"produk {i}",
+                "category": "Lainnya", "stock": i % 100, "min_stock": 5, "stock_state": "ok",
+                "purchase_price": 12500.0, "sale_price": 15000, "supplier": "PT Maju",
+                "store_id": "S01", "store_name": "Toko Pusat", "city": "Bandung",
+                "location": "Gudang Utama",
+                "created_at": base - timedelta(minutes=i), "updated_at": base - timedelta(seconds=i),
+            }
+            for i in range(docs)
+        ]
+
+    def old_way(items):
+        # Loop konversi yang dulu ada di setiap route daftar
+        for p in items:
+            p["_id"] = str(p["_id"])
+            for field in ("created_at", "updated_at"):
+                if isinstance(p.get(field), datetime):
+                    p[field] = p[field].strftime("%Y-%m-%d %H:%M:%S")
+        return default_provider.dumps({"status": True, "data": items})
+
+    def new_way(items):
+        return fast_provider.dumps({"status": True, "data": items})
+
+    default_provider = DefaultJSONProvider(current_app)
+    fast_provider = FastJSONProvider(current_app)
+
+    results = {}
+    for label, encode in (("sebelum (loop + json)", old_way), ("sesudah (provider)", new_way)):
+        timings = []
+        for _ in range(rounds):
+            items = make_docs()
+            start = time.perf_counter()
+            body = encode(items)
+            timings.append((time.perf_counter() - start) * 1000)
+        results[label] = sorted(timings)[len(timings) // 2]
+        click.echo(f"{label:<22}: {results[label]:8.1f} ms | {len(body.encode()) / 1024:,.0f} KB")
+
+    before, after = results.values()
+    click.echo(f"Percepatan            : {before / max(after, 1e-9):.1f}x ({docs} dokumen)")
@@ -4,4 +4,5 @@ from .dashboard_routes import dashboard_bp
 from .inventory_routes import inventory_bp
 from .inventory_out_routes import inventory_out_bp
 from .karyawan_routes import karyawan_bp
-from .sales_routes import sales_bp
\ No newline at end of file
+from .sales_routes import sales_bp
+from .export_routes import export_bp
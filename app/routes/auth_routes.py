@@ -73,7 +73,6 @@ import re
 import secrets
 import smtplib
 from app.utils import SessionManager
-from config import MONGODB_COLLECTION_SESSIONS
 
 
 # ======================================================
@@ -357,8 +356,10 @@ def logout():
     username = session.get("username")
     sm = SessionManager()
 
+    if session.get("token"):
+        sm.remove_token(session["token"])
     if username:
-        sm.auth_mongo.delete(MONGODB_COLLECTION_SESSIONS, {"username": username}, multi=True)
+        sm.remove_user_tokens(username)
 
     session.clear()
     flash("Logout berhasil", "success")
@@ -15,6 +15,10 @@ Data yang ditampilkan mencakup:
 - Supplier summary & data barang masuk
 - Alert stok menipis / habis
 
+Seluruh widget dihitung sekaligus sebagai snapshot per toko
+(lihat `app/utils/dashboard_cache.py`) dan dihitung ulang hanya jika
+ada perubahan data atau snapshot sudah terlalu lama.
+
 Keamanan:
 - Hanya pengguna login yang dapat mengakses dashboard.
 
@@ -28,9 +32,16 @@ MongoDB Collections:
 =====================================================
 """
 
-from flask import Blueprint, jsonify, render_template, session, current_app, request
-from app.routes.auth_routes import check_login
+from flask import Blueprint, jsonify, render_template, session, current_app, request, Response, stream_with_context
+from app.routes.auth_routes import check_login, check_admin
+from app.utils import pool_stats
+from app.utils.dashboard_cache import get_snapshot, store_key, add_stale_listener, ALL_STORES
+from app.utils.dashboard_stream import DashboardStream
+from app.utils.stock_state import STATE_HABIS, STATE_MENIPIS, ALERT_STATES
 from bson.son import SON
+from concurrent.futures import ThreadPoolExecutor
+from app.utils.store_registry import store_registry
+from config import DASHBOARD_QUERY_WORKERS, STORES_CLIENT_MAX_AGE_SECONDS
 
 
 dashboard_bp = Blueprint("dashboard_bp", __name__)
@@ -53,6 +64,27 @@ def store_filter():
     return query
 
 
+def _to_long(expr):
+    """
+    Konversi field ke integer di dalam pipeline (setara `int(x or 0)`).
+    Nilai kosong menjadi 0, nilai yang gagal dikonversi menjadi null
+    sehingga diabaikan oleh `$sum`.
+    """
+    return {"$convert": {"input": expr, "to": "long", "onError": None, "onNull": 0}}
+
+
+def _list_stores(db):
+    """Daftar toko aktif dalam format dropdown (dari registry in-process)."""
+    return store_registry.active_stores(db)
+
+
+def _first(items):
+    """Ambil dokumen pertama hasil aggregate / facet, atau dict kosong."""
+    for item in items:
+        return item
+    return {}
+
+
 # ======================================================
 # Halaman Dashboard (HTML)
 # ======================================================
@@ -91,14 +123,14 @@ def get_all_stores():
 
     db = current_app.db
     try:
-        stores = list(
-            db["master_store"].find({"is_active": True}, {"_id": 1, "name": 1, "city": 1})
-        )
-        result = [
-            {"store_id": s["_id"], "name": s["name"], "city": s.get("city", "")}
-            for s in stores
-        ]
-        return jsonify(result), 200
+        etag = store_registry.etag(db)
+        if request.if_none_match.contains_weak(etag):
+            resp = current_app.response_class(status=304)
+        else:
+            resp = jsonify(_list_stores(db))
+        resp.set_etag(etag, weak=True)
+        resp.headers["Cache-Control"] = f"private, max-age={STORES_CLIENT_MAX_AGE_SECONDS}"
+        return resp
 
     except Exception as e:
         return jsonify({
@@ -109,87 +141,77 @@ def get_all_stores():
 
 
 # ======================================================
-# API: Ringkasan Dashboard
+# Perhitungan Widget (dipakai oleh snapshot)
 # ======================================================
-@dashboard_bp.route("/api/analytics/summary", methods=["GET"])
-def analytics_summary():
+def _compute_summary(db, query):
     """
-    Mengambil ringkasan analitik (summary) untuk dashboard.
-
-    Returns:
-        JSON:
-        - total_products
-        - total_stock
-        - total_sales
-        - total_revenue
-        - total_purchase_value
-        - total_sale_value
-        - total_supplier
-        - total_karyawan
+    Ringkasan analitik (summary) untuk dashboard.
+    Seluruh perhitungan dilakukan di MongoDB (aggregation pipeline),
+    satu pipeline per koleksi, sehingga waktu Python tetap konstan.
     """
-    db = current_app.db
-    query = store_filter()
+    total_karyawan = db["master_karyawan"].estimated_document_count()
 
-    total_products = db["master_product"].count_documents(query)
-    total_karyawan = db["master_karyawan"].count_documents({})
+    product_stats = _first(db["master_product"].aggregate([
+        {"$match": query},
+        {"$project": {
+            "stock": _to_long("$stock"),
+            "purchase_price": _to_long("$purchase_price"),
+            "sale_price": _to_long("$sale_price"),
+        }},
+        {"$group": {
+            "_id": None,
+            "total_products": {"$sum": 1},
+            "total_stock": {"$sum": "$stock"},
+            "total_purchase": {"$sum": {"$multiply": ["$stock", "$purchase_price"]}},
+            "total_sale": {"$sum": {"$multiply": ["$stock", "$sale_price"]}},
+        }},
+    ]))
 
-    products = db["master_product"].find(
-        query, {"stock": 1, "purchase_price": 1, "sale_price": 1}
-    )
+    sales_stats = _first(db["sales"].aggregate([
+        {"$match": query},
+        {"$group": {
+            "_id": None,
+            "total_sales": {"$sum": 1},
+            "total_revenue": {"$sum": "$total_price"},
+        }},
+    ]))
 
-    total_stock = total_purchase = total_sale = 0
-    for p in products:
-        stock = int(p.get("stock", 0))
-        total_stock += stock
-        total_purchase += stock * int(p.get("purchase_price", 0))
-        total_sale += stock * int(p.get("sale_price", 0))
-
-    total_sale_stock = 0
-    for p in products:
-        stock = int(p.get("stock", 0))
-        purchase_price = int(p.get("purchase_price", 0))
-        sale_price = int(p.get("sale_price", 0))
-
-        total_stock += stock
-        total_purchase += stock * purchase_price
-        total_sale += stock * sale_price  
-
-    total_sale_stock = total_sale   
-    
-    total_sales = db["sales"].count_documents(query)
-    total_revenue = sum(
-        s.get("total_price", 0) for s in db["sales"].find(query, {"total_price": 1})
-    )
+    supplier_stats = _first(db["master_supplier"].aggregate([
+        {"$match": query},
+        {"$facet": {
+            "suppliers": [
+                {"$match": {"supplier": {"$exists": True}}},
+                {"$group": {"_id": "$supplier"}},
+                {"$count": "total"},
+            ],
+            "value": [
+                {"$group": {
+                    "_id": None,
+                    "total": {"$sum": {"$multiply": [_to_long("$jumlah"), _to_long("$purchase_price")]}},
+                }},
+            ],
+        }},
+    ]))
 
-    supplier_names = db["master_supplier"].distinct("supplier", query)
-    total_supplier = len(supplier_names)
+    distribusi_stats = _first(db["master_supplier_out"].aggregate([
+        {"$match": {**query, "type": "penjualan"}},
+        {"$group": {"_id": None, "total": {"$sum": _to_long("$total_harga")}}},
+    ]))
 
-    supplier_docs = db["master_supplier"].find(
-        query, {"jumlah": 1, "purchase_price": 1}
-    )
+    total_products = product_stats.get("total_products", 0)
+    total_stock = product_stats.get("total_stock", 0)
+    total_purchase = product_stats.get("total_purchase", 0)
+    total_sale = product_stats.get("total_sale", 0)
+    total_sale_stock = total_sale
 
-    total_supplier_value = 0
-    for d in supplier_docs:
-        try:
-            qty = int(d.get("jumlah", 0) or 0)
-            price = int(d.get("purchase_price", 0) or 0)
-            total_supplier_value += qty * price
-        except (TypeError, ValueError):
-            continue
-
-    out_query = {**query, "type": "penjualan"}
-    distribusi_docs = db["master_supplier_out"].find(
-        out_query, {"total_harga": 1}
-    )
+    total_sales = sales_stats.get("total_sales", 0)
+    total_revenue = sales_stats.get("total_revenue", 0)
 
-    total_distribusi_value = 0
-    for d in distribusi_docs:
-        try:
-            total_distribusi_value += int(d.get("total_harga", 0) or 0)
-        except (TypeError, ValueError):
-            continue
+    total_supplier = _first(supplier_stats.get("suppliers", [])).get("total", 0)
+    total_supplier_value = _first(supplier_stats.get("value", [])).get("total", 0)
+    total_distribusi_value = distribusi_stats.get("total", 0)
 
-    return jsonify({
+    return {
         "total_products": total_products,
         "total_karyawan": total_karyawan,
         "total_stock": total_stock,
@@ -201,20 +223,11 @@ def analytics_summary():
         "total_supplier_value": total_supplier_value,   
         "total_distribusi_value": total_distribusi_value,
         "total_sale_stock": total_sale_stock
-    })
+    }
 
 
-# ======================================================
-# API: Penjualan Terbaru
-# ======================================================
-@dashboard_bp.route("/api/analytics/recent_sales", methods=["GET"])
-def recent_sales():
-    """
-    Mengambil 10 penjualan terakhir (terfilter toko jika ada).
-    """
-    db = current_app.db
-    query = store_filter()
-
+def _compute_recent_sales(db, query):
+    """10 penjualan terakhir (terfilter toko jika ada)."""
     result = (
         db["sales"]
         .find(query, {"_id": 0, "product_name": 1, "quantity": 1, "total_price": 1, "customer_name": 1, "created_at": 1})
@@ -222,7 +235,7 @@ def recent_sales():
         .limit(10)
     )
 
-    data = [{
+    return [{
         "product_name": r.get("product_name", "-"),
         "quantity": r.get("quantity", 0),
         "total_price": r.get("total_price", 0),
@@ -230,73 +243,43 @@ def recent_sales():
         "created_at": r.get("created_at").strftime("%Y-%m-%d") if r.get("created_at") else "-"
     } for r in result]
 
-    return jsonify(data)
-
-
-# ======================================================
-# API: Pie Chart - Kategori Produk
-# ======================================================
-@dashboard_bp.route("/api/analytics/category_pie", methods=["GET"])
-def category_pie():
-    """
-    Menghasilkan data pie chart kategori produk berdasarkan stok.
-    """
-    db = current_app.db
-    query = store_filter()
 
+def _compute_category_pie(db, query):
+    """Total stok per kategori produk."""
     pipeline = [
         {"$match": query},
         {"$group": {"_id": "$category", "total_stock": {"$sum": "$stock"}}},
         {"$sort": SON([("total_stock", -1)])}
     ]
 
-    return jsonify(list(db["master_product"].aggregate(pipeline)))
+    return list(db["master_product"].aggregate(pipeline))
 
 
-# ======================================================
-# API: Pie Chart - Status Stok
-# ======================================================
-@dashboard_bp.route("/api/analytics/stock_status", methods=["GET"])
-def stock_status():
-    """
-    Mengembalikan jumlah produk:
-    - habis (stock = 0)
-    - menipis (stock - min_stock <= 5)
-    - tersedia (sisanya)
-    """
-    db = current_app.db
-    query = store_filter()
-
-    total = db["master_product"].count_documents(query)
-
-    habis = db["master_product"].count_documents({**query, "stock": 0})
-
-    menipis = db["master_product"].count_documents({
-        **query,
-        "$expr": {"$lte": [{"$subtract": ["$stock", "$min_stock"]}, 5]}
-    })
+def _compute_stock_status(db, query):
+    """Jumlah produk habis, menipis, dan tersedia (berdasarkan `stock_state`)."""
+    counts = {
+        r["_id"]: r["count"]
+        for r in db["master_product"].aggregate([
+            {"$match": query},
+            {"$group": {"_id": "$stock_state", "count": {"$sum": 1}}},
+        ])
+    }
 
+    total = sum(counts.values())
+    habis = counts.get(STATE_HABIS, 0)
+    menipis = counts.get(STATE_MENIPIS, 0)
     tersedia = total - habis - menipis
 
-    return jsonify({
+    return {
         "habis": habis,
         "menipis": menipis,
         "tersedia": tersedia,
         "total": total
-    })
+    }
 
 
-# ======================================================
-# API: Supplier Summary
-# ======================================================
-@dashboard_bp.route("/api/analytics/supplier_summary", methods=["GET"])
-def supplier_summary():
-    """
-    Menampilkan total barang dan nilai pembelian per supplier.
-    """
-    db = current_app.db
-    query = store_filter()
-
+def _compute_supplier_summary(db, query):
+    """Total barang dan nilai pembelian per supplier."""
     pipeline = [
         {"$match": query},
         {"$group": {
@@ -309,7 +292,7 @@ def supplier_summary():
 
     result = list(db["master_supplier"].aggregate(pipeline))
 
-    return jsonify([
+    return [
         {
             "supplier_name": r["_id"]["supplier"],
             "store_name": r["_id"]["store"],
@@ -317,7 +300,199 @@ def supplier_summary():
             "total_value": r["total_value"]
         }
         for r in result
-    ])
+    ]
+
+
+def _compute_products_alert(db, query):
+    """Daftar produk dengan stok menipis atau habis (lookup ber-index `stock_state`)."""
+    result = list(db["master_product"].find(
+        {**query, "stock_state": {"$in": ALERT_STATES}},
+        {"_id": 1, "name": 1, "stock": 1, "min_stock": 1, "store_id": 1, "store_name" : 1}
+    ))
+    for r in result:
+        r["_id"] = str(r["_id"])
+
+    return result
+
+
+WIDGETS = {
+    "summary": _compute_summary,
+    "recent_sales": _compute_recent_sales,
+    "category_pie": _compute_category_pie,
+    "stock_status": _compute_stock_status,
+    "supplier_summary": _compute_supplier_summary,
+    "alert": _compute_products_alert,
+}
+
+
+# Query antar widget saling independen → dijalankan bersamaan.
+# Di bawah worker eventlet (monkey patch) thread ini menjadi green thread.
+_executor = ThreadPoolExecutor(max_workers=DASHBOARD_QUERY_WORKERS)
+
+
+def _build_snapshot(key):
+    """Hitung seluruh widget dashboard untuk satu toko (atau "all") secara paralel."""
+    db = current_app.db
+    query = {} if key == ALL_STORES else {"store_id": key}
+    futures = {name: _executor.submit(compute, db, query) for name, compute in WIDGETS.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+# Hub SSE: diberi tahu setiap kali route tulis memanggil mark_stale
+stream_hub = DashboardStream(_build_snapshot)
+add_stale_listener(stream_hub.publish)
+
+
+def widget_response(name):
+    """
+    Response JSON satu widget dari snapshot toko yang diminta.
+    Umur snapshot dikirim lewat header `X-Snapshot-Age` (detik)
+    dan `X-Snapshot-Generated-At` (epoch).
+    """
+    store_id = request.args.get("store_id", "all")
+    data, age, generated_at = get_snapshot(store_id, _build_snapshot)
+
+    resp = jsonify(data[name])
+    resp.headers["X-Snapshot-Age"] = str(age)
+    resp.headers["X-Snapshot-Generated-At"] = str(int(generated_at))
+    return resp
+
+
+# ======================================================
+# API: Seluruh Widget Dashboard (satu round trip)
+# ======================================================
+@dashboard_bp.route("/api/analytics/dashboard", methods=["GET"])
+def analytics_dashboard():
+    """
+    Mengambil seluruh data dashboard dalam satu response:
+    daftar toko, summary, penjualan terbaru, pie kategori, status stok,
+    supplier summary, dan alert stok.
+
+    Args:
+        store_id (str, optional): ID toko atau "all" (default).
+
+    Returns:
+        JSON: {store_id, stores, snapshot_age, generated_at, summary,
+               recent_sales, category_pie, stock_status, supplier_summary, alert}
+    """
+    auth = check_login(api=True)
+    if auth:
+        return auth
+
+    db = current_app.db
+    store_id = request.args.get("store_id", "all")
+    stores_future = _executor.submit(_list_stores, db)
+    data, age, generated_at = get_snapshot(store_id, _build_snapshot)
+
+    return jsonify({
+        "store_id": store_key(store_id),
+        "stores": stores_future.result(),
+        "snapshot_age": age,
+        "generated_at": int(generated_at),
+        **data,
+    })
+
+
+# ======================================================
+# API: Stream Dashboard (Server-Sent Events)
+# ======================================================
+@dashboard_bp.route("/api/analytics/stream", methods=["GET"])
+def analytics_stream():
+    """
+    Stream SSE perubahan dashboard untuk satu toko.
+
+    Event:
+        snapshot        : data lengkap (saat terhubung)
+        summary         : counter summary yang berubah
+        stock_status    : counter status stok yang berubah
+        recent_sales    : penjualan baru
+        alert           : {entered, left, changed} produk alert
+        category_pie, supplier_summary : data lengkap jika berubah
+
+    Args:
+        store_id (str, optional): ID toko atau "all" (default).
+    """
+    auth = check_login(api=True)
+    if auth:
+        return auth
+
+    app = current_app._get_current_object()
+    store_id = request.args.get("store_id", "all")
+
+    return Response(
+        stream_with_context(stream_hub.stream(app, store_id)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ======================================================
+# API: Ringkasan Dashboard
+# ======================================================
+@dashboard_bp.route("/api/analytics/summary", methods=["GET"])
+def analytics_summary():
+    """
+    Mengambil ringkasan analitik (summary) untuk dashboard.
+
+    Returns:
+        JSON:
+        - total_products
+        - total_stock
+        - total_sales
+        - total_revenue
+        - total_purchase_value
+        - total_sale_value
+        - total_supplier
+        - total_karyawan
+    """
+    return widget_response("summary")
+
+
+# ======================================================
+# API: Penjualan Terbaru
+# ======================================================
+@dashboard_bp.route("/api/analytics/recent_sales", methods=["GET"])
+def recent_sales():
+    """
+    Mengambil 10 penjualan terakhir (terfilter toko jika ada).
+    """
+    return widget_response("recent_sales")
+
+
+# ======================================================
+# API: Pie Chart - Kategori Produk
+# ======================================================
+@dashboard_bp.route("/api/analytics/category_pie", methods=["GET"])
+def category_pie():
+    """
+    Menghasilkan data pie chart kategori produk berdasarkan stok.
+    """
+    return widget_response("category_pie")
+
+
+# ======================================================
+# API: Pie Chart - Status Stok
+# ======================================================
+@dashboard_bp.route("/api/analytics/stock_status", methods=["GET"])
+def stock_status():
+    """
+    Mengembalikan jumlah produk:
+    - habis (stock = 0)
+    - menipis (stock - min_stock <= 5, tidak termasuk habis)
+    - tersedia (sisanya)
+    """
+    return widget_response("stock_status")
+
+
+# ======================================================
+# API: Supplier Summary
+# ======================================================
+@dashboard_bp.route("/api/analytics/supplier_summary", methods=["GET"])
+def supplier_summary():
+    """
+    Menampilkan total barang dan nilai pembelian per supplier.
+    """
+    return widget_response("supplier_summary")
 
 
 # ======================================================
@@ -350,22 +525,37 @@ def products_alert():
     Mengembalikan daftar produk dengan stok menipis atau habis.
     Ditampilkan di popup alert dashboard.
     """
-    db = current_app.db
-    query = store_filter()
+    return widget_response("alert")
 
-    pipeline = [
-        {"$match": {
-            **query,
-            "$or": [
-                {"$expr": {"$lte": [{"$subtract": ["$stock", "$min_stock"]}, 5]}},
-                {"stock": 0}
-            ]
-        }},
-        {"$project": {"_id": 1, "name": 1, "stock": 1, "min_stock": 1, "store_id": 1, "store_name" : 1}}
-    ]
 
-    result = list(db["master_product"].aggregate(pipeline))
-    for r in result:
-        r["_id"] = str(r["_id"])
+# ======================================================
+# API: Statistik Connection Pool MongoDB (Admin)
+# ======================================================
+@dashboard_bp.route("/api/system/mongo_pool", methods=["GET"])
+def mongo_pool_stats():
+    """
+    Menampilkan jumlah MongoClient & koneksi yang ada di worker ini.
+    Dipakai untuk memastikan tidak ada pembuatan koneksi baru per request.
+    """
+    auth = check_admin(api=True)
+    if auth:
+        return auth
+
+    return jsonify(pool_stats())
+
+
+# ======================================================
+# API: Muat Ulang Registry Toko (Admin)
+# ======================================================
+@dashboard_bp.route("/api/system/stores/reload", methods=["POST"])
+def reload_stores():
+    """
+    Memuat ulang registry toko di worker ini setelah `master_store` diubah.
+    Worker lain mengikuti paling lambat setelah STORE_REGISTRY_REFRESH_SECONDS.
+    """
+    auth = check_admin(api=True)
+    if auth:
+        return auth
 
-    return jsonify(result)
+    store_registry.load(current_app.db)
+    return jsonify({"status": True, "stores": len(_list_stores(current_app.db))})
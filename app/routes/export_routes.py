@@ -0,0 +1,96 @@
+"""
+export_routes.py
+=====================================================
+Modul Ekspor Data (CSV / NDJSON Streaming)
+=====================================================
+
+Deskripsi Umum
+-----------------------------------------------------
+Ekspor data untuk kebutuhan akuntansi tanpa membangun list di memori.
+Baris dibaca dari cursor MongoDB dan dikirim langsung sebagai file
+(lihat `app/utils/export_stream.py`).
+
+Dataset:
+- products         : Master produk (filter tanggal: created_at)
+- product_masuk    : Transaksi barang masuk (filter tanggal: tanggal)
+- products_keluar  : Transaksi barang keluar (filter tanggal: tanggal)
+- sales            : Transaksi penjualan POS (filter tanggal: created_at)
+
+=====================================================
+Keamanan:
+-----------------------------------------------------
+- Hanya pengguna login yang dapat mengekspor data.
+
+=====================================================
+"""
+
+from datetime import datetime
+from flask import Blueprint, request, current_app, Response, stream_with_context
+from app.routes.auth_routes import check_login
+from app.utils.export_stream import EXPORTS, FORMATS, export_query, stream_export
+from app.utils.pagination import parse_date_range
+from app.utils.validators import response
+
+
+# =====================================================
+# Inisialisasi Blueprint
+# =====================================================
+
+export_bp = Blueprint("export_bp", __name__)
+
+
+# =====================================================
+# ROUTES: EKSPOR DATASET
+# =====================================================
+
+@export_bp.route("/api/export/<dataset>", methods=["GET"])
+def export_dataset(dataset):
+    """
+    Unduh satu dataset sebagai file CSV / NDJSON (streaming).
+
+    Args:
+        dataset (str)            : products | product_masuk | products_keluar | sales.
+        format (str, optional)   : csv (default) | ndjson.
+        gzip (str, optional)     : "1" → file .gz.
+        store_id (str, optional) : ID toko atau "all".
+        from (str, optional)     : Tanggal awal (YYYY-MM-DD).
+        to (str, optional)       : Tanggal akhir inklusif (YYYY-MM-DD).
+        type (str, optional)     : Khusus products_keluar (penjualan, distribusi, ...).
+
+    Returns:
+        File attachment, contoh `sales_20250101.csv.gz`.
+    """
+    auth = check_login(api=True)
+    if auth:
+        return auth
+
+    if dataset not in EXPORTS:
+        return response(False, f"Dataset '{dataset}' tidak tersedia", code=404)
+
+    fmt = request.args.get("format", "csv").lower()
+    if fmt not in FORMATS:
+        return response(False, "Format ekspor harus csv atau ndjson", code=400)
+    compress = request.args.get("gzip") in ("1", "true")
+
+    try:
+        time_range = parse_date_range(request.args.get("from"), request.args.get("to"))
+    except ValueError as e:
+        return response(False, str(e), code=400)
+
+    extra = None
+    type_tx = (request.args.get("type") or "").strip().lower()
+    if dataset == "products_keluar" and type_tx and type_tx != "all":
+        extra = {"type": type_tx}
+
+    query = export_query(dataset, request.args.get("store_id"), time_range, extra)
+    filename = f"{dataset}_{datetime.now():%Y%m%d}.{fmt}" + (".gz" if compress else "")
+
+    return Response(
+        stream_with_context(stream_export(current_app.db, dataset, query, fmt, compress)),
+        mimetype="application/gzip" if compress else FORMATS[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+            "X-Accel-Buffering": "no",
+        },
+    )
@@ -41,9 +41,18 @@ Koleksi MongoDB yang Digunakan
 from flask import Blueprint, request, jsonify, session, current_app, render_template
 from datetime import datetime
 from bson import ObjectId
-import re
 from app.routes.auth_routes import check_admin, check_login
+from app.utils.dashboard_cache import mark_stale
+from app.utils.versions import bump_version, collection_etag, not_modified, with_etag
+from app.utils.stock_service import adjust_stock, ProductNotFound, StockConflict, StockError
+from app.utils.transactions import run_movement
 from app.utils.validators import sanitize, to_int, parse_float, response
+from app.utils.pagination import keyset_page, parse_date_range, parse_limit
+from app.utils.product_resolver import resolve_product
+from app.utils.search_keys import prefix_filter, search_fields
+from app.utils.store_registry import store_registry
+from pymongo import DESCENDING
+from config import HISTORY_PAGE_SIZE, HISTORY_PAGE_MAX
 
 
 # =====================================================
@@ -93,7 +102,7 @@ def get_all_products_out_dropdown():
         store_id (str, optional): ID toko untuk filter produk.
 
     Returns:
-        Response: JSON daftar produk:
+        Response: JSON daftar produk (mendukung ETag / If-None-Match → 304).
     """
     auth = check_login(api=True)
     if auth:
@@ -104,6 +113,11 @@ def get_all_products_out_dropdown():
     query = {"store_id": store_id} if store_id else {}
 
     try:
+        etag = collection_etag(db, "master_product", store_id)
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
         products = list(db["master_product"].find(
             query, {"_id": 1, "name": 1, "stock": 1, "purchase_price": 1, "store_id": 1, "store_name": 1}
         ))
@@ -119,7 +133,7 @@ def get_all_products_out_dropdown():
             }
             for p in products
         ]
-        return response(True, "Data produk berhasil diambil.", result, 200)
+        return with_etag(response(True, "Data produk berhasil diambil.", result, 200), etag)
 
     except Exception as e:
         return response(False, "Gagal mengambil produk", {"error":str(e)}, code=500)
@@ -132,30 +146,62 @@ def get_all_products_out_dropdown():
 @inventory_out_bp.route("/api/products_keluar", methods=["GET"])
 def get_inventory_out():
     """
-    Mengambil seluruh data transaksi barang keluar dari koleksi `master_supplier_out`.
+    Mengambil data transaksi barang keluar dari koleksi `master_supplier_out` per halaman.
 
     Endpoint ini digunakan untuk menampilkan daftar transaksi barang keluar,  
-    seperti nama produk, jumlah, tanggal, dan toko terkai
+    seperti nama produk, jumlah, tanggal, dan toko terkait. Data diurutkan
+    dari yang terbaru (`tanggal`, `_id`) dengan keyset pagination; kirim
+    `meta.next` sebagai `cursor` untuk halaman berikutnya. Filter `name`
+    mencocokkan awalan nama produk (tidak peka huruf besar) lewat field
+    ter-index `name_key`.
+
+    Args:
+        type (str, optional)     : Tipe transaksi (penjualan, distribusi, internal, rusak, expired).
+        store_id (str, optional) : ID toko.
+        name (str, optional)     : Awalan nama produk.
+        from (str, optional)     : Tanggal awal, format YYYY-MM-DD.
+        to (str, optional)       : Tanggal akhir (inklusif), format YYYY-MM-DD.
+        limit (int, optional)    : Jumlah data per halaman (default 50, maks 500).
+        cursor (str, optional)   : Cursor dari response sebelumnya.
 
     Returns:
         "status": true,
                 "message": "Data berhasil diambil",
+                "meta": {"next": "<cursor>" | null, "limit": 50}
     """
     auth = check_login(api=True)
     if auth:
         return auth
 
     try:
-        data = list(current_app.db["master_supplier_out"].find(
-            {"type": {"$ne": "restock"}}
-        ).sort("_id", -1))
+        type_tx = sanitize(request.args.get("type", "")).lower()
+        store_id = request.args.get("store_id")
+
+        query = {"type": type_tx} if type_tx else {"type": {"$ne": "restock"}}
+        if store_id and store_id != "all":
+            query["store_id"] = store_id
+        name = request.args.get("name")
+        if name:
+            query["name_key"] = prefix_filter(name)
+
+        tanggal = parse_date_range(request.args.get("from"), request.args.get("to"))
+        if tanggal:
+            query["tanggal"] = tanggal
+
+        limit = parse_limit(request.args.get("limit"), HISTORY_PAGE_SIZE, HISTORY_PAGE_MAX)
+        page = keyset_page(
+            current_app.db["master_supplier_out"],
+            query,
+            [("tanggal", DESCENDING), ("_id", DESCENDING)],
+            limit,
+            cursor=request.args.get("cursor"),
+            projection={"name_key": 0},
+        )
 
-        for d in data:
-            d["_id"] = str(d["_id"])
-            if isinstance(d.get("tanggal"), datetime):
-                d["tanggal"] = d["tanggal"].strftime("%Y-%m-%d %H:%M:%S")
+        return response(True, "Data berhasil diambil", page.items, 200, meta={"next": page.next_cursor, "limit": limit})
 
-        return response(True, "Data berhasil diambil", data, 200)
+    except ValueError as e:
+        return response(False, str(e), code=400)
 
     except Exception as e:
         return response(False, "Gagal mengambil data", {"error":str(e)}, code=500)
@@ -235,16 +281,12 @@ def add_inventory_out():
         if not sku and not name:
             return response(False, "SKU atau nama produk wajib diisi", code=400)
 
-        product = (
-            db["master_product"].find_one({"_id": sku})
-            or db["master_product"].find_one({"product_sku": sku})
-            or db["master_product"].find_one({"name": {"$regex": f"^{re.escape(name)}$", "$options": "i"}})
-        )
+        product = resolve_product(db, sku=sku, name=name, store_id=data.get("store_id"))
 
         if not product:
             return response(False, f"Produk '{name or sku}' tidak ditemukan", code=404)
-        if product["stock"] < jumlah:
-            return response(False, f"Stok tidak cukup (tersisa {product['stock']})", code=400)
+        if jumlah <= 0:
+            return response(False, "Jumlah harus lebih dari 0", code=400)
 
         extra_data = {}
 
@@ -271,30 +313,36 @@ def add_inventory_out():
         else:
             extra_data = {"keterangan": sanitize(data.get("keterangan", "Barang keluar"))}
 
-        new_stock = product["stock"] - jumlah
-        db["master_product"].update_one({"_id": product["_id"]}, {"$set": {"stock": new_stock}})
-
         store_id = data.get("store_id")
         store_name = ""
         if store_id:
-            store_doc = db["master_store"].find_one({"_id": store_id})
+            store_doc = store_registry.get(db, store_id, active_only=False)
             store_name = store_doc.get("name", "") if store_doc else ""
 
-        record = {
-            "product_sku": product["_id"],
-            "name": product["name"],
-            "jumlah": jumlah,
-            "type": type_tx,
-            "tanggal": datetime.now(),
-            "stock_before": product["stock"],
-            "stock_after": new_stock,
-            "store_id": store_id,
-            "store_name": store_name,
-            **extra_data,
-        }
+        def movement(session):
+            change = adjust_stock(db, product["_id"], -jumlah, session=session)
+            db["master_supplier_out"].insert_one({
+                "product_sku": product["_id"],
+                "name": product["name"],
+                **search_fields("master_supplier_out", {"name": product["name"]}),
+                "jumlah": jumlah,
+                "type": type_tx,
+                "tanggal": datetime.now(),
+                "stock_before": change.stock_before,
+                "stock_after": change.stock_after,
+                "store_id": store_id,
+                "store_name": store_name,
+                **extra_data,
+            }, session=session)
+            return change.product
 
-        db["master_supplier_out"].insert_one(record)
+        try:
+            product = run_movement(db, movement)
+        except StockError as e:
+            return response(False, str(e), code=e.code)
 
+        mark_stale(product.get("store_id"), store_id)
+        bump_version(db, "master_product", product.get("store_id"), store_id)
         return response(True, f"{product['name']} berhasil dicatat sebagai {type_tx}.", code=200)
 
     except Exception as e:
@@ -358,35 +406,16 @@ def update_inventory_out(item_id):
         if not record:
             return response(False, "Data tidak ditemukan", code=404)
 
-        product = db["master_product"].find_one({"_id": record["product_sku"]})
-        if not product:
-            return response(False, "Produk terkait tidak ditemukan", code=404)
-
         jumlah_lama = int(record["jumlah"])
         jumlah_baru = int(data.get("jumlah", jumlah_lama))
         selisih = jumlah_baru - jumlah_lama  
 
-        if selisih != 0:
-            stock_now = int(product["stock"])
-            new_stock = stock_now - selisih
-            if new_stock < 0:
-                return response(False, f"Stok tidak cukup (tersisa {stock_now})", code=400)
-
-            db["master_product"].update_one(
-                {"_id": product["_id"]},
-                {"$set": {"stock": new_stock}}
-            )
-            stock_after = new_stock
-        else:
-            stock_after = int(product.get("stock", 0))
-
         type_baru = data.get("type", record.get("type"))
-        type_lower = (type_baru or "").lower()
+        type_lower = sanitize(type_baru).lower()
 
         update_fields = {
             "jumlah": jumlah_baru,
-            "type": type_baru,
-            "stock_after": stock_after,
+            "type": type_lower,
             "tanggal": datetime.now()
         }
 
@@ -412,11 +441,42 @@ def update_inventory_out(item_id):
             update_fields["harga_jual"] = harga_jual
             update_fields["total_harga"] = total_harga
 
-        db["master_supplier_out"].update_one(
-            {"_id": oid},
-            {"$set": update_fields}
-        )
+        # Stok diubah setelah seluruh validasi lolos (atomik, dengan guard)
+        def movement(session):
+            if selisih != 0:
+                product, _, stock_after = adjust_stock(
+                    db, record["product_sku"], -selisih, session=session
+                )
+            else:
+                product = db["master_product"].find_one(
+                    {"_id": record["product_sku"]}, session=session
+                )
+                if not product:
+                    raise ProductNotFound(record["product_sku"])
+                stock_after = int(product.get("stock", 0))
+
+            update_fields["stock_after"] = stock_after
+            # Guard `jumlah` lama: edit bersamaan tidak boleh menerapkan selisih basi
+            result = db["master_supplier_out"].update_one(
+                {"_id": oid, "jumlah": record["jumlah"]},
+                {"$set": update_fields},
+                session=session,
+            )
+            if result.matched_count == 0:
+                if session is None and selisih != 0:
+                    adjust_stock(db, record["product_sku"], selisih, floor=0)  # kompensasi (di transaksi: abort)
+                raise StockConflict()
+            return product
 
+        try:
+            product = run_movement(db, movement)
+        except ProductNotFound:
+            return response(False, "Produk terkait tidak ditemukan", code=404)
+        except StockError as e:
+            return response(False, str(e), code=e.code)
+
+        mark_stale(product.get("store_id"), record.get("store_id"))
+        bump_version(db, "master_product", product.get("store_id"), record.get("store_id"))
         return response(True, "Transaksi berhasil diperbarui", update_fields, 200)
 
     except Exception as e:
@@ -471,16 +531,21 @@ def delete_inventory_out(item_id):
         product_sku = record.get("product_sku")
         jumlah_keluar = int(record.get("jumlah", 0) or 0)
 
-        if product_sku:
-            db["master_product"].update_one(
-                {"_id": product_sku},
-                {"$inc": {"stock": jumlah_keluar}}
-            )
+        def movement(session):
+            result = db["master_supplier_out"].delete_one({"_id": oid}, session=session)
+            if result.deleted_count and product_sku:
+                try:
+                    adjust_stock(db, product_sku, jumlah_keluar, session=session)
+                except ProductNotFound:
+                    pass  # produk sudah dihapus; transaksi tetap boleh dihapus
+            return result
 
-        delete_result = db["master_supplier_out"].delete_one({"_id": oid})
+        delete_result = run_movement(db, movement)
         if delete_result.deleted_count == 0:
             return response(False, "Gagal menghapus transaksi", code=500)
 
+        mark_stale(record.get("store_id"))
+        bump_version(db, "master_product", record.get("store_id"))
         return response(True, "Transaksi dihapus dan stok dikembalikan", code=200)
 
     except Exception as e:
@@ -512,12 +577,6 @@ def get_inventory_out_detail(item_id):
         if not record:
             return response(False, "Data tidak ditemukan", code=404)
 
-        # Convert ke format JSON-friendly
-        record["_id"] = str(record["_id"])
-
-        if isinstance(record.get("tanggal"), datetime):
-            record["tanggal"] = record["tanggal"].strftime("%Y-%m-%d %H:%M:%S")
-
         return jsonify(record), 200
 
     except Exception as e:
@@ -12,6 +12,7 @@ barang masuk dalam sistem inventaris gudang multi-toko.
 Fitur Utama:
 - Pengambilan data produk, toko, dan transaksi barang masuk.
 - Penambahan transaksi barang masuk baru.
+- Impor massal barang masuk dari file CSV / NDJSON (streaming).
 - Pembaruan dan penghapusan transaksi barang masuk.
 - Sinkronisasi otomatis stok produk di setiap transaksi.
 
@@ -33,21 +34,37 @@ Validasi
 =====================================================
 Koleksi MongoDB yang Digunakan
 -----------------------------------------------------
-- master_product   : Data produk (SKU, nama, stok, harga, lokasi)
-- master_supplier  : Transaksi barang masuk (riwayat supplier)
-- master_store     : Data toko tujuan
+- master_product     : Data produk (SKU, nama, stok, harga, lokasi)
+- master_supplier    : Transaksi barang masuk (riwayat supplier)
+- master_store       : Data toko tujuan
+- product_tombstones : SKU produk yang terhapus saat stok habis (delta sync)
+- counters           : Counter atomik untuk penomoran SKU
 
 =====================================================
 """
 
 from flask import Blueprint, request, jsonify, session, current_app, render_template
 from datetime import datetime
-import re
+import io
 from bson import ObjectId
 from bson.errors import InvalidId
-from pymongo import DESCENDING
 from app.routes.auth_routes import check_admin, check_login
+from app.utils.dashboard_cache import mark_stale
+from app.utils.versions import bump_version, collection_etag, not_modified, with_etag
+from app.utils.stock_state import compute_stock_state
+from app.utils.stock_service import adjust_stock, ProductNotFound, StockConflict, StockError
+from app.utils.transactions import run_movement
 from app.utils.validators import sanitize, to_int, parse_float, response
+from app.utils.sku_allocator import allocate_sku
+from app.utils.pagination import keyset_page, parse_date_range, parse_limit
+from app.utils.search_keys import prefix_filter, search_fields, search_key
+from app.utils.product_resolver import resolve_product
+from app.utils.store_registry import store_registry
+from app.utils.delta_sync import record_tombstone
+from app.utils.product_import import detect_format, import_products, iter_rows
+from pymongo import DESCENDING
+from pymongo.errors import DuplicateKeyError
+from config import HISTORY_PAGE_SIZE, HISTORY_PAGE_MAX, IMPORT_CHUNK_SIZE
 
 
 # =====================================================
@@ -60,31 +77,10 @@ inventory_bp = Blueprint("inventory_bp", __name__)
 def generate_sku(db):
     """
     Generate SKU baru unik dalam format SKU-001, SKU-0100, SKU-10000, dst.
-    Mendukung jumlah produk di atas 999 tanpa masalah.
+    Nomor diambil secara atomik dari dokumen counter (lihat `sku_allocator`),
+    sehingga tidak ada scan regex maupun loop pengecekan SKU bebas.
     """
-    last_product = db["master_product"].find_one(
-        {"_id": {"$regex": r"^SKU-\d+$"}},
-        sort=[("_id", DESCENDING)]
-    )
-
-    if last_product:
-        num_part = last_product["_id"].split("-")[1]
-
-        try:
-            last_num = int(num_part)
-        except:
-            last_num = 0
-    else:
-        last_num = 0
-
-    new_num = last_num + 1
-    new_sku = f"SKU-{new_num:03d}"
-
-    while db["master_product"].find_one({"_id": new_sku}):
-        new_num += 1
-        new_sku = f"SKU-{new_num:03d}"
-
-    return new_sku
+    return allocate_sku(db)
 
 
 # =====================================================
@@ -116,19 +112,24 @@ def inventory_page():
 @inventory_bp.route("/api/product_masuk", methods=["GET"])
 def get_product_masuk():
     """
-    Mengambil seluruh data transaksi barang masuk dari koleksi `master_supplier`.
+    Mengambil data transaksi barang masuk dari koleksi `master_supplier` per halaman.
 
-    Endpoint ini digunakan untuk menampilkan daftar transaksi barang masuk,
-    seperti nama produk, pemasok, jumlah, dan tanggal transaksi.  
-    Data dapat difilter berdasarkan store_id, nama produk, atau nama supplier.
+    Data diurutkan dari yang terbaru (`tanggal`, `_id`) dengan keyset pagination:
+    kirim `meta.next` sebagai `cursor` untuk halaman berikutnya. Filter
+    `name` dan `supplier` mencocokkan awalan kata (tidak peka huruf besar)
+    lewat field ter-index `name_key` / `supplier_key`.
 
     Args:
-        store_id (str) : ID toko 
-        name (str) : Nama produk. 
-        supplier (str) : Nama pemasok.
-    
+        store_id (str, optional) : ID toko.
+        name (str, optional)     : Awalan nama produk.
+        supplier (str, optional) : Awalan nama pemasok.
+        from (str, optional)     : Tanggal awal, format YYYY-MM-DD.
+        to (str, optional)       : Tanggal akhir (inklusif), format YYYY-MM-DD.
+        limit (int, optional)    : Jumlah data per halaman (default 50, maks 500).
+        cursor (str, optional)   : Cursor dari response sebelumnya.
+
     Returns:
-        Response: JSON daftar transaksi produk masuk.
+        Response: JSON daftar transaksi produk masuk + `meta.next`.
     """
     auth = check_login(api=True)
     if auth:
@@ -141,21 +142,31 @@ def get_product_masuk():
         supplier = request.args.get("supplier")
 
         query = {}
-        if store_id:
+        if store_id and store_id != "all":
             query["store_id"] = store_id
         if name:
-            query["name"] = {"$regex": name, "$options": "i"}
+            query["name_key"] = prefix_filter(name)
         if supplier:
-            query["supplier"] = {"$regex": supplier, "$options": "i"}
-
-        data = list(db["master_supplier"].find(query).sort("tanggal", -1))
+            query["supplier_key"] = prefix_filter(supplier)
+
+        tanggal = parse_date_range(request.args.get("from"), request.args.get("to"))
+        if tanggal:
+            query["tanggal"] = tanggal
+
+        limit = parse_limit(request.args.get("limit"), HISTORY_PAGE_SIZE, HISTORY_PAGE_MAX)
+        page = keyset_page(
+            db["master_supplier"],
+            query,
+            [("tanggal", DESCENDING), ("_id", DESCENDING)],
+            limit,
+            cursor=request.args.get("cursor"),
+            projection={"name_key": 0, "supplier_key": 0},
+        )
 
-        for d in data:
-            d["_id"] = str(d["_id"])
-            if isinstance(d.get("tanggal"), datetime):
-                d["tanggal"] = d["tanggal"].strftime("%Y-%m-%d %H:%M:%S")
+        return response(True, "Data berhasil diambil.", page.items, meta={"next": page.next_cursor, "limit": limit})
 
-        return response(True, "Data berhasil diambil.", data)
+    except ValueError as e:
+        return response(False, str(e), code=400)
 
     except Exception as e:
         return response(False, "Gagal mengambil data transaksi.", {"error": str(e)}, 500)
@@ -176,6 +187,7 @@ def get_products_dropdown():
 
     Returns:
         Response: JSON daftar produk masuk dengan isi sku,name,stock,purchase_price.
+                  Mendukung conditional GET (ETag / If-None-Match → 304).
     """
     auth = check_login(api=True)
     if auth:
@@ -183,6 +195,11 @@ def get_products_dropdown():
 
     db = current_app.db
     try:
+        etag = collection_etag(db, "master_product")
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
         products = list(
             db["master_product"].find(
                 {}, {"_id": 1, "name": 1, "stock": 1, "purchase_price": 1, "store_id": 1, "store_name": 1, "city": 1, }
@@ -200,7 +217,7 @@ def get_products_dropdown():
             }
             for p in products
         ]
-        return response(True, "Data produk untuk dropdown berhasil diambil.", result)
+        return with_etag(response(True, "Data produk untuk dropdown berhasil diambil.", result), etag)
 
     except Exception as e:
         return response(False, "Gagal mengambil data dropdown.", {"error": str(e)}, 500)
@@ -232,7 +249,9 @@ def add_product_masuk():
     - `store_id`, `name`, dan `supplier` wajib diisi.
     - Field jumlah harus lebih dari 0.
     - Store harus valid dan dalam kondisi aktif.
-    - Nama produk dibandingkan menggunakan pencarian regex case-insensitive.
+    - Nama produk dicocokkan lewat `name_key` (casefold + spasi dirapikan)
+      pada unique index (store_id, name_key), sehingga nama ganda dalam
+      satu toko tidak bisa tercipta walaupun ada request bersamaan.
 
     Args:
         store_id (str)      : ID toko asal barang.
@@ -270,77 +289,154 @@ def add_product_masuk():
     if jumlah <= 0:
         return response(False, "Jumlah harus lebih dari 0", code=400)
 
-    store = db["master_store"].find_one({"_id": store_id, "is_active": True})
+    store = store_registry.get(db, store_id)
     if not store:
         return response(False, f"Toko '{store_id}' tidak ditemukan", code=400)
 
     try:
-        existing = db["master_product"].find_one(
-            {"name": {"$regex": f"^{re.escape(name)}$", "$options": "i"}, "store_id": store_id}
-        )
-        
-        if existing:
-            sku = existing["_id"]
-            stock_before = int(existing.get("stock", 0))
-            stock_after = stock_before + jumlah
-
-            db["master_product"].update_one(
-                {"_id": sku},
-                {
-                    "$inc": {"stock": jumlah},
-                    "$set": {"purchase_price": purchase_price, "supplier": supplier, "updated_at": datetime.now()},
-                },
-            )
-            action_type = "restock"
-            message = f"Stok produk '{name}' ditambah {jumlah} unit."
-            
-        else:
-            sku = generate_sku(db)
-            new_product = {
-                "_id": sku,
+        # Lookup persis lewat unique index (store_id, name_key)
+        existing = resolve_product(db, name=name, store_id=store_id)
+
+        sku = existing["_id"] if existing else generate_sku(db)
+
+        def movement(session):
+            if existing:
+                change = adjust_stock(
+                    db, sku, jumlah,
+                    {"purchase_price": purchase_price, "supplier": supplier},
+                    session=session,
+                )
+                stock_before, stock_after = change.stock_before, change.stock_after
+                action_type = "restock"
+            else:
+                db["master_product"].insert_one({
+                    "_id": sku,
+                    "name": name,
+                    "category": "Lainnya",
+                    "stock": jumlah,
+                    "min_stock": 5,
+                    "stock_state": compute_stock_state(jumlah, 5),
+                    **search_fields("master_product", {"name": name}),
+                    "purchase_price": purchase_price,
+                    "sale_price": 0,
+                    "supplier": supplier,
+                    "store_id": store["_id"],
+                    "store_name": store["name"],
+                    "city": store.get("city", ""),
+                    "location": "Gudang Utama",
+                    "created_at": datetime.now(),
+                    "updated_at": datetime.utcnow(),
+                }, session=session)
+                stock_before, stock_after = 0, jumlah
+                action_type = "new_product"
+
+            db["master_supplier"].insert_one({
+                "_id": ObjectId(),
+                "product_sku": sku,
                 "name": name,
-                "category": "Lainnya",
-                "stock": jumlah,
-                "min_stock": 5,
-                "purchase_price": purchase_price,
-                "sale_price": 0,
                 "supplier": supplier,
+                "jumlah": jumlah,
+                "notes": notes,
+                "tanggal": datetime.now(),
+                "purchase_price": purchase_price,
                 "store_id": store["_id"],
                 "store_name": store["name"],
                 "city": store.get("city", ""),
+                "stock_before": stock_before,
+                "stock_after": stock_after,
                 "location": "Gudang Utama",
-                "created_at": datetime.now(),
-            }
-            db["master_product"].insert_one(new_product)
-            stock_before = 0
-            stock_after = jumlah
-            action_type = "new_product"
+                "type": action_type,
+                **search_fields("master_supplier", {"name": name, "supplier": supplier}),
+            }, session=session)
+            return stock_before, stock_after
+
+        try:
+            try:
+                stock_before, stock_after = run_movement(db, movement)
+            except DuplicateKeyError:
+                # Produk bernama sama baru saja dibuat request lain → jadikan restock
+                existing = db["master_product"].find_one(
+                    {"store_id": store_id, "name_key": search_key(name)}, {"_id": 1}
+                )
+                if not existing:
+                    raise
+                sku = existing["_id"]
+                stock_before, stock_after = run_movement(db, movement)
+        except StockError as e:
+            return response(False, str(e), code=e.code)
+
+        if existing:
+            message = f"Stok produk '{name}' ditambah {jumlah} unit."
+        else:
             message = f"Produk baru '{name}' berhasil ditambahkan."
 
-        db["master_supplier"].insert_one({
-            "_id": ObjectId(),
-            "product_sku": sku,
-            "name": name,
-            "supplier": supplier,
-            "jumlah": jumlah,
-            "notes": notes,
-            "tanggal": datetime.now(),
-            "purchase_price": purchase_price,
-            "store_id": store["_id"],
-            "store_name": store["name"],
-            "city": store.get("city", ""),
-            "stock_before": stock_before,
-            "stock_after": stock_after,
-            "location": "Gudang Utama",
-            "type": action_type,
-        })
-        
+        mark_stale(store["_id"])
+        bump_version(db, "master_product", store["_id"])
         return response(True, message, {"sku": sku,"stock_before": stock_before,"stock_after": stock_after,}, 201)
     
     except Exception as e:
        return response(False, "Gagal menambah data produk masuk", {"detail": str(e)}, 500 )
 
 
+# =====================================================
+# ROUTES: IMPOR MASSAL BARANG MASUK (CSV / NDJSON)
+# =====================================================
+
+@inventory_bp.route("/api/product_masuk/import", methods=["POST"])
+def import_product_masuk():
+    """
+    Impor banyak transaksi barang masuk sekaligus (onboarding toko).
+
+    File dibaca secara streaming dan ditulis per chunk dengan
+    `bulk_write` (lihat `app/utils/product_import.py`). Kolom per baris
+    sama dengan POST /api/product_masuk, ditambah category, sale_price,
+    dan min_stock (opsional, untuk produk baru).
+
+    File dikirim sebagai multipart `file`, atau langsung sebagai body
+    dengan Content-Type `text/csv` / `application/x-ndjson`.
+
+    Args:
+        format (str, optional)     : csv | ndjson (default dari ekstensi / Content-Type).
+        chunk_size (int, optional) : Baris per bulk_write (default IMPORT_CHUNK_SIZE).
+
+    Returns:
+        "status": true,
+            "message": "Impor selesai: 998 baris masuk, 2 baris gagal.",
+            "data": {"rows": 1000, "imported": 998, "products_created": 950,
+                     "products_restocked": 40, "error_count": 2,
+                     "errors": [{"row": 17, "error": "Jumlah harus lebih dari 0"}, ...]}
+    """
+    auth = check_admin(api=True)
+    if auth:
+        return auth
+
+    upload = request.files.get("file")
+    raw = upload.stream if upload else request.stream
+    try:
+        fmt = detect_format(
+            request.args.get("format"),
+            upload.filename if upload else None,
+            upload.mimetype if upload else request.mimetype,
+        )
+        chunk_size = parse_limit(request.args.get("chunk_size"), IMPORT_CHUNK_SIZE, 10000)
+    except ValueError as e:
+        return response(False, str(e), code=400)
+
+    db = current_app.db
+    try:
+        text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+        report = import_products(db, iter_rows(text, fmt), chunk_size)
+    except UnicodeDecodeError:
+        return response(False, "File harus ber-encoding UTF-8", code=400)
+    except Exception as e:
+        return response(False, "Gagal mengimpor data produk masuk", {"detail": str(e)}, 500)
+
+    if report.store_ids:
+        mark_stale(*report.store_ids)
+    message = f"Impor selesai: {report.imported} baris masuk, {report.error_count} baris gagal."
+    return response(True, message, report.as_dict(), 200)
+
+
 # =====================================================
 # ROUTES: PERBARUI TRANSAKSI BARANG MASUK (PUT)
 # =====================================================
@@ -390,10 +486,7 @@ def update_product_masuk(id):
 
         old_jumlah = int(transaksi["jumlah"])
         sku = transaksi["product_sku"]
-        product = db["master_product"].find_one({"_id": sku})
-        if not product:
-            return response(success=False, message=f"Produk dengan SKU '{sku}' tidak ditemukan", code=404)
-            
+
         jumlah_baru = to_int(data.get("jumlah", old_jumlah), "jumlah")
         supplier = sanitize(data.get("supplier", transaksi.get("supplier", "")))
         notes = sanitize(data.get("notes", transaksi.get("notes", "")))
@@ -403,36 +496,45 @@ def update_product_masuk(id):
             return response(False, "Jumlah harus lebih dari 0", code=400)
 
         selisih = jumlah_baru - old_jumlah
-        stok_baru = int(product["stock"]) + selisih
-        if stok_baru < 0:
-            return response(False, "Stock tidak boleh negatif", code=400)
 
-        db["master_product"].update_one(
-            {"_id": sku},
-            {
-                "$set": {
-                    "stock": stok_baru,
-                    "purchase_price": purchase_price,
-                    "supplier": supplier,
-                    "updated_at": datetime.now(),
-                }
-            },
-        )
+        def movement(session):
+            change = adjust_stock(db, sku, selisih, {
+                "purchase_price": purchase_price,
+                "supplier": supplier,
+            }, session=session)
 
-        db["master_supplier"].update_one(
-            {"_id": ObjectId(id)},
-            {
-                "$set": {
-                    "jumlah": jumlah_baru,
-                    "supplier": supplier,
-                    "purchase_price": purchase_price,
-                    "notes": notes,
-                    "updated_at": datetime.now(),
-                    "stock_after": stok_baru,
-                }
-            },
-        )
+            # Guard `jumlah` lama: jika transaksi diubah request lain di antara
+            # find_one dan sini, selisih yang dipakai sudah basi
+            result = db["master_supplier"].update_one(
+                {"_id": ObjectId(id), "jumlah": transaksi["jumlah"]},
+                {
+                    "$set": {
+                        "jumlah": jumlah_baru,
+                        "supplier": supplier,
+                        **search_fields("master_supplier", {"supplier": supplier}),
+                        "purchase_price": purchase_price,
+                        "notes": notes,
+                        "updated_at": datetime.now(),
+                        "stock_after": change.stock_after,
+                    }
+                },
+                session=session,
+            )
+            if result.matched_count == 0:
+                if session is None:
+                    adjust_stock(db, sku, -selisih, floor=0)  # kompensasi (di transaksi: abort)
+                raise StockConflict()
+            return change
+
+        try:
+            change = run_movement(db, movement)
+        except StockError as e:
+            return response(False, str(e), code=e.code)
 
+        product, stok_baru = change.product, change.stock_after
+
+        mark_stale(transaksi.get("store_id"), product.get("store_id"))
+        bump_version(db, "master_product", transaksi.get("store_id"), product.get("store_id"))
         return response(True, f"Transaksi barang masuk '{sku}' berhasil diperbarui.", {"sku": sku, "stock_now": stok_baru}, 200)
 
     except InvalidId:
@@ -483,27 +585,44 @@ def delete_product_masuk(id):
 
         sku = transaksi["product_sku"]
         jumlah = int(transaksi["jumlah"])
-        product = db["master_product"].find_one({"_id": sku})
 
-        if not product:
-            return response(False, f"Produk dengan SKU '{sku}' tidak ditemukan", code=404)
+        def movement(session):
+            # Hapus riwayat lebih dulu: hanya request yang benar-benar menghapus
+            # baris ini yang boleh mengurangi stok (hapus ganda bersamaan aman)
+            result = db["master_supplier"].delete_one({"_id": ObjectId(id)}, session=session)
+            if result.deleted_count != 1:
+                return None
+            try:
+                change = adjust_stock(db, sku, -jumlah, floor=0, session=session)
+            except ProductNotFound:
+                return False  # produk sudah dihapus; riwayat tetap boleh dihapus
+            if change.stock_after == 0:
+                deleted = db["master_product"].delete_one({"_id": sku, "stock": 0}, session=session)
+                if deleted.deleted_count:
+                    record_tombstone(db, sku, change.product.get("store_id"), session=session)
+            return change
 
-        stok_sekarang = int(product.get("stock", 0))
-        stok_baru = stok_sekarang - jumlah
-        if stok_baru < 0:
-            stok_baru = 0 
+        try:
+            change = run_movement(db, movement)
+        except StockError as e:
+            return response(False, str(e), code=e.code)
 
-        db["master_supplier"].delete_one({"_id": ObjectId(id)})
+        if change is None:
+            return response(False, "Transaksi tidak ditemukan", code=404)
+        if change is False:
+            mark_stale(transaksi.get("store_id"))
+            return response(True, "Transaksi dihapus (produk terkait sudah tidak ada).", {"sku": sku, "deleted_product": True}, 200)
 
+        product, stok_sekarang, stok_baru = change
         if stok_baru == 0:
-            db["master_product"].delete_one({"_id": sku})
             message = f"Transaksi dihapus dan produk '{product.get('name')}' juga dihapus karena stok habis."
             deleted_product = True
         else:
-            db["master_product"].update_one({"_id": sku}, {"$set": {"stock": stok_baru}})
             message = f"Transaksi dihapus. Stok produk '{product.get('name')}' kini {stok_baru}."
             deleted_product = False
 
+        mark_stale(transaksi.get("store_id"), product.get("store_id"))
+        bump_version(db, "master_product", transaksi.get("store_id"), product.get("store_id"))
         return response(True, message, {"sku": sku, "stock_before": stok_sekarang, "stock_after": stok_baru, "deleted_product": deleted_product}, 200)
 
     except InvalidId:
@@ -527,10 +646,6 @@ def get_product_masuk_detail(id):
         if not transaksi:
             return response(False, "Transaksi tidak ditemukan", code=404)
 
-        transaksi["_id"] = str(transaksi["_id"])
-        if isinstance(transaksi.get("tanggal"), datetime):
-            transaksi["tanggal"] = transaksi["tanggal"].strftime("%Y-%m-%d %H:%M:%S")
-
         # Biar cocok dengan frontend kamu sekarang (langsung pakai item.xxx)
         from flask import jsonify
         return jsonify(transaksi), 200
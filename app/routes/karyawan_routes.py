@@ -40,6 +40,7 @@ from datetime import datetime
 from bson import ObjectId
 from werkzeug.security import generate_password_hash
 from app.routes.auth_routes import check_login, check_admin
+from app.utils.dashboard_cache import mark_stale
 from app.utils.validators import sanitize, response
 
 
@@ -98,10 +99,6 @@ def get_all_karyawan():
     db = current_app.db
     try:
         result = list(db["master_karyawan"].find({}, {"password": 0}))  
-        for item in result:
-            item["_id"] = str(item["_id"])
-            if isinstance(item.get("created_at"), datetime):
-                item["created_at"] = item["created_at"].strftime("%Y-%m-%d %H:%M:%S")
         return response(True, "Data berhasil diambil", result, 200)
 
     except Exception as e:
@@ -187,11 +184,13 @@ def save_karyawan():
         if data.get("_id"):
             _id = ObjectId(data["_id"])
             db["master_karyawan"].update_one({"_id": _id}, {"$set": payload})
+            mark_stale()
             return response(True, "Data karyawan diperbarui", code=200)
 
         else:
             payload["created_at"] = datetime.now()
             db["master_karyawan"].insert_one(payload)
+            mark_stale()
             return response(True, "Karyawan baru ditambahkan", code=201)
 
     except Exception as e:
@@ -270,6 +269,7 @@ def update_karyawan(id):
         result = db["master_karyawan"].update_one({"_id": _id}, {"$set": payload})
         if result.matched_count == 0:
             return response(False, "Karyawan tidak ditemukan", code=404)
+        mark_stale()
         return response(True, "Data karyawan berhasil diperbarui", code=200)
 
     except Exception as e:
@@ -322,6 +322,7 @@ def delete_karyawan(id):
         if result.deleted_count == 0:
             return response(False, "Data tidak ditemukan", code=404)
         
+        mark_stale()
         return response(True, "Data karyawan berhasil dihapus", code=200)
     
     except Exception as e:
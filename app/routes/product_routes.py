@@ -10,7 +10,8 @@ Modul ini mengelola proses CRUD (Create, Read, Update, Delete)
 untuk data master produk dalam aplikasi inventaris gudang.
 
 Fitur Utama:
-- Mengambil daftar seluruh produk.
+- Mengambil daftar produk per halaman (keyset pagination, projection field).
+- Delta sync: hanya produk yang berubah / terhapus sejak cursor.
 - Mengambil detail produk berdasarkan SKU.
 - Memperbarui data produk (khusus admin).
 - Menghapus produk (khusus admin).
@@ -30,23 +31,32 @@ Validasi:
 - Semua data yang masuk divalidasi dan disanitasi.
 - Mencegah XSS dengan sanitasi input.
 - Memastikan stok dan harga adalah angka valid.
-- SKU harus mengikuti format 'SKU-XXX'.
+- SKU harus mengikuti format 'SKU-XXX' (tiga digit atau lebih).
 
 =====================================================
 Koleksi MongoDB yang Digunakan
 -----------------------------------------------------
-- master_product : Menyimpan data produk (SKU, nama, kategori, stok,
-                   harga beli, harga jual, stok minimum, timestamp)
+- master_product     : Menyimpan data produk (SKU, nama, kategori, stok,
+                       harga beli, harga jual, stok minimum, timestamp)
+- product_tombstones : SKU produk yang dihapus (untuk delta sync)
 
 =====================================================
 """
 
-from flask import Blueprint, request, jsonify, session, current_app, render_template
+from flask import Blueprint, request, session, current_app, render_template
 from pymongo import ASCENDING
-from datetime import datetime
 from app.utils import SessionManager
+from config import PRODUCT_PAGE_SIZE, PRODUCT_PAGE_MAX
 import re
 from app.routes.auth_routes import check_admin, check_login
+from app.utils.dashboard_cache import mark_stale
+from app.utils.versions import bump_version, collection_etag, not_modified, with_etag
+from app.utils.delta_sync import changes_since, record_tombstone, start_cursor
+from app.utils.pagination import keyset_page, parse_fields, parse_limit
+from app.utils.search_keys import prefix_filter, search_fields
+from pymongo.errors import DuplicateKeyError
+from app.utils.stock_state import stock_update
+from app.utils.transactions import run_movement
 from app.utils.validators import sanitize, to_int, parse_float,response
 
 
@@ -57,12 +67,19 @@ from app.utils.validators import sanitize, to_int, parse_float,response
 product_bp = Blueprint("product_bp", __name__)
 sm = SessionManager()
 
+# Field yang boleh diminta lewat parameter `fields=`
+PRODUCT_FIELDS = {
+    "name", "category", "stock", "min_stock", "stock_state", "purchase_price",
+    "sale_price", "supplier", "store_id", "store_name", "city", "location",
+    "created_at", "updated_at",
+}
+
 
 def validate_sku(product_id):
     """
-    Validasi format SKU harus 'SKU-XXX'.
+    Validasi format SKU harus 'SKU-XXX' (minimal tiga digit, contoh SKU-1000).
     """
-    if not re.match(r"^SKU-\d{3}$", product_id):
+    if not re.match(r"^SKU-\d{3,}$", product_id):
         return response(False, "Format Kode SKU tidak valid", code=400)
     return None
 
@@ -96,18 +113,30 @@ def index():
 @product_bp.route("/api/products", methods=["GET"])
 def get_all_products():
     """
-    Ambil seluruh data produk dari koleksi `master_product`.
+    Ambil data produk dari koleksi `master_product` per halaman (keyset pagination).
 
-    Endpoint ini digunakan untuk menampilkan daftar semua produk,
-    termasuk SKU, nama, kategori, stok, harga beli, dan harga jual.
-    Data dapat difilter berdasarkan store_id jika diperlukan.
+    Data diurutkan berdasarkan SKU (`_id`). Halaman berikutnya diambil
+    dengan mengirim nilai `meta.next` sebagai parameter `cursor`;
+    `meta.next` bernilai null pada halaman terakhir. Filter `name`
+    mencocokkan awalan nama (tidak peka huruf besar) lewat field
+    ter-index `name_key`.
 
     Args:
         store_id (str, optional) : ID toko untuk memfilter produk tertentu.
+        category (str, optional) : Kategori produk.
+        name (str, optional)     : Awalan nama produk.
+        limit (int, optional)    : Jumlah produk per halaman (default 50, maks 500).
+        cursor (str, optional)   : Cursor dari response sebelumnya.
+        fields (str, optional)   : Daftar field dipisah koma, contoh `name,stock,sale_price`.
 
     Returns:
        "status": true,
-            "message": "Data produk berhasil diambil."
+            "message": "Data produk berhasil diambil.",
+            "data": [...],
+            "meta": {"next": "<cursor>" | null, "limit": 50}
+
+        Mendukung conditional GET: kirim ETag sebelumnya lewat
+        `If-None-Match` → 304 jika produk belum berubah.
     """
     auth = check_login(api=True)
     if auth:
@@ -115,15 +144,96 @@ def get_all_products():
 
     db = current_app.db
     store_id = request.args.get("store_id")
+    etag = collection_etag(db, "master_product", store_id)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
     query = {}
-    if store_id:
+    if store_id and store_id != "all":
         query["store_id"] = store_id
+    category = request.args.get("category")
+    if category:
+        query["category"] = category
+    name = request.args.get("name")
+    if name:
+        # $type sama dengan partialFilterExpression index (store_id, name_key)
+        query["name_key"] = {**prefix_filter(name), "$type": "string"}
+
+    try:
+        limit = parse_limit(request.args.get("limit"), PRODUCT_PAGE_SIZE, PRODUCT_PAGE_MAX)
+        page = keyset_page(
+            db["master_product"],
+            query,
+            [("_id", ASCENDING)],
+            limit,
+            cursor=request.args.get("cursor"),
+            projection=parse_fields(request.args.get("fields"), PRODUCT_FIELDS),
+        )
+    except ValueError as e:
+        return response(False, str(e), code=400)
+
+    return with_etag(response(
+        True, "Data produk berhasil diambil.", page.items,
+        meta={"next": page.next_cursor, "limit": limit},
+    ), etag)
 
-    products = list(db["master_product"].find(query).sort("_id", ASCENDING)) or []
-    for p in products:
-        p["_id"] = str(p["_id"])
 
-    return response(True, "Data produk berhasil diambil.", products)
+# =====================================================
+# ROUTES: DELTA SYNC (PERUBAHAN SEJAK CURSOR)
+# =====================================================
+
+@product_bp.route("/api/products/changes", methods=["GET"])
+def get_product_changes():
+    """
+    Ambil hanya produk yang berubah atau terhapus sejak cursor `since`.
+
+    Alur klien:
+    1. Panggil tanpa `since` → dapat `meta.next` (cursor awal, tanpa data).
+    2. Muat katalog penuh lewat /api/products.
+    3. Secara berkala panggil dengan `since=<meta.next terakhir>`; hapus
+       SKU di `deleted` lalu timpa/tambah produk di `changed`.
+       Ulangi segera selama `meta.has_more` bernilai true.
+    4. Jika `meta.reset` bernilai true, muat ulang katalog penuh.
+
+    Args:
+        since (str, optional)    : Cursor dari response sebelumnya.
+        store_id (str, optional) : ID toko.
+        limit (int, optional)    : Maksimum produk/tombstone per response (default 50, maks 500).
+        fields (str, optional)   : Daftar field produk dipisah koma.
+
+    Returns:
+        "status": true,
+            "data": {"changed": [...], "deleted": ["SKU-001", ...]},
+            "meta": {"next": "<cursor>", "has_more": false, "reset": false}
+    """
+    auth = check_login(api=True)
+    if auth:
+        return auth
+
+    since = request.args.get("since")
+    if not since:
+        return response(
+            True, "Cursor awal delta sync.", {"changed": [], "deleted": []},
+            meta={"next": start_cursor(), "has_more": False, "reset": False},
+        )
+
+    store_id = request.args.get("store_id")
+    if store_id == "all":
+        store_id = None
+
+    try:
+        limit = parse_limit(request.args.get("limit"), PRODUCT_PAGE_SIZE, PRODUCT_PAGE_MAX)
+        projection = parse_fields(request.args.get("fields"), PRODUCT_FIELDS, always=("_id", "updated_at"))
+        changes = changes_since(current_app.db, since, limit, store_id, projection)
+    except ValueError as e:
+        return response(False, str(e), code=400)
+
+    return response(
+        True, "Perubahan produk berhasil diambil.",
+        {"changed": changes.changed, "deleted": changes.deleted},
+        meta={"next": changes.next_cursor, "has_more": changes.has_more, "reset": changes.reset},
+    )
 
 
 # =====================================================
@@ -156,7 +266,6 @@ def get_product(product_id):
     if not product:
         return response(False, "Produk tidak ditemukan.", code=404)
 
-    product["_id"] = str(product["_id"])
     return response(True, "Data produk ditemukan.", product)
 
 
@@ -215,21 +324,28 @@ def update_product(product_id):
             return response(False, "Stok minimum tidak boleh negatif.", 400)
 
         update_data = {
-            "name": name,
             "category": category,
             "stock": stock,
             "min_stock": min_stock,
             "purchase_price": purchase_price,
             "sale_price": sale_price,
-            "updated_at": datetime.now()
         }
+        # Nama hanya diubah jika dikirim (form dashboard tidak mengirim nama)
+        if name:
+            update_data["name"] = name
+            update_data.update(search_fields("master_product", {"name": name}))
 
         db = current_app.db
-        result = db["master_product"].update_one({"_id": product_id}, {"$set": update_data})
+        try:
+            result = db["master_product"].update_one({"_id": product_id}, stock_update(update_data))
+        except DuplicateKeyError:
+            return response(False, f"Produk '{name}' sudah ada di toko ini.", None, 409)
 
         if result.matched_count == 0:
             return response(False, "Produk tidak ditemukan.", 404)
 
+        mark_stale()
+        bump_version(db, "master_product")
         return response(True, "Produk berhasil diperbarui.", update_data, 200)
 
     except Exception as e:
@@ -269,13 +385,29 @@ def delete_product(product_id):
             return error
 
         db = current_app.db
-        result = db["master_product"].delete_one({"_id": product_id})
 
-        if result.deleted_count == 0:
-            return response(False, "Produk tidak ditemukan.", 404)
+        def movement(session):
+            # Hapus produk + tombstone dalam satu movement agar klien delta
+            # sync pasti ikut menghapus SKU ini
+            deleted = db["master_product"].find_one_and_delete({"_id": product_id}, session=session)
+            if not deleted:
+                return None
+            try:
+                record_tombstone(db, product_id, deleted.get("store_id"), session=session)
+            except Exception:
+                if session is None:
+                    db["master_product"].insert_one(deleted)  # kompensasi (di transaksi: abort)
+                raise
+            return deleted
+
+        deleted = run_movement(db, movement)
+        if not deleted:
+            return response(False, "Produk tidak ditemukan.", code=404)
 
         ## db["inventory_in"].delete_many({"product_sku": product_id})
-        
+
+        mark_stale(deleted.get("store_id"))
+        bump_version(db, "master_product", deleted.get("store_id"))
         return response(True, f"Produk dengan ID {product_id} berhasil dihapus.", 200)
 
     except Exception as e:
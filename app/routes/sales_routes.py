@@ -56,7 +56,14 @@ from bson import ObjectId
 from pymongo import DESCENDING
 from app.routes.auth_routes import check_admin, check_login
 from app.utils import SessionManager
+from app.utils.dashboard_cache import mark_stale
+from app.utils.versions import bump_version
+from app.utils.stock_service import adjust_stock, adjust_stock_many, ProductNotFound, InsufficientStock, StockError
+from app.utils.transactions import run_movement
+from app.utils.product_resolver import resolve_products
 from app.utils.validators import sanitize, to_int, response
+from app.utils.pagination import keyset_page, parse_date_range, parse_limit
+from config import HISTORY_PAGE_SIZE, HISTORY_PAGE_MAX
 
 # =====================================================
 # Inisialisasi Blueprint
@@ -95,26 +102,69 @@ def sales_dashboard():
 @sales_bp.route("/api/sales", methods=["GET"])
 def get_all_sales():
     """
-    Mengambil seluruh data transaksi penjualan dari koleksi `sales`.
+    Mengambil data transaksi penjualan dari koleksi `sales` per halaman.
 
     Endpoint ini digunakan untuk menampilkan daftar transaksi penjualan,
     termasuk informasi produk, jumlah, harga, pembeli, serta tanggal transaksi.
-    Data dikembalikan dalam urutan terbaru (descending berdasarkan `created_at`).
+    Data dikembalikan dalam urutan terbaru (`created_at`, `_id` descending)
+    dengan keyset pagination; kirim `meta.next` sebagai `cursor` untuk
+    halaman berikutnya.
+
+    Args:
+        store_id (str, optional) : ID toko.
+        from (str, optional)     : Tanggal awal, format YYYY-MM-DD.
+        to (str, optional)       : Tanggal akhir (inklusif), format YYYY-MM-DD.
+        limit (int, optional)    : Jumlah data per halaman (default 50, maks 500).
+        cursor (str, optional)   : Cursor dari response sebelumnya.
+        mode (str, optional)     : `totals` → hanya total halaman yang sama
+                                   (jumlah transaksi, unit, pendapatan)
+                                   tanpa baris transaksi.
 
     Response:
         "status": true,
             "message": "Data transaksi berhasil diambil.",
+            "meta": {"next": "<cursor>" | null, "limit": 50}
     """
     auth = check_login(api=True)
     if auth:
         return auth
 
     db = current_app.db
-    sales = list(db["sales"].find().sort("created_at", DESCENDING))
-    for s in sales:
-        s["_id"] = str(s["_id"])
+    try:
+        query = {}
+        store_id = request.args.get("store_id")
+        if store_id and store_id != "all":
+            query["store_id"] = store_id
+
+        created_at = parse_date_range(request.args.get("from"), request.args.get("to"))
+        if created_at:
+            query["created_at"] = created_at
+
+        # Mode totals membaca halaman yang sama (dibatasi `limit`), hanya
+        # field yang dijumlahkan, sehingga tidak pernah memindai seluruh koleksi
+        totals_only = request.args.get("mode") == "totals"
+        limit = parse_limit(request.args.get("limit"), HISTORY_PAGE_SIZE, HISTORY_PAGE_MAX)
+        page = keyset_page(
+            db["sales"],
+            query,
+            [("created_at", DESCENDING), ("_id", DESCENDING)],
+            limit,
+            cursor=request.args.get("cursor"),
+            projection={"created_at": 1, "quantity": 1, "total_price": 1} if totals_only else None,
+        )
+    except ValueError as e:
+        return response(False, str(e), None, 400)
+
+    meta = {"next": page.next_cursor, "limit": limit}
+    if totals_only:
+        totals = {
+            "count": len(page.items),
+            "quantity": sum(s.get("quantity") or 0 for s in page.items),
+            "revenue": sum(s.get("total_price") or 0 for s in page.items),
+        }
+        return response(True, "Total halaman berhasil diambil.", totals, meta=meta)
 
-    return response(True, "Data transaksi berhasil diambil.", sales)
+    return response(True, "Data transaksi berhasil diambil.", page.items, meta=meta)
 
 
 # =====================================================
@@ -151,7 +201,6 @@ def get_sale_detail(sale_id):
     if not sale:
         return response(False, "Transaksi tidak ditemukan.", 404)
 
-    sale["_id"] = str(sale["_id"])
     return response(True, "Data transaksi ditemukan.", sale)
 
 
@@ -169,9 +218,8 @@ def create_sale():
     Proses yang dilakukan:
     
     1. Validasi input
-    2. Validasi stok produk
-    3. Update stok
-    4. Catat transaksi
+    2. Kurangi stok secara atomik (gagal jika stok tidak cukup)
+    3. Catat transaksi
 
     Validasi yang dilakukan
     - Field wajib: `product_id`, `quantity`
@@ -205,40 +253,40 @@ def create_sale():
         if quantity <= 0:
             return response(False, "Jumlah pembelian harus lebih dari 0.", 400)
 
-        product = db["master_product"].find_one({"_id": product_id})
-        if not product:
-            return response(False, "Produk tidak ditemukan.", 404)
-
-        stock = int(product.get("stock", 0))
-        sale_price = int(product.get("sale_price", 0))
-        if stock < quantity:
-            return response(False, f"Stok tidak mencukupi. Tersisa {stock}.", 400)
-
-        total_price = sale_price * quantity
-        new_stock = stock - quantity
-
-        db["master_product"].update_one(
-            {"_id": product_id},
-            {"$set": {"stock": new_stock, "updated_at": datetime.now()}}
-        )
-
-        sale_doc = {
-            "product_id": product_id,
-            "product_name": product.get("name"),
-            "category": product.get("category"),
-            "quantity": quantity,
-            "sale_price": sale_price,
-            "total_price": total_price,
-            "customer_name": customer_name,
-            "notes": notes,
-            "created_by": session.get("username", "unknown"),
-            "created_at": datetime.now()
-        }
-        result = db["sales"].insert_one(sale_doc)
+        def movement(db_session):
+            product, _, new_stock = adjust_stock(db, product_id, -quantity, session=db_session)
+
+            sale_price = int(product.get("sale_price", 0))
+            sale_doc = {
+                "product_id": product_id,
+                "product_name": product.get("name"),
+                "category": product.get("category"),
+                "quantity": quantity,
+                "sale_price": sale_price,
+                "total_price": sale_price * quantity,
+                "customer_name": customer_name,
+                "notes": notes,
+                "store_id": product.get("store_id"),
+                "store_name": product.get("store_name"),
+                "created_by": username,
+                "created_at": datetime.now()
+            }
+            result = db["sales"].insert_one(sale_doc, session=db_session)
+            return product, new_stock, sale_doc, result
+
+        username = session.get("username", "unknown")
+        try:
+            product, new_stock, sale_doc, result = run_movement(db, movement)
+        except ProductNotFound:
+            return response(False, "Produk tidak ditemukan.", code=404)
+        except InsufficientStock as e:
+            return response(False, f"Stok tidak mencukupi. Tersisa {e.available}.", code=400)
 
         sale_doc["_id"] = str(result.inserted_id)
         sale_doc["new_stock"] = new_stock
 
+        mark_stale(product.get("store_id"))
+        bump_version(db, "master_product", product.get("store_id"))
         return response(True, "Transaksi penjualan berhasil dibuat.", sale_doc, 201)
 
     except ValueError as e:
@@ -259,19 +307,18 @@ def create_sales_batch():
     Tambahkan beberapa transaksi penjualan sekaligus (mode POS).
     Endpoint ini digunakan untuk mencatat banyak transaksi penjualan
     dalam satu permintaan, biasanya digunakan pada sistem Point of Sale (POS).
-    Setiap item akan divalidasi stoknya, kemudian stok produk dikurangi,
-    dan seluruh transaksi disimpan ke koleksi `sales`
+    Jumlah round trip tetap (tidak bertambah sesuai banyaknya item) dan
+    bersifat semua-atau-tidak-sama-sekali.
     
         Proses:
         1. Validasi login token (mode API).
-        2. Validasi bahwa daftar item tidak kosong.
-        3. Untuk tiap item:
-            - Cek keberadaan produk.
-            - Validasi kuantitas.
-            - Validasi kecukupan stok.
-            - Hitung stok baru dan lakukan update.
-        4. Buat dokumen transaksi penjualan untuk setiap item.
-        5. Simpan semua transaksi menggunakan insert_many().
+        2. Validasi bahwa daftar item tidak kosong & kuantitas valid.
+        3. Ambil seluruh produk dengan satu query `$in`, validasi stok di memori.
+        4. Kurangi stok dengan satu `bulk_write` ordered ber-guard;
+           jika satu baris gagal, seluruh pengurangan dikembalikan.
+        5. Simpan semua transaksi menggunakan insert_many() dengan `_id`
+           yang dibuat lebih dulu (jika penyimpanan gagal, baris yang
+           sempat tersimpan dihapus dan stok dikembalikan).
 
     Returns:
         Response: Status transaksi POS.
@@ -287,20 +334,23 @@ def create_sales_batch():
         customer = data.get("customer_name", "Umum")
 
         if not items:
-            return response(False, "Tidak ada item dalam transaksi.", 400)
+            return response(False, "Tidak ada item dalam transaksi.", code=400)
 
-        sales_docs = []
+        # 1. Validasi kuantitas & gabungkan baris dengan produk yang sama
+        quantities = {}
         for i in items:
-            product = db["master_product"].find_one({"_id": i["product_id"]})
-            if not product:
-                return response(False, f"Produk {i['product_id']} tidak ditemukan.", 404)
-
             qty = int(i.get("quantity", 0))
             if qty <= 0:
-                return response(False, "Jumlah tidak valid.", 400)
-
-            stock = int(product.get("stock", 0)) 
+                return response(False, "Jumlah tidak valid.", code=400)
+            quantities[i["product_id"]] = quantities.get(i["product_id"], 0) + qty
 
+        # 2. Ambil seluruh produk dalam satu query $in, validasi di memori
+        products = resolve_products(db, quantities)
+        for product_id, qty in quantities.items():
+            product = products.get(product_id)
+            if not product:
+                return response(False, f"Produk {product_id} tidak ditemukan.", code=404)
+            stock = int(product.get("stock", 0))
             if stock < qty:
                 return response(
                     False,
@@ -308,14 +358,14 @@ def create_sales_batch():
                     None,
                     400
                 )
-            new_stock = stock - qty           
-
-            db["master_product"].update_one(
-                {"_id": product["_id"]},
-                {"$set": {"stock": new_stock, "updated_at": datetime.utcnow()}}
-            )
 
+        now = datetime.now()  # jam yang sama dengan create_sale (filter from/to memakai tanggal lokal)
+        sales_docs = []
+        for i in items:
+            product = products[i["product_id"]]
+            qty = int(i.get("quantity", 0))
             sales_docs.append({
+                "_id": ObjectId(),
                 "product_id": product["_id"],
                 "product_name": product["name"],
                 "quantity": qty,
@@ -323,20 +373,50 @@ def create_sales_batch():
                 "total_price": product["sale_price"] * qty,
                 "customer_name": customer,
                 "created_by": session.get("username", "unknown"),
-                "created_at": datetime.utcnow(),
-                "store_id": i.get("store_name"),  
-                "store_name": i.get("store_name"),
+                "created_at": now,
+                "store_id": product.get("store_id"),
+                "store_name": product.get("store_name", i.get("store_name")),
             })
 
+        def movement(db_session):
+            # 3. Satu bulk_write ordered dengan guard; gagal satu → semua dikembalikan
+            adjust_stock_many(
+                db, {pid: -qty for pid, qty in quantities.items()}, session=db_session,
+            )
+
+            # 4. Simpan transaksi; jika gagal, baris yang sempat tersimpan
+            #    dihapus lalu stok dikembalikan (kompensasi manual hanya di
+            #    luar mode transaksi; insert_many ordered bisa gagal di tengah)
+            try:
+                db["sales"].insert_many(sales_docs, session=db_session)
+            except Exception:
+                if db_session is None:
+                    db["sales"].delete_many({"_id": {"$in": [doc["_id"] for doc in sales_docs]}})
+                    adjust_stock_many(db, quantities)
+                raise
 
-        if sales_docs:
-            db["sales"].insert_many(sales_docs)
+        try:
+            run_movement(db, movement)
+        except ProductNotFound as e:
+            return response(False, f"Produk {e.sku} tidak ditemukan.", code=404)
+        except InsufficientStock as e:
+            return response(
+                False,
+                f"Stok {e.product.get('name', e.product['_id'])} hanya tersisa {e.available}, tidak mencukupi.",
+                None,
+                400
+            )
+        except StockError as e:
+            return response(False, str(e), None, e.code)
 
+        touched_stores = {p.get("store_id") for p in products.values()}
+        mark_stale(*touched_stores)
+        bump_version(db, "master_product", *touched_stores)
         return response(True, "Transaksi POS berhasil disimpan.", None, 201)
 
     except Exception as e:
         current_app.logger.error(f"[ERROR] create_sales_batch: {e}")
-        return response(False, f"Terjadi kesalahan server: {str(e)}", 500)
+        return response(False, f"Terjadi kesalahan server: {str(e)}", code=500)
 
 
 # =====================================================
@@ -356,10 +436,9 @@ def delete_sale(sale_id):
         1. Validasi admin menggunakan `check_admin()`.
         2. Validasi format ObjectId.
         3. Ambil data transaksi dari koleksi `sales`.
-        4. Jika transaksi ditemukan:
-            - Ambil `product_id` dan `quantity`.
-            - Tambahkan kembali stok ke `master_product`.
-        5. Hapus transaksi dari koleksi `sales`.
+        4. Hapus transaksi dari koleksi `sales`.
+        5. Hanya jika baris benar-benar terhapus oleh request ini,
+           tambahkan kembali `quantity` ke stok `master_product`.
         
     Args:
         sale_id (str):
@@ -384,19 +463,26 @@ def delete_sale(sale_id):
         product_id = sale["product_id"]
         quantity = int(sale["quantity"])
 
-        product = db["master_product"].find_one({"_id": product_id})
-        if product:
-            current_stock = int(product.get("stock", 0))
-            new_stock = current_stock + quantity
-
-            db["master_product"].update_one(
-                {"_id": product_id},
-                {"$set": {"stock": new_stock, "updated_at": datetime.utcnow()}}
-                )
-
-        db["sales"].delete_one({"_id": ObjectId(sale_id)})
-
-        return response(True, "Transaksi dihapus & stok berhasil dikembalikan.", 200)
+        def movement(db_session):
+            # Hapus transaksi lebih dulu: hanya request yang benar-benar menghapus
+            # baris ini yang boleh mengembalikan stok (hapus ganda bersamaan aman)
+            result = db["sales"].delete_one({"_id": ObjectId(sale_id)}, session=db_session)
+            if result.deleted_count != 1:
+                return False
+            try:
+                product, _, _ = adjust_stock(db, product_id, quantity, session=db_session)
+            except ProductNotFound:
+                product = None  # produk sudah dihapus; transaksi tetap boleh dihapus
+            return product
+
+        product = run_movement(db, movement)
+        if product is False:
+            return response(False, "Transaksi tidak ditemukan.", code=404)
+
+        store_id = product.get("store_id") if product else sale.get("store_id")
+        mark_stale(store_id)
+        bump_version(db, "master_product", store_id)
+        return response(True, "Transaksi dihapus & stok berhasil dikembalikan.", code=200)
 
     except Exception as e:
         current_app.logger.error(f"[ERROR] delete_sale: {e}")
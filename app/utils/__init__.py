@@ -1,2 +1,2 @@
-from .mongo_connection import MongoConnection
+from .mongo_connection import MongoConnection, get_client, pool_stats
 from .sessions_manager import SessionManager
\ No newline at end of file
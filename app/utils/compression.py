@@ -0,0 +1,116 @@
+"""
+compression.py
+=====================================================
+Kompresi Response (gzip / brotli) sebagai Layer after_request
+=====================================================
+
+Response daftar (/api/products, /api/product_masuk, /api/products_keluar,
+/api/sales) berisi JSON yang sangat repetitif (`store_name`,
+`purchase_price`, ... di setiap baris) sehingga terkompresi 5-10x.
+
+Aturan:
+- Encoding dinegosiasikan dari header `Accept-Encoding` (nilai q
+  dihormati): `br` jika paket `brotli` terpasang, selain itu `gzip`.
+- Hanya mimetype di COMPRESSION_MIMETYPES; SSE (text/event-stream),
+  file statis, dan ekspor .gz tidak disentuh.
+- Response biasa dikompres jika ukurannya >= COMPRESSION_MIN_BYTES.
+- Response streaming dikompres chunk demi chunk (setiap chunk di-flush
+  agar klien tetap menerima data secara bertahap).
+- 304 Not Modified langsung dilewati tanpa kompresi; hanya header
+  `Vary: Accept-Encoding` yang ditambahkan.
+- ETag kuat diubah menjadi weak karena byte body berubah per encoding,
+  sedangkan isi datanya tetap sama. ETag weak dari `versions` tetap
+  cocok dengan `If-None-Match` apa pun encoding-nya.
+=====================================================
+"""
+
+import zlib
+from flask import request
+from config import (
+    COMPRESSION_BROTLI_QUALITY,
+    COMPRESSION_GZIP_LEVEL,
+    COMPRESSION_MIMETYPES,
+    COMPRESSION_MIN_BYTES,
+)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli opsional
+    brotli = None
+
+
+ENCODINGS = ["br", "gzip"] if brotli else ["gzip"]
+
+
+def _compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=COMPRESSION_BROTLI_QUALITY)
+    compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _compress_stream(chunks, encoding):
+    """Kompres iterator bytes; setiap chunk di-flush agar tetap streaming."""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=COMPRESSION_BROTLI_QUALITY)
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+        process, finish = compressor.compress, compressor.flush
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            out = process(chunk) + flush()
+            if out:
+                yield out
+        yield finish()
+    finally:
+        # Tutup generator asli (stream_with_context, cursor MongoDB)
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
+
+
+def compress_response(resp):
+    """Hook after_request: kompres response jika memenuhi syarat."""
+    if resp.status_code == 304:
+        resp.vary.add("Accept-Encoding")
+        return resp
+
+    if (
+        resp.status_code < 200
+        or resp.status_code == 204
+        or request.method == "HEAD"
+        or resp.direct_passthrough
+        or "Content-Encoding" in resp.headers
+        or resp.mimetype not in COMPRESSION_MIMETYPES
+    ):
+        return resp
+
+    resp.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(ENCODINGS)
+    if not encoding:
+        return resp
+
+    if resp.is_streamed:
+        resp.response = _compress_stream(resp.response, encoding)
+        resp.headers.pop("Content-Length", None)
+    else:
+        data = resp.get_data()
+        if len(data) < COMPRESSION_MIN_BYTES:
+            return resp
+        resp.set_data(_compress(data, encoding))
+
+    resp.headers["Content-Encoding"] = encoding
+    etag, weak = resp.get_etag()
+    if etag and not weak:
+        resp.set_etag(etag, weak=True)
+    return resp
+
+
+def init_compression(app):
+    """Pasang layer kompresi pada aplikasi."""
+    app.after_request(compress_response)
@@ -0,0 +1,115 @@
+"""
+dashboard_cache.py
+=====================================================
+Snapshot Dashboard per Toko (In-Process, Single-Flight)
+=====================================================
+
+Hasil perhitungan widget dashboard (summary, pie kategori, status stok,
+supplier, penjualan terbaru, alert) disimpan sebagai satu snapshot per
+toko dan satu untuk "all".
+
+- Route yang mengubah stok / transaksi memanggil `mark_stale(store_id)`
+  sehingga snapshot toko tersebut dan "all" dianggap basi.
+- Snapshot dihitung ulang secara lazy saat diminta; hanya satu request
+  yang menghitung (single-flight), request lain menunggu hasilnya.
+- Snapshot juga dianggap basi setelah DASHBOARD_SNAPSHOT_MAX_AGE_SECONDS
+  (menutup perubahan dari worker lain atau langsung ke database).
+- Umur snapshot (`age`) dikembalikan agar frontend bisa menampilkan
+  kapan data terakhir diperbarui.
+- Listener (misalnya stream SSE) dapat didaftarkan lewat
+  `add_stale_listener` untuk diberi tahu setiap kali snapshot basi.
+=====================================================
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from config import DASHBOARD_SNAPSHOT_MAX_AGE_SECONDS, DASHBOARD_SNAPSHOT_MAX_STORES
+
+
+ALL_STORES = "all"
+
+_snapshots = OrderedDict()   # key -> {"data", "generated_at", "generation"}
+_generations = {}            # key -> counter, naik setiap mark_stale
+_locks = {}                  # key -> Lock untuk single-flight
+_global_lock = threading.Lock()
+_listeners = []              # callable(keys) dipanggil setelah mark_stale
+
+
+def store_key(store_id):
+    """Normalisasi store_id menjadi key snapshot ("all" untuk semua toko)."""
+    if not store_id or str(store_id).lower() == ALL_STORES:
+        return ALL_STORES
+    return str(store_id)
+
+
+def mark_stale(*store_ids):
+    """
+    Tandai snapshot toko terkait (dan "all") sebagai basi.
+    Tanpa argumen → seluruh snapshot dianggap basi.
+    """
+    with _global_lock:
+        if not store_ids:
+            keys = list(_generations.keys() | _snapshots.keys())
+        else:
+            keys = {store_key(s) for s in store_ids if s} | {ALL_STORES}
+        for key in keys:
+            _generations[key] = _generations.get(key, 0) + 1
+
+    for listener in _listeners:
+        try:
+            listener(keys)
+        except Exception as e:
+            print(f"[DashboardCache] Listener error: {e}")
+
+
+def add_stale_listener(listener):
+    """Daftarkan fungsi `listener(keys)` yang dipanggil setiap mark_stale."""
+    _listeners.append(listener)
+
+
+def _is_fresh(snapshot, key):
+    if not snapshot:
+        return False
+    if snapshot["generation"] != _generations.get(key, 0):
+        return False
+    return time.time() - snapshot["generated_at"] < DASHBOARD_SNAPSHOT_MAX_AGE_SECONDS
+
+
+def get_snapshot(store_id, builder):
+    """
+    Ambil snapshot toko; hitung ulang dengan `builder(store_key)` jika basi.
+
+    Args:
+        store_id (str): ID toko atau "all".
+        builder (callable): Fungsi yang mengembalikan dict data widget.
+
+    Returns:
+        tuple: (data, age_in_seconds, generated_at_epoch)
+    """
+    key = store_key(store_id)
+
+    snapshot = _snapshots.get(key)
+    if not _is_fresh(snapshot, key):
+        with _global_lock:
+            lock = _locks.setdefault(key, threading.Lock())
+
+        with lock:
+            # Cek ulang: mungkin request lain sudah selesai menghitung
+            snapshot = _snapshots.get(key)
+            if not _is_fresh(snapshot, key):
+                generation = _generations.get(key, 0)
+                snapshot = {
+                    "data": builder(key),
+                    "generated_at": time.time(),
+                    "generation": generation,
+                }
+                with _global_lock:
+                    _snapshots[key] = snapshot
+                    _snapshots.move_to_end(key)
+                    while len(_snapshots) > DASHBOARD_SNAPSHOT_MAX_STORES:
+                        old_key, _ = _snapshots.popitem(last=False)
+                        _locks.pop(old_key, None)
+
+    age = round(time.time() - snapshot["generated_at"], 1)
+    return snapshot["data"], age, snapshot["generated_at"]
@@ -0,0 +1,215 @@
+"""
+dashboard_stream.py
+=====================================================
+Server-Sent Events (SSE) untuk Dashboard & Alert Stok
+=====================================================
+
+Hub in-process yang mengirim perubahan (delta) dashboard ke seluruh
+browser yang berlangganan per toko.
+
+Alur:
+1. Route yang mengubah stok memanggil `mark_stale(store_id)`
+   (lihat `dashboard_cache`), yang memberi tahu hub ini.
+2. Hub menghitung ulang snapshot SEKALI per toko yang punya pelanggan
+   (bukan satu query per client), lalu membandingkan dengan snapshot
+   terakhir yang sudah dikirim.
+3. Delta dikirim ke antrian setiap pelanggan toko tersebut:
+   - summary       : counter yang berubah
+   - stock_status  : counter status stok yang berubah
+   - recent_sales  : entri penjualan baru
+   - alert         : produk yang masuk / keluar dari daftar alert
+   - category_pie, supplier_summary : data lengkap jika berubah
+
+Cocok dengan worker eventlet: antrian & thread menjadi green thread.
+=====================================================
+"""
+
+import json
+import queue
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .dashboard_cache import get_snapshot, store_key
+from config import SSE_KEEPALIVE_SECONDS, SSE_QUEUE_SIZE, DASHBOARD_SNAPSHOT_MAX_AGE_SECONDS
+
+
+def format_event(event, data):
+    """Format satu pesan SSE."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _alert_delta(old, new):
+    # Bandingkan per _id lewat dict (O(n + m)), bukan `p not in old`
+    old_by_id = {p["_id"]: p for p in old}
+    new_ids = {p["_id"] for p in new}
+    entered = [p for p in new if p["_id"] not in old_by_id]
+    left = sorted(old_by_id.keys() - new_ids)
+    changed = [
+        p for p in new
+        if p["_id"] in old_by_id and old_by_id[p["_id"]] != p
+    ]
+    return {"entered": entered, "left": left, "changed": changed}
+
+
+def diff_snapshot(old, new):
+    """
+    Bandingkan dua snapshot dashboard dan kembalikan daftar event delta.
+
+    Returns:
+        list: [(nama_event, data), ...]
+    """
+    events = []
+
+    for widget in ("summary", "stock_status"):
+        changed = {
+            k: v for k, v in new[widget].items()
+            if old[widget].get(k) != v
+        }
+        if changed:
+            events.append((widget, changed))
+
+    new_sales = [s for s in new["recent_sales"] if s not in old["recent_sales"]]
+    if new_sales:
+        events.append(("recent_sales", new_sales))
+
+    alert = _alert_delta(old["alert"], new["alert"])
+    if alert["entered"] or alert["left"] or alert["changed"]:
+        events.append(("alert", alert))
+
+    for widget in ("category_pie", "supplier_summary"):
+        if new[widget] != old[widget]:
+            events.append((widget, new[widget]))
+
+    return events
+
+
+class DashboardStream:
+    """
+    Hub fan-out SSE per toko.
+
+    Attributes:
+        builder (callable): Fungsi pembangun snapshot (dipanggil dalam app context).
+    """
+
+    def __init__(self, builder):
+        self.builder = builder
+        self._app = None
+        self._subscribers = {}      # key -> set(Queue)
+        self._baseline = {}         # key -> (data, generated_at) terakhir yang dikirim
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._pending = set()       # perubahan yang datang saat refresh berjalan
+        self._executor = ThreadPoolExecutor(max_workers=2)
+
+    # --------------------------------------------------
+    # Langganan
+    # --------------------------------------------------
+    def subscribe(self, app, store_id):
+        """
+        Daftarkan pelanggan baru.
+
+        Returns:
+            tuple: (key, Queue, snapshot awal)
+        """
+        self._app = app
+        key = store_key(store_id)
+        q = queue.Queue(maxsize=SSE_QUEUE_SIZE)
+
+        with self._lock:
+            baseline = self._baseline.get(key)
+        if baseline is None:
+            data, _, generated_at = get_snapshot(key, self.builder)
+            with self._lock:
+                baseline = self._baseline.setdefault(key, (data, generated_at))
+
+        with self._lock:
+            self._subscribers.setdefault(key, set()).add(q)
+        return key, q, baseline[0]
+
+    def unsubscribe(self, key, q):
+        with self._lock:
+            subs = self._subscribers.get(key)
+            if subs:
+                subs.discard(q)
+                if not subs:
+                    del self._subscribers[key]
+                    self._baseline.pop(key, None)
+
+    # --------------------------------------------------
+    # Publikasi perubahan
+    # --------------------------------------------------
+    def publish(self, keys):
+        """Dipanggil oleh `mark_stale`; jadwalkan refresh toko yang punya pelanggan."""
+        with self._lock:
+            keys = [k for k in keys if k in self._subscribers]
+            self._pending.update(k for k in keys if k in self._refreshing)
+            targets = [k for k in keys if k not in self._refreshing]
+            self._refreshing.update(targets)
+        for key in targets:
+            self._executor.submit(self._refresh, key)
+
+    def maybe_refresh(self, key):
+        """Refresh berkala untuk menangkap perubahan dari worker lain."""
+        with self._lock:
+            baseline = self._baseline.get(key)
+        if baseline and time.time() - baseline[1] >= DASHBOARD_SNAPSHOT_MAX_AGE_SECONDS:
+            self.publish([key])
+
+    def _refresh(self, key):
+        try:
+            with self._app.app_context():
+                data, _, generated_at = get_snapshot(key, self.builder)
+        except Exception as e:
+            print(f"[DashboardStream] Gagal refresh snapshot '{key}': {e}")
+            data = None
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+                rerun = key in self._pending
+                self._pending.discard(key)
+            if rerun:
+                self.publish([key])
+
+        if data is None:
+            return
+
+        with self._lock:
+            old = self._baseline.get(key)
+            self._baseline[key] = (data, generated_at)
+            subscribers = list(self._subscribers.get(key, ()))
+
+        events = diff_snapshot(old[0], data) if old else [("snapshot", data)]
+        if not events:
+            return
+
+        payload = "".join(format_event(name, body) for name, body in events)
+        for q in subscribers:
+            try:
+                q.put_nowait(payload)
+            except queue.Full:
+                # Client terlalu lambat → buang antrian, kirim snapshot penuh
+                while not q.empty():
+                    try:
+                        q.get_nowait()
+                    except queue.Empty:
+                        break
+                q.put_nowait(format_event("snapshot", {"store_id": key, **data}))
+
+    # --------------------------------------------------
+    # Generator SSE
+    # --------------------------------------------------
+    def stream(self, app, store_id):
+        """Generator pesan SSE untuk satu client."""
+        key, q, initial = self.subscribe(app, store_id)
+        try:
+            yield "retry: 5000\n\n"
+            yield format_event("snapshot", {"store_id": key, **initial})
+            while True:
+                try:
+                    yield q.get(timeout=SSE_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    self.maybe_refresh(key)
+                    yield ": ping\n\n"
+        finally:
+            self.unsubscribe(key, q)
@@ -0,0 +1,135 @@
+"""
+delta_sync.py
+=====================================================
+Delta Sync Produk (Perubahan + Tombstone sejak Cursor)
+=====================================================
+
+POS dan dashboard produk menyimpan salinan katalog di sisi klien. Alih-
+alih mengambil ulang seluruh /api/products, klien cukup meminta
+perubahan sejak cursor terakhir:
+
+    GET /api/products/changes?since=<cursor>
+
+- Perubahan : setiap update `master_product` men-set `updated_at` ke
+              waktu server ($$NOW, lihat `stock_update` dan
+              `stock_service`), insert produk baru men-set `updated_at`
+              ke `datetime.utcnow()`. Query memakai index
+              (updated_at, _id).
+- Penghapusan: `delete_product` dan `delete_product_masuk` mencatat
+              tombstone di koleksi `product_tombstones`
+              {sku, store_id, deleted_at}. Tombstone dihapus otomatis
+              oleh TTL index setelah TOMBSTONE_RETENTION_DAYS.
+
+Cursor (opaque) menyimpan posisi kedua aliran:
+
+    [updated_at, sku, deleted_at, tombstone_id]
+
+Hanya perubahan yang lebih lama dari DELTA_SYNC_LAG_SECONDS yang
+dikirim, agar write yang timestamp-nya sudah dibuat tetapi belum
+commit (transaksi, replikasi) tidak terlewat oleh cursor.
+
+Cursor yang lebih tua dari masa simpan tombstone tidak bisa dipakai
+lagi (penghapusan mungkin sudah hilang); response membawa
+`meta.reset = true` dan klien wajib memuat ulang katalog penuh.
+=====================================================
+"""
+
+from collections import namedtuple
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ASCENDING
+from config import DELTA_SYNC_LAG_SECONDS, TOMBSTONE_RETENTION_DAYS
+
+from .pagination import decode_cursor, encode_cursor, keyset_filter
+
+
+Changes = namedtuple("Changes", ["changed", "deleted", "next_cursor", "has_more", "reset"])
+
+PRODUCT_SORT = [("updated_at", ASCENDING), ("_id", ASCENDING)]
+TOMBSTONE_SORT = [("deleted_at", ASCENDING), ("_id", ASCENDING)]
+
+# _id terkecil per tipe: posisi "awal" pada timestamp tertentu
+_MIN_SKU = ""
+_MIN_OBJECT_ID = ObjectId("0" * 24)
+
+
+def record_tombstone(db, sku, store_id=None, session=None):
+    """
+    Catat penghapusan produk agar klien delta sync ikut menghapusnya.
+    Dipanggil di dalam movement yang sama dengan `delete_one` produk.
+    """
+    db["product_tombstones"].insert_one(
+        {"sku": sku, "store_id": store_id, "deleted_at": datetime.utcnow()},
+        session=session,
+    )
+
+
+def _settled_at():
+    return datetime.utcnow() - timedelta(seconds=DELTA_SYNC_LAG_SECONDS)
+
+
+def start_cursor(at=None):
+    """Cursor yang dimulai pada waktu `at` (default: batas settle sekarang)."""
+    at = at or _settled_at()
+    return encode_cursor([at, _MIN_SKU, at, _MIN_OBJECT_ID])
+
+
+def _stream(collection, query, sort, position, settled, limit, min_id, projection=None):
+    """Ambil satu halaman satu aliran (produk / tombstone) sampai batas settle."""
+    time_field = sort[0][0]
+    bounded = {"$and": [query, keyset_filter(sort, position), {time_field: {"$lt": settled}}]}
+    docs = list(collection.find(bounded, projection).sort(sort).limit(limit + 1))
+
+    if len(docs) > limit:
+        docs = docs[:limit]
+        return docs, [docs[-1][time_field], docs[-1]["_id"]], True
+    # Seluruh perubahan sebelum `settled` sudah terkirim
+    return docs, [settled, min_id], False
+
+
+def changes_since(db, cursor, limit, store_id=None, projection=None):
+    """
+    Ambil produk yang berubah dan SKU yang dihapus sejak `cursor`.
+
+    Args:
+        db (Database): Database aktif.
+        cursor (str): Cursor `next` dari response sebelumnya.
+        limit (int): Maksimum dokumen per aliran.
+        store_id (str, optional): Batasi ke satu toko.
+        projection (dict, optional): Projection field produk
+            (harus menyertakan `updated_at`).
+
+    Returns:
+        Changes: (changed, deleted, next_cursor, has_more, reset).
+
+    Raises:
+        ValueError: Jika cursor tidak valid.
+    """
+    values = decode_cursor(cursor)
+    if len(values) != 4 or not (isinstance(values[0], datetime) and isinstance(values[2], datetime)):
+        raise ValueError("cursor tidak valid")
+    # json_util bisa mengembalikan datetime ber-tz (UTC); samakan dengan utcnow()
+    values[0], values[2] = (v.replace(tzinfo=None) for v in (values[0], values[2]))
+
+    settled = _settled_at()
+    oldest = datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS)
+    if min(values[0], values[2]) < oldest:
+        return Changes([], [], start_cursor(settled), False, True)
+
+    query = {"store_id": store_id} if store_id else {}
+
+    changed, product_pos, more_products = _stream(
+        db["master_product"], query, PRODUCT_SORT, values[:2], settled, limit, _MIN_SKU, projection,
+    )
+    tombstones, tomb_pos, more_tombstones = _stream(
+        db["product_tombstones"], query, TOMBSTONE_SORT, values[2:], settled, limit, _MIN_OBJECT_ID,
+        {"sku": 1, "deleted_at": 1},
+    )
+
+    return Changes(
+        changed,
+        [t["sku"] for t in tombstones],
+        encode_cursor(product_pos + tomb_pos),
+        more_products or more_tombstones,
+        False,
+    )
@@ -0,0 +1,182 @@
+"""
+export_stream.py
+=====================================================
+Ekspor Data Streaming (CSV / NDJSON, Opsional gzip)
+=====================================================
+
+Endpoint daftar membangun seluruh hasil sebagai list Python sebelum
+`jsonify`, sehingga memori naik seiring jumlah baris. Ekspor memakai
+generator:
+
+    Mongo cursor (batch_size) → encoder CSV/NDJSON → [gzip] → response
+
+- Dokumen dibaca per batch EXPORT_BATCH_SIZE dari server.
+- Baris di-encode dan dikirim setiap EXPORT_FLUSH_ROWS baris.
+- Kompresi gzip dilakukan per chunk (`zlib.compressobj`), tanpa
+  menyimpan file utuh.
+
+Sehingga memori worker tetap konstan berapa pun jumlah barisnya.
+
+Dataset yang tersedia didefinisikan di `EXPORTS`:
+    {nama: {collection, time_field, sort, base_query, columns}}
+=====================================================
+"""
+
+import csv
+import io
+import zlib
+from datetime import datetime
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from pymongo import ASCENDING
+from config import EXPORT_BATCH_SIZE, EXPORT_FLUSH_ROWS, EXPORT_GZIP_LEVEL
+
+from .json_provider import dumps_bytes
+
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+EXPORTS = {
+    "products": {
+        "collection": "master_product",
+        "time_field": "created_at",
+        "sort": [("_id", ASCENDING)],
+        "base_query": {},
+        "columns": [
+            "_id", "name", "category", "stock", "min_stock", "stock_state",
+            "purchase_price", "sale_price", "supplier", "store_id", "store_name",
+            "city", "location", "created_at", "updated_at",
+        ],
+    },
+    "product_masuk": {
+        "collection": "master_supplier",
+        "time_field": "tanggal",
+        "sort": [("tanggal", ASCENDING), ("_id", ASCENDING)],
+        "base_query": {},
+        "columns": [
+            "_id", "tanggal", "product_sku", "name", "supplier", "jumlah",
+            "purchase_price", "stock_before", "stock_after", "type",
+            "store_id", "store_name", "city", "notes",
+        ],
+    },
+    "products_keluar": {
+        "collection": "master_supplier_out",
+        "time_field": "tanggal",
+        "sort": [("tanggal", ASCENDING), ("_id", ASCENDING)],
+        "base_query": {"type": {"$ne": "restock"}},
+        "columns": [
+            "_id", "tanggal", "product_sku", "name", "type", "jumlah",
+            "stock_before", "stock_after", "store_id", "store_name",
+            "harga_jual", "total_harga", "nama_pelanggan", "tujuan_pengiriman",
+            "nama_penerima", "no_surat_jalan", "keterangan",
+        ],
+    },
+    "sales": {
+        "collection": "sales",
+        "time_field": "created_at",
+        "sort": [("created_at", ASCENDING), ("_id", ASCENDING)],
+        "base_query": {},
+        "columns": [
+            "_id", "created_at", "product_id", "product_name", "category",
+            "quantity", "sale_price", "total_price", "customer_name", "notes",
+            "store_id", "store_name", "created_by",
+        ],
+    },
+}
+
+
+def _cell(value):
+    """Nilai sel CSV: tanggal ISO tanpa mikrodetik, None → kosong."""
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ", timespec="seconds")
+    if isinstance(value, (ObjectId, Decimal128)):
+        return str(value)
+    return value
+
+
+def _csv_chunks(docs, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for i, doc in enumerate(docs, 1):
+        writer.writerow([_cell(doc.get(c)) for c in columns])
+        if i % EXPORT_FLUSH_ROWS == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue().encode()
+
+
+def _ndjson_chunks(docs, columns):
+    lines = []
+    for doc in docs:
+        lines.append(dumps_bytes({c: doc[c] for c in columns if c in doc}))
+        if len(lines) >= EXPORT_FLUSH_ROWS:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+def gzip_chunks(chunks, level=EXPORT_GZIP_LEVEL):
+    """Kompres iterator bytes menjadi stream gzip, chunk demi chunk."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = format gzip
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def export_query(dataset, store_id=None, time_range=None, extra=None):
+    """
+    Bangun filter ekspor dari filter dasar dataset.
+
+    Args:
+        dataset (str): Kunci `EXPORTS`.
+        store_id (str, optional): ID toko ("all" = semua).
+        time_range (dict, optional): Hasil `parse_date_range()`.
+        extra (dict, optional): Filter tambahan, contoh {"type": "penjualan"}.
+    """
+    spec = EXPORTS[dataset]
+    query = dict(spec["base_query"])
+    if store_id and store_id != "all":
+        query["store_id"] = store_id
+    if time_range:
+        query[spec["time_field"]] = time_range
+    if extra:
+        query.update(extra)
+    return query
+
+
+def stream_export(db, dataset, query, fmt="csv", compress=False):
+    """
+    Generator bytes hasil ekspor satu dataset.
+
+    Args:
+        db (Database): Database aktif.
+        dataset (str): Kunci `EXPORTS`.
+        query (dict): Filter dari `export_query()`.
+        fmt (str): "csv" atau "ndjson".
+        compress (bool): Bungkus output dalam gzip.
+
+    Yields:
+        bytes: Potongan file ekspor.
+    """
+    spec = EXPORTS[dataset]
+    columns = spec["columns"]
+    cursor = (
+        db[spec["collection"]]
+        .find(query, {c: 1 for c in columns})
+        .sort(spec["sort"])
+        .batch_size(EXPORT_BATCH_SIZE)
+    )
+    try:
+        chunks = (_csv_chunks if fmt == "csv" else _ndjson_chunks)(cursor, columns)
+        if compress:
+            chunks = gzip_chunks(chunks)
+        yield from chunks
+    finally:
+        cursor.close()
@@ -0,0 +1,176 @@
+"""
+indexes.py
+=====================================================
+Registry Index MongoDB (Deklaratif)
+=====================================================
+
+Seluruh index yang dibutuhkan route didefinisikan di satu tempat
+(`INDEXES`) lalu diterapkan sekali saat startup aplikasi atau lewat
+perintah CLI:
+
+    flask db ensure-indexes
+    flask db check-indexes
+
+Sifat:
+- Idempotent  : index yang sudah sesuai tidak dibuat ulang.
+- Drift report: index yang hilang, berbeda opsi, atau tidak terdaftar
+                di registry dilaporkan tanpa dihapus otomatis.
+
+=====================================================
+Format Registry
+-----------------------------------------------------
+INDEXES[<database>][<collection>] = [
+    ([(field, arah), ...], {opsi create_index}),
+]
+
+<database> adalah "main" (MONGODB_DATABASE_NAME) atau
+"auth" (MONGO_AUTH_DATABASE).
+=====================================================
+"""
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+from config import TOMBSTONE_RETENTION_DAYS
+
+
+INDEXES = {
+    "main": {
+        "master_product": [
+            ([("store_id", ASCENDING), ("_id", ASCENDING)], {}),
+            ([("category", ASCENDING), ("_id", ASCENDING)], {}),
+            ([("store_id", ASCENDING), ("stock_state", ASCENDING)], {}),
+            ([("stock_state", ASCENDING)], {}),
+            ([("product_sku", ASCENDING)], {"sparse": True}),
+            ([("updated_at", ASCENDING), ("_id", ASCENDING)], {}),
+            ([("store_id", ASCENDING), ("updated_at", ASCENDING), ("_id", ASCENDING)], {}),
+            (
+                [("store_id", ASCENDING), ("name_key", ASCENDING)],
+                {"unique": True, "partialFilterExpression": {"name_key": {"$type": "string"}}},
+            ),
+            ([("name_key", ASCENDING), ("_id", ASCENDING)], {}),
+        ],
+        "master_supplier": [
+            ([("tanggal", DESCENDING), ("_id", DESCENDING)], {}),
+            ([("store_id", ASCENDING), ("tanggal", DESCENDING), ("_id", DESCENDING)], {}),
+            ([("supplier", ASCENDING)], {}),
+            ([("name_key", ASCENDING), ("tanggal", DESCENDING)], {}),
+            ([("supplier_key", ASCENDING), ("tanggal", DESCENDING)], {}),
+        ],
+        "master_supplier_out": [
+            ([("type", ASCENDING), ("tanggal", DESCENDING), ("_id", DESCENDING)], {}),
+            ([("tanggal", DESCENDING), ("_id", DESCENDING)], {}),
+            ([("store_id", ASCENDING), ("tanggal", DESCENDING), ("_id", DESCENDING)], {}),
+            ([("name_key", ASCENDING), ("tanggal", DESCENDING)], {}),
+        ],
+        "sales": [
+            ([("created_at", DESCENDING), ("_id", DESCENDING)], {}),
+            ([("store_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], {}),
+        ],
+        "product_tombstones": [
+            ([("deleted_at", ASCENDING), ("_id", ASCENDING)], {}),
+            ([("store_id", ASCENDING), ("deleted_at", ASCENDING), ("_id", ASCENDING)], {}),
+            ([("deleted_at", ASCENDING)], {"expireAfterSeconds": TOMBSTONE_RETENTION_DAYS * 86400}),
+        ],
+        "master_karyawan": [
+            ([("username", ASCENDING)], {}),
+        ],
+    },
+    "auth": {
+        "sessions": [
+            ([("token", ASCENDING)], {}),
+            ([("username", ASCENDING)], {}),
+            ([("expires_at", ASCENDING)], {"expireAfterSeconds": 0}),
+        ],
+        "login_attempts": [
+            ([("username", ASCENDING)], {}),
+        ],
+        "password_resets": [
+            ([("token", ASCENDING)], {}),
+        ],
+    },
+}
+
+# Opsi yang dibandingkan saat mendeteksi drift
+_COMPARED_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression", "collation")
+
+
+def index_name(keys):
+    """Nama index standar MongoDB, contoh: store_id_1_tanggal_-1."""
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+def _databases(db, auth_db):
+    return {"main": db, "auth": auth_db}
+
+
+def _compare(spec_keys, spec_options, existing):
+    """Bandingkan satu index terdaftar dengan index di database."""
+    if [tuple(k) for k in existing.get("key", [])] != [tuple(k) for k in spec_keys]:
+        return "key berbeda"
+    for option in _COMPARED_OPTIONS:
+        if existing.get(option) != spec_options.get(option):
+            return f"opsi '{option}' berbeda ({existing.get(option)} != {spec_options.get(option)})"
+    return None
+
+
+def check_indexes(db, auth_db):
+    """
+    Membandingkan registry dengan index yang ada di database.
+
+    Returns:
+        dict: {"missing": [...], "conflict": [...], "extra": [...]}
+              Setiap item berbentuk "<db>.<collection>.<index_name>[: alasan]".
+    """
+    report = {"missing": [], "conflict": [], "extra": []}
+
+    for db_key, collections in INDEXES.items():
+        database = _databases(db, auth_db)[db_key]
+        for coll_name, specs in collections.items():
+            existing = database[coll_name].index_information()
+            expected = set()
+
+            for keys, options in specs:
+                name = index_name(keys)
+                expected.add(name)
+                label = f"{db_key}.{coll_name}.{name}"
+                if name not in existing:
+                    report["missing"].append(label)
+                    continue
+                reason = _compare(keys, options, existing[name])
+                if reason:
+                    report["conflict"].append(f"{label}: {reason}")
+
+            for name in existing:
+                if name != "_id_" and name not in expected:
+                    report["extra"].append(f"{db_key}.{coll_name}.{name}")
+
+    return report
+
+
+def ensure_indexes(db, auth_db):
+    """
+    Membuat seluruh index di registry yang belum ada (idempotent).
+    Index yang bentrok (nama sama, opsi berbeda) tidak diubah,
+    hanya dilaporkan agar bisa ditangani manual.
+
+    Returns:
+        dict: {"created": [...], "conflict": [...], "extra": [...]}
+    """
+    report = check_indexes(db, auth_db)
+    created = []
+
+    for db_key, collections in INDEXES.items():
+        database = _databases(db, auth_db)[db_key]
+        for coll_name, specs in collections.items():
+            for keys, options in specs:
+                name = index_name(keys)
+                label = f"{db_key}.{coll_name}.{name}"
+                if label not in report["missing"]:
+                    continue
+                try:
+                    database[coll_name].create_index(keys, name=name, **options)
+                    created.append(label)
+                except OperationFailure as e:
+                    report["conflict"].append(f"{label}: {e}")
+
+    return {"created": created, "conflict": report["conflict"], "extra": report["extra"]}
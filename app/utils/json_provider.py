@@ -0,0 +1,82 @@
+"""
+json_provider.py
+=====================================================
+JSON Provider Cepat (orjson) untuk Response API
+=====================================================
+
+Sebelumnya setiap route mengulang hasil query untuk mengubah `_id`
+menjadi string dan `tanggal`/`created_at` menjadi teks sebelum
+`jsonify`, lalu encoder `json` bawaan melakukan pass kedua. Provider
+ini dipasang sebagai `app.json` sehingga `jsonify()` dan
+`validators.response()` meng-encode dokumen MongoDB langsung dalam
+satu pass:
+
+    ObjectId   → "665f1c2e9b1e8a3d4c2f0a11"
+    datetime   → "2025-01-31T14:05:09"   (ISO 8601, tanpa mikrodetik)
+    Decimal128 → "12500.50"              (string, presisi tetap)
+
+Jika `orjson` tidak terpasang, provider memakai encoder bawaan Flask
+dengan aturan konversi yang sama (lebih lambat, hasil identik).
+
+Benchmark:
+
+    flask --app run db bench-json --docs 50000
+=====================================================
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - fallback encoder bawaan
+    orjson = None
+
+
+ORJSON_OPTIONS = (
+    orjson.OPT_OMIT_MICROSECONDS | orjson.OPT_NON_STR_KEYS if orjson else 0
+)
+
+
+def _default(value):
+    """Konversi tipe yang tidak dikenal encoder (dipanggil hanya untuk tipe tersebut)."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.replace(microsecond=0).isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Tipe {type(value).__name__} tidak bisa di-encode ke JSON")
+
+
+def dumps_bytes(obj):
+    """Encode objek ke JSON (bytes UTF-8) dalam satu pass."""
+    if orjson:
+        return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider Flask berbasis orjson dengan dukungan tipe BSON."""
+
+    def dumps(self, obj, **kwargs):
+        return dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
@@ -18,6 +18,7 @@ Fokus penggunaan:
 - Konsisten pada format response (status, message, data)
 - Menghindari duplikasi kode MongoDB pada route / service
 - Konversi otomatis `ObjectId` ke string agar aman untuk JSON
+- Satu `MongoClient` (connection pool) dipakai bersama per proses
 
 =====================================================
 Dependency
@@ -29,7 +30,110 @@ PyMongo:
 =====================================================
 """
 
-from pymongo import MongoClient
+import threading
+from pymongo import MongoClient, monitoring
+from config import (
+    MONGO_MIN_POOL_SIZE,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS
+)
+
+
+# --------------------------------------------------
+# Shared Client (satu pool per proses / worker)
+# --------------------------------------------------
+_clients = {}
+_clients_lock = threading.Lock()
+_stats = {"clients_created": 0, "connections_created": 0, "connections_closed": 0}
+
+
+class _PoolCounter(monitoring.ConnectionPoolListener):
+    """Listener PyMongo untuk menghitung koneksi yang dibuka & ditutup."""
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        _stats["connections_created"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        _stats["connections_closed"] += 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        pass
+
+    def connection_checked_out(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+
+def get_client(connection_string):
+    """
+    Mengambil MongoClient bersama untuk connection string tertentu.
+    Client dibuat (dan di-ping) hanya sekali per proses, selanjutnya
+    seluruh request memakai connection pool yang sama.
+
+    Args:
+        connection_string (str): URI koneksi MongoDB.
+
+    Returns:
+        MongoClient: Client dengan pool yang sudah dikonfigurasi.
+    """
+    client = _clients.get(connection_string)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(connection_string)
+        if client is None:
+            client = MongoClient(
+                connection_string,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                event_listeners=[_PoolCounter()],
+            )
+            try:
+                client.admin.command("ping")  # memastikan koneksi aktif
+            except Exception as error:
+                print(f"[MongoConnection] Error: {error}")
+            _clients[connection_string] = client
+            _stats["clients_created"] += 1
+    return client
+
+
+def pool_stats():
+    """
+    Statistik client & koneksi MongoDB pada worker ini.
+
+    Returns:
+        dict: clients, clients_created, connections_created,
+              connections_closed, connections_open
+    """
+    return {
+        "clients": len(_clients),
+        **_stats,
+        "connections_open": _stats["connections_created"] - _stats["connections_closed"],
+        "min_pool_size": MONGO_MIN_POOL_SIZE,
+        "max_pool_size": MONGO_MAX_POOL_SIZE,
+    }
 
 
 class MongoConnection:
@@ -55,11 +159,10 @@ class MongoConnection:
     # Koneksi Database
     # --------------------------------------------------
     def __getConnection(self):
-        """Membuat koneksi ke MongoDB dan melakukan ping test."""
+        """Memakai client bersama (pool) dan memilih database."""
         try:
-            self.client = MongoClient(self.connection_string)
+            self.client = get_client(self.connection_string)
             self.db = self.client[self.db_name]
-            self.client.admin.command("ping")  # memastikan koneksi aktif
         except Exception as error:
             print(f"[MongoConnection] Error: {error}")
 
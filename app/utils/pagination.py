@@ -0,0 +1,170 @@
+"""
+pagination.py
+=====================================================
+Keyset (Cursor) Pagination untuk Endpoint Daftar
+=====================================================
+
+Alih-alih `skip()` (semakin lambat di halaman belakang) atau mengirim
+seluruh koleksi, endpoint daftar memakai keyset pagination:
+
+- Data diurutkan dengan key unik & stabil, contoh [("_id", 1)] atau
+  [("created_at", -1), ("_id", -1)].
+- Response membawa cursor `next` (opaque, base64) berisi nilai key
+  dokumen terakhir.
+- Request berikutnya mengirim `cursor=<next>`; query lanjut dari posisi
+  tersebut memakai index, tanpa melewati dokumen sebelumnya.
+
+Contoh:
+
+    page = keyset_page(
+        db["master_product"], {"store_id": "S01"}, [("_id", ASCENDING)],
+        limit=50, cursor=request.args.get("cursor"),
+    )
+    return response(True, "OK", page.items, meta={"next": page.next_cursor})
+=====================================================
+"""
+
+import base64
+from collections import namedtuple
+from datetime import datetime, timedelta
+from bson import json_util
+from pymongo import ASCENDING
+
+
+Page = namedtuple("Page", ["items", "next_cursor"])
+
+
+def parse_limit(value, default=50, maximum=500):
+    """
+    Konversi parameter `limit` ke integer dalam rentang 1..maximum.
+
+    Raises:
+        ValueError: Jika limit bukan angka.
+    """
+    if value in (None, ""):
+        return default
+    try:
+        limit = int(value)
+    except (ValueError, TypeError):
+        raise ValueError("limit harus berupa angka")
+    return max(1, min(limit, maximum))
+
+
+def parse_fields(value, allowed, always=("_id",)):
+    """
+    Ubah parameter `fields=a,b,c` menjadi projection MongoDB.
+
+    Field yang tidak ada di `allowed` diabaikan. Field di `always`
+    (key pengurutan) selalu disertakan agar cursor bisa dibuat.
+
+    Returns:
+        dict | None: Projection, atau None jika parameter kosong (semua field).
+    """
+    if not value:
+        return None
+    fields = [f.strip() for f in value.split(",") if f.strip() in allowed]
+    projection = {f: 1 for f in fields}
+    for f in always:
+        projection[f] = 1
+    return projection
+
+
+def parse_date_range(date_from=None, date_to=None):
+    """
+    Ubah parameter `from`/`to` (YYYY-MM-DD) menjadi filter rentang tanggal.
+    Tanggal `to` bersifat inklusif (sampai akhir hari).
+
+    Returns:
+        dict | None: Contoh {"$gte": datetime(...), "$lt": datetime(...)}.
+
+    Raises:
+        ValueError: Jika format tanggal salah.
+    """
+    bounds = {}
+    try:
+        if date_from:
+            bounds["$gte"] = datetime.strptime(date_from, "%Y-%m-%d")
+        if date_to:
+            bounds["$lt"] = datetime.strptime(date_to, "%Y-%m-%d") + timedelta(days=1)
+    except ValueError:
+        raise ValueError("Format tanggal harus YYYY-MM-DD")
+    return bounds or None
+
+
+def encode_cursor(values):
+    """Encode daftar nilai key menjadi string base64 url-safe."""
+    raw = json_util.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Decode cursor dari `encode_cursor()`.
+
+    Raises:
+        ValueError: Jika cursor rusak.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json_util.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError("cursor tidak valid")
+    if not isinstance(values, list):
+        raise ValueError("cursor tidak valid")
+    return values
+
+
+def _get_path(doc, path):
+    for part in path.split("."):
+        doc = doc.get(part) if isinstance(doc, dict) else None
+    return doc
+
+
+def keyset_filter(sort, values):
+    """
+    Bangun filter "setelah posisi cursor" untuk urutan multi-key.
+
+    Untuk sort [(a, -1), (_id, -1)] dan nilai [va, vid]:
+        {"$or": [{a: {"$lt": va}}, {a: va, _id: {"$lt": vid}}]}
+    """
+    if len(values) != len(sort):
+        raise ValueError("cursor tidak valid")
+
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {f: values[j] for j, (f, _) in enumerate(sort[:i])}
+        clause[field] = {"$gt" if direction == ASCENDING else "$lt": values[i]}
+        clauses.append(clause)
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def keyset_page(collection, query, sort, limit, cursor=None, projection=None):
+    """
+    Ambil satu halaman data dengan keyset pagination.
+
+    Args:
+        collection (Collection): Koleksi MongoDB.
+        query (dict): Filter dasar.
+        sort (list): [(field, arah), ...]; key terakhir harus unik (biasanya _id).
+        limit (int): Jumlah dokumen per halaman.
+        cursor (str, optional): Cursor `next` dari halaman sebelumnya.
+        projection (dict, optional): Projection field.
+
+    Returns:
+        Page: (items, next_cursor); next_cursor None jika halaman terakhir.
+
+    Raises:
+        ValueError: Jika cursor tidak valid.
+    """
+    if cursor:
+        after = keyset_filter(sort, decode_cursor(cursor))
+        query = {"$and": [query, after]} if query else after
+
+    docs = list(collection.find(query, projection).sort(sort).limit(limit + 1))
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor([_get_path(docs[-1], f) for f, _ in sort])
+
+    return Page(docs, next_cursor)
@@ -0,0 +1,347 @@
+"""
+product_import.py
+=====================================================
+Impor Massal Barang Masuk (CSV / NDJSON, Streaming)
+=====================================================
+
+Onboarding toko baru lewat POST /api/product_masuk satu per satu
+membutuhkan beberapa round trip per produk. Modul ini memproses file
+impor baris demi baris (file tidak pernah dimuat utuh ke memori) dan
+menulis per chunk IMPORT_CHUNK_SIZE baris:
+
+1. Validasi baris (aturan sama dengan POST /api/product_masuk).
+2. Satu query `$or` mencari produk yang sudah ada lewat unique index
+   (store_id, name_key); baris bernama sama dalam satu chunk digabung.
+3. Nomor SKU produk baru dipesan sekaligus dalam satu blok
+   (`allocate_sku_numbers`).
+4. Produk baru (InsertOne) dan restock (UpdateOne `$inc` + stock_state)
+   ditulis dengan satu `bulk_write(ordered=False)`.
+5. Riwayat `master_supplier` ditulis dengan `bulk_write` kedua.
+
+Baris yang gagal dilaporkan per nomor baris tanpa menghentikan impor.
+Produk yang sedang dibuat request lain (DuplicateKeyError pada name_key)
+diulang sebagai restock.
+
+Catatan:
+- Impor tidak dibungkus transaksi; chunk yang sudah ditulis tetap
+  tersimpan jika impor berhenti di tengah. Menjalankan ulang file yang
+  sama akan menambah stok lagi.
+- `stock_before` / `stock_after` riwayat restock dihitung dari stok saat
+  chunk dibaca.
+
+Format kolom (CSV header / key NDJSON):
+
+    store_id, name, supplier, jumlah, purchase_price,
+    notes, category, sale_price, min_stock   (opsional)
+
+Kolom opsional category/sale_price/min_stock hanya dipakai saat produk
+baru dibuat.
+=====================================================
+"""
+
+import csv
+import json
+from datetime import datetime
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from config import IMPORT_CHUNK_SIZE, IMPORT_MAX_ERRORS
+
+from .search_keys import search_fields, search_key
+from .sku_allocator import allocate_sku_numbers, format_sku
+from .stock_state import compute_stock_state, stock_update
+from .store_registry import store_registry
+from .validators import sanitize, to_int, parse_float
+from .versions import bump_version
+
+
+FORMATS = ("csv", "ndjson")
+DUPLICATE_KEY = 11000
+
+
+class ImportReport:
+    """Ringkasan hasil impor; error dibatasi IMPORT_MAX_ERRORS baris."""
+
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.created = 0
+        self.restocked = 0
+        self.error_count = 0
+        self.errors = []
+        self.store_ids = set()
+
+    def fail(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({"row": line, "error": message})
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "imported": self.imported,
+            "products_created": self.created,
+            "products_restocked": self.restocked,
+            "error_count": self.error_count,
+            "errors": self.errors,
+        }
+
+
+def detect_format(explicit=None, filename=None, mimetype=None):
+    """
+    Tentukan format file dari parameter, ekstensi, atau Content-Type.
+
+    Raises:
+        ValueError: Jika format tidak dikenali.
+    """
+    fmt = (explicit or "").lower()
+    if not fmt and filename:
+        fmt = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if not fmt and mimetype:
+        fmt = {"text/csv": "csv", "application/x-ndjson": "ndjson", "application/jsonl": "ndjson"}.get(mimetype, "")
+    fmt = {"jsonl": "ndjson"}.get(fmt, fmt)
+    if fmt not in FORMATS:
+        raise ValueError("Format impor harus csv atau ndjson")
+    return fmt
+
+
+def iter_rows(stream, fmt):
+    """
+    Baca file teks baris demi baris.
+
+    Yields:
+        tuple: (nomor_baris, dict | None, pesan_error | None)
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f"JSON tidak valid: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield line_no, None, "Baris harus berupa objek JSON"
+            continue
+        yield line_no, row, None
+
+
+def _value(row, field, default):
+    """Nilai kolom; default hanya jika kolom tidak ada / kosong (0 tetap 0)."""
+    value = row.get(field)
+    return default if value is None or value == "" else value
+
+
+def _parse_row(db, row):
+    """Validasi satu baris; ValueError berisi pesan untuk laporan."""
+    store_id = sanitize(row.get("store_id", ""))
+    name = sanitize(row.get("name", ""))
+    supplier = sanitize(row.get("supplier", ""))
+    jumlah = to_int(row.get("jumlah", 0), "jumlah")
+
+    if not all([store_id, name, supplier]):
+        raise ValueError("Field wajib tidak boleh kosong")
+    if jumlah <= 0:
+        raise ValueError("Jumlah harus lebih dari 0")
+
+    store = store_registry.get(db, store_id)
+    if not store:
+        raise ValueError(f"Toko '{store_id}' tidak ditemukan")
+
+    return {
+        "key": (store["_id"], search_key(name)),
+        "store": store,
+        "name": name,
+        "supplier": supplier,
+        "jumlah": jumlah,
+        "purchase_price": parse_float(_value(row, "purchase_price", 0), "purchase_price"),
+        "notes": sanitize(row.get("notes", "")),
+        "category": sanitize(row.get("category", "")) or "Lainnya",
+        "sale_price": parse_float(_value(row, "sale_price", 0), "sale_price"),
+        "min_stock": to_int(_value(row, "min_stock", 5), "min_stock"),
+    }
+
+
+def _find_existing(db, keys):
+    """Satu query untuk seluruh (store_id, name_key) dalam chunk."""
+    by_store = {}
+    for store_id, name_key in keys:
+        by_store.setdefault(store_id, []).append(name_key)
+    if not by_store:
+        return {}
+
+    query = {"$or": [{"store_id": s, "name_key": {"$in": names}} for s, names in by_store.items()]}
+    return {
+        (d["store_id"], d["name_key"]): d
+        for d in db["master_product"].find(query, {"store_id": 1, "name_key": 1, "stock": 1})
+    }
+
+
+def _new_product(sku, item, stock):
+    store = item["store"]
+    return {
+        "_id": sku,
+        "name": item["name"],
+        "category": item["category"],
+        "stock": stock,
+        "min_stock": item["min_stock"],
+        "stock_state": compute_stock_state(stock, item["min_stock"]),
+        **search_fields("master_product", {"name": item["name"]}),
+        "purchase_price": item["purchase_price"],
+        "sale_price": item["sale_price"],
+        "supplier": item["supplier"],
+        "store_id": store["_id"],
+        "store_name": store["name"],
+        "city": store.get("city", ""),
+        "location": "Gudang Utama",
+        "created_at": datetime.now(),
+        "updated_at": datetime.utcnow(),
+    }
+
+
+def _restock(sku, items):
+    last = items[-1][1]
+    return UpdateOne(
+        {"_id": sku},
+        stock_update(
+            {"purchase_price": last["purchase_price"], "supplier": last["supplier"]},
+            inc_stock=sum(item["jumlah"] for _, item in items),
+        ),
+    )
+
+
+def _receipt(sku, item, stock_before, action_type):
+    store = item["store"]
+    return {
+        "_id": ObjectId(),
+        "product_sku": sku,
+        "name": item["name"],
+        "supplier": item["supplier"],
+        "jumlah": item["jumlah"],
+        "notes": item["notes"],
+        "tanggal": datetime.now(),
+        "purchase_price": item["purchase_price"],
+        "store_id": store["_id"],
+        "store_name": store["name"],
+        "city": store.get("city", ""),
+        "stock_before": stock_before,
+        "stock_after": stock_before + item["jumlah"],
+        "location": "Gudang Utama",
+        "type": action_type,
+        **search_fields("master_supplier", {"name": item["name"], "supplier": item["supplier"]}),
+    }
+
+
+def _bulk(collection, ops, tags):
+    """
+    `bulk_write(ordered=False)`; kembalikan {tag: (kode, pesan)} untuk
+    operasi yang gagal.
+    """
+    if not ops:
+        return {}
+    try:
+        collection.bulk_write(ops, ordered=False)
+        return {}
+    except BulkWriteError as e:
+        return {
+            tags[err["index"]]: (err.get("code"), err.get("errmsg", ""))
+            for err in e.details.get("writeErrors", [])
+        }
+
+
+def _write_chunk(db, chunk, report):
+    groups = {}
+    for line, item in chunk:
+        groups.setdefault(item["key"], []).append((line, item))
+
+    existing = _find_existing(db, groups)
+    new_keys = [key for key in groups if key not in existing]
+    skus = {key: doc["_id"] for key, doc in existing.items()}
+    skus.update(zip(new_keys, map(format_sku, allocate_sku_numbers(db, len(new_keys)) if new_keys else [])))
+
+    ops, tags = [], []
+    for key, items in groups.items():
+        if key in existing:
+            ops.append(_restock(skus[key], items))
+        else:
+            total = sum(item["jumlah"] for _, item in items)
+            ops.append(InsertOne(_new_product(skus[key], items[0][1], total)))
+        tags.append(key)
+    failed = _bulk(db["master_product"], ops, tags)
+
+    # Nama yang baru saja dibuat request lain → ulangi sebagai restock
+    raced = [key for key, (code, _) in failed.items() if code == DUPLICATE_KEY and key in new_keys]
+    if raced:
+        found = _find_existing(db, raced)
+        retry = [key for key in raced if key in found]
+        for key in retry:
+            existing[key] = found[key]
+            skus[key] = found[key]["_id"]
+            del failed[key]
+        failed.update(_bulk(db["master_product"], [_restock(skus[k], groups[k]) for k in retry], retry))
+
+    receipts, lines = [], []
+    for key, items in groups.items():
+        if key in failed:
+            for line, _ in items:
+                report.fail(line, f"Gagal menyimpan produk: {failed[key][1]}")
+            continue
+
+        created = key not in existing
+        stock = 0 if created else existing[key].get("stock", 0)
+        for i, (line, item) in enumerate(items):
+            action_type = "new_product" if created and i == 0 else "restock"
+            receipts.append(InsertOne(_receipt(skus[key], item, stock, action_type)))
+            lines.append(line)
+            stock += item["jumlah"]
+
+        report.created += created
+        report.restocked += not created
+        report.store_ids.add(key[0])
+
+    failed_receipts = _bulk(db["master_supplier"], receipts, lines)
+    for line, (_, message) in failed_receipts.items():
+        report.fail(line, f"Gagal menyimpan riwayat: {message}")
+    report.imported += len(receipts) - len(failed_receipts)
+
+
+def import_products(db, rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Impor barang masuk dari iterator `iter_rows()`.
+
+    Args:
+        db (Database): Database aktif.
+        rows (iterable): (nomor_baris, dict | None, error | None).
+        chunk_size (int): Jumlah baris valid per `bulk_write`.
+
+    Returns:
+        ImportReport: Ringkasan hasil, termasuk error per baris.
+    """
+    report = ImportReport()
+    chunk = []
+    for line, row, error in rows:
+        report.rows += 1
+        if error:
+            report.fail(line, error)
+            continue
+        try:
+            chunk.append((line, _parse_row(db, row)))
+        except ValueError as e:
+            report.fail(line, str(e))
+            continue
+        if len(chunk) >= chunk_size:
+            _write_chunk(db, chunk, report)
+            chunk = []
+    if chunk:
+        _write_chunk(db, chunk, report)
+
+    if report.store_ids:
+        bump_version(db, "master_product", *report.store_ids)
+    return report
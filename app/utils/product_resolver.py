@@ -0,0 +1,118 @@
+"""
+product_resolver.py
+=====================================================
+Resolusi Produk dalam Satu Query (dengan Memo per Request)
+=====================================================
+
+Route barang masuk, barang keluar, dan penjualan menerima referensi
+produk dalam beberapa bentuk: SKU (`_id`), `product_sku` lama, atau nama
+produk. Alih-alih beberapa `find_one` berurutan, seluruh kemungkinan
+digabung dalam satu query `$or` yang setiap cabangnya memakai index:
+
+    {"$or": [{"_id": sku}, {"product_sku": sku},
+             {"name_key": "pensil 2b", "store_id": "S01"}]}
+
+Jika lebih dari satu dokumen cocok, prioritasnya: `_id` → `product_sku`
+→ nama.
+
+Hasil disimpan di memo `flask.g` selama satu request sehingga baris
+berulang dalam satu batch tidak pernah meng-query dua kali. Memo hanya
+untuk identitas produk; nilai stok terbaru selalu berasal dari
+`adjust_stock()`.
+=====================================================
+"""
+
+from flask import g, has_request_context
+
+from .search_keys import search_key
+
+
+def _memo():
+    if not has_request_context():
+        return {}
+    if not hasattr(g, "_product_memo"):
+        g._product_memo = {}
+    return g._product_memo
+
+
+def _pick(docs, sku, name_key):
+    for match in (
+        lambda d: sku and d["_id"] == sku,
+        lambda d: sku and d.get("product_sku") == sku,
+        lambda d: name_key and d.get("name_key") == name_key,
+    ):
+        for doc in docs:
+            if match(doc):
+                return doc
+    return None
+
+
+def resolve_product(db, sku=None, name=None, store_id=None):
+    """
+    Cari satu produk berdasarkan SKU dan/atau nama dalam satu round trip.
+
+    Args:
+        db (Database): Database aktif.
+        sku (str, optional): SKU (`_id`) atau `product_sku` lama.
+        name (str, optional): Nama produk (dicocokkan lewat `name_key`).
+        store_id (str, optional): Batasi pencocokan nama ke satu toko.
+
+    Returns:
+        dict | None: Dokumen produk, atau None jika tidak ditemukan.
+    """
+    name_key = search_key(name) if name else None
+    memo = _memo()
+    memo_key = ("one", sku or None, name_key, store_id or None)
+    if memo_key in memo:
+        return memo[memo_key]
+
+    clauses = []
+    if sku:
+        clauses += [{"_id": sku}, {"product_sku": sku}]
+    if name_key:
+        clause = {"name_key": name_key}
+        if store_id:
+            clause["store_id"] = store_id
+        clauses.append(clause)
+    if not clauses:
+        return None
+
+    docs = list(db["master_product"].find({"$or": clauses}))
+    product = _pick(docs, sku, name_key)
+
+    memo[memo_key] = product
+    if product:
+        memo[("sku", product["_id"])] = product
+    return product
+
+
+def resolve_products(db, skus):
+    """
+    Ambil banyak produk berdasarkan SKU dalam satu query `$in`.
+    SKU yang sudah ada di memo request tidak di-query ulang.
+
+    Returns:
+        dict: {sku: dokumen produk} (SKU yang tidak ada tidak disertakan).
+    """
+    memo = _memo()
+    found = {}
+    missing = []
+    for sku in dict.fromkeys(skus):
+        key = ("sku", sku)
+        if key in memo:
+            if memo[key]:
+                found[sku] = memo[key]
+        else:
+            missing.append(sku)
+
+    if missing:
+        fetched = {
+            p["_id"]: p
+            for p in db["master_product"].find({"_id": {"$in": missing}})
+        }
+        for sku in missing:
+            memo[("sku", sku)] = fetched.get(sku)
+            if sku in fetched:
+                found[sku] = fetched[sku]
+
+    return found
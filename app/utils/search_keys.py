@@ -0,0 +1,116 @@
+"""
+search_keys.py
+=====================================================
+Field Kunci Pencarian (Ter-normalisasi & Ter-index)
+=====================================================
+
+Filter teks seperti {"$regex": name, "$options": "i"} tidak bisa memakai
+index sehingga selalu scan seluruh koleksi. Sebagai gantinya setiap
+dokumen menyimpan salinan ter-normalisasi (casefold + spasi dirapikan)
+dari field yang dicari, contoh:
+
+    name     = " Pensil  2B" →  name_key     = "pensil 2b"
+    supplier = "PT Maju"     →  supplier_key = "pt maju"
+
+- Pencocokan persis memakai kesetaraan biasa ({"name_key": "pensil 2b"}).
+  Di `master_product` pasangan (store_id, name_key) dijaga unique index,
+  sehingga nama produk ganda dalam satu toko tidak bisa tercipta
+  walaupun ada request bersamaan.
+- Pencarian awalan memakai regex ter-anchor tanpa opsi `i`
+  ({"name_key": {"$regex": "^pensil"}}) yang dilayani index sebagai
+  range scan. Konsekuensinya pencarian bersifat prefix, bukan substring.
+
+Data lama diisi lewat:
+
+    flask db backfill-search-keys
+=====================================================
+"""
+
+import re
+from pymongo import UpdateOne
+
+
+# Field kunci per koleksi: {koleksi: {field_kunci: field_sumber}}
+SEARCH_KEYS = {
+    "master_product": {"name_key": "name"},
+    "master_supplier": {"name_key": "name", "supplier_key": "supplier"},
+    "master_supplier_out": {"name_key": "name"},
+}
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def search_key(text):
+    """Normalisasi teks menjadi kunci pencarian (spasi dirapikan + casefold)."""
+    return " ".join(str(text or "").split()).casefold()
+
+
+def prefix_filter(text):
+    """Filter regex ter-anchor untuk field kunci, contoh {"$regex": "^pensil"}."""
+    return {"$regex": "^" + re.escape(search_key(text))}
+
+
+def search_fields(collection, doc):
+    """
+    Hitung field kunci untuk dokumen yang akan disimpan.
+
+    Returns:
+        dict: Contoh {"name_key": "pensil 2b", "supplier_key": "pt maju"}.
+    """
+    return {
+        key: search_key(doc.get(source))
+        for key, source in SEARCH_KEYS.get(collection, {}).items()
+        if source in doc
+    }
+
+
+def backfill_search_keys(db):
+    """
+    Isi ulang field kunci pada dokumen lama (batch `bulk_write`).
+
+    Normalisasi dilakukan di Python agar hasilnya identik dengan
+    `search_key()` yang dipakai saat insert/update.
+
+    Returns:
+        dict: {"<koleksi>": jumlah dokumen yang diperbarui}
+    """
+    result = {}
+    for collection, keys in SEARCH_KEYS.items():
+        projection = {source: 1 for source in keys.values()}
+        projection.update({key: 1 for key in keys})
+        updated, ops = 0, []
+
+        for doc in db[collection].find({}, projection):
+            fields = search_fields(collection, doc)
+            if any(doc.get(key) != value for key, value in fields.items()):
+                ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": fields}))
+            if len(ops) >= BACKFILL_BATCH_SIZE:
+                updated += db[collection].bulk_write(ops, ordered=False).modified_count
+                ops = []
+        if ops:
+            updated += db[collection].bulk_write(ops, ordered=False).modified_count
+
+        result[collection] = updated
+    return result
+
+
+def find_duplicate_names(db):
+    """
+    Cari produk dengan (store_id, name_key) sama, yang akan menggagalkan
+    pembuatan unique index. Harus dirapikan manual sebelum index dibuat.
+
+    Returns:
+        list: [{"store_id": ..., "name_key": ..., "skus": [...]}, ...]
+    """
+    return [
+        {"store_id": d["_id"]["store_id"], "name_key": d["_id"]["name_key"], "skus": d["skus"]}
+        for d in db["master_product"].aggregate([
+            {"$match": {"name_key": {"$type": "string"}}},
+            {"$group": {
+                "_id": {"store_id": "$store_id", "name_key": "$name_key"},
+                "skus": {"$push": "$_id"},
+                "count": {"$sum": 1},
+            }},
+            {"$match": {"count": {"$gt": 1}}},
+        ])
+    ]
@@ -9,6 +9,8 @@ Modul ini bertanggung jawab untuk:
 - Menyimpan token ke MongoDB dengan TTL (auto-expire)
 - Memvalidasi token dalam setiap request
 - Menghapus token saat logout
+- Menyimpan token yang sudah terverifikasi di cache in-process (TTL)
+  agar tidak perlu query MongoDB di setiap request
 
 =====================================================
 MongoDB Collections yang Digunakan
@@ -16,6 +18,7 @@ MongoDB Collections yang Digunakan
 MONGODB_COLLECTION_SESSIONS
     - Menyimpan token JWT aktif
     - Memiliki field `expires_at` yang digunakan TTL index untuk auto-delete
+      (didefinisikan di registry `app/utils/indexes.py`)
 
 =====================================================
 Dependensi
@@ -27,18 +30,88 @@ datetime, timedelta      : Pengaturan waktu token
 """
 
 import jwt
+import time
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from pymongo import ASCENDING
 
 from .mongo_connection import MongoConnection
 from config import (
     MONGODB_CONNECTION_STRING,
     MONGO_AUTH_DATABASE,
     MONGODB_COLLECTION_SESSIONS,
-    SECRET_KEY
+    SECRET_KEY,
+    SESSION_CACHE_TTL_SECONDS,
+    SESSION_CACHE_MAX_SIZE
 )
 
 
+class _TokenCache:
+    """
+    Cache in-process untuk token yang sudah terverifikasi.
+
+    - Setiap entri berlaku maksimal `ttl` detik, dan tidak pernah
+      melewati `exp` milik JWT.
+    - Ukuran dibatasi `max_size`; entri paling lama dibuang lebih dulu (LRU).
+    - Token yang dihapus (logout) langsung dibuang dari cache worker ini,
+      sedangkan worker lain paling lambat tertinggal `ttl` detik.
+    """
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        """Ambil payload dari cache, None jika tidak ada / sudah kedaluwarsa."""
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._data.get(token)
+            if not entry:
+                return None
+            payload, expires = entry
+            if time.time() >= expires:
+                del self._data[token]
+                return None
+            self._data.move_to_end(token)
+            return payload
+
+    def set(self, token, payload):
+        """Simpan payload token, dibatasi oleh TTL cache dan `exp` JWT."""
+        if self.ttl <= 0:
+            return
+        expires = time.time() + self.ttl
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            expires = min(expires, exp)
+        with self._lock:
+            self._data[token] = (payload, expires)
+            self._data.move_to_end(token)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, token):
+        """Buang satu token dari cache."""
+        with self._lock:
+            self._data.pop(token, None)
+
+    def invalidate_user(self, username):
+        """Buang seluruh token milik satu username dari cache."""
+        with self._lock:
+            for token in [t for t, (p, _) in self._data.items() if p.get("username") == username]:
+                del self._data[token]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Satu cache untuk seluruh instance SessionManager dalam satu proses (worker)
+token_cache = _TokenCache(SESSION_CACHE_TTL_SECONDS, SESSION_CACHE_MAX_SIZE)
+
+
 class SessionManager:
     """
     Kelas untuk mengelola token sesi (JWT) termasuk pembuatan, validasi, dan penghapusan token.
@@ -50,12 +123,7 @@ class SessionManager:
             db_name=MONGO_AUTH_DATABASE
         )
         self.secret_key = SECRET_KEY
-
-        # Buat TTL index untuk menghapus token yang sudah kedaluwarsa
-        self.auth_mongo.db[MONGODB_COLLECTION_SESSIONS].create_index(
-            [("expires_at", ASCENDING)],
-            expireAfterSeconds=0
-        )
+        # TTL index `expires_at` dibuat saat startup (app/utils/indexes.py)
 
     # --------------------------------------------------
     # GENERATE TOKEN
@@ -109,6 +177,8 @@ class SessionManager:
     def verify_token(self, token):
         """
         Memverifikasi token JWT & mengecek apakah token masih tercatat di database.
+        Token yang sudah terverifikasi disimpan di `token_cache` sehingga
+        request berikutnya tidak perlu query ke MongoDB.
 
         Args:
             token (str): Token JWT
@@ -116,6 +186,10 @@ class SessionManager:
         Returns:
             dict | None: Payload token jika valid, None jika invalid / expired.
         """
+        cached = token_cache.get(token)
+        if cached:
+            return cached
+
         try:
             payload = jwt.decode(token, self.secret_key, algorithms=["HS256"], leeway=10)
 
@@ -125,9 +199,11 @@ class SessionManager:
                 print("Token tidak ditemukan di MongoDB (sudah logout / expired / dihapus).")
                 return None
 
+            token_cache.set(token, payload)
             return payload
 
         except jwt.ExpiredSignatureError:
+            token_cache.invalidate(token)
             self.auth_mongo.db[MONGODB_COLLECTION_SESSIONS].delete_one({"token": token})
             print(f"[SessionManager] Token expired → otomatis dihapus")
             return None
@@ -150,4 +226,18 @@ class SessionManager:
         Args:
             token (str): Token JWT yang akan dihapus.
         """
+        token_cache.invalidate(token)
         self.auth_mongo.delete(MONGODB_COLLECTION_SESSIONS, {"token": token})
+
+    # --------------------------------------------------
+    # REMOVE USER TOKENS (LOGOUT SEMUA SESI)
+    # --------------------------------------------------
+    def remove_user_tokens(self, username):
+        """
+        Menghapus seluruh token milik satu username dari database & cache.
+
+        Args:
+            username (str): Nama pengguna yang sesinya akan dihapus.
+        """
+        token_cache.invalidate_user(username)
+        self.auth_mongo.delete(MONGODB_COLLECTION_SESSIONS, {"username": username}, multi=True)
@@ -0,0 +1,111 @@
+"""
+sku_allocator.py
+=====================================================
+Alokasi SKU Atomik Berbasis Dokumen Counter
+=====================================================
+
+SKU baru (format SKU-001, SKU-1000, ...) diambil dari satu dokumen
+counter di koleksi `counters` menggunakan `$inc` atomik, sehingga:
+
+- Biaya alokasi O(1), tidak tergantung jumlah produk.
+- Aman dari race condition antar request / worker.
+- Opsional: setiap worker mengambil blok ID sekaligus
+  (SKU_BLOCK_SIZE > 1) untuk mengurangi round trip.
+
+Seeding awal dari data lama dilakukan otomatis sekali per proses
+jika dokumen counter belum ada, atau manual lewat CLI:
+
+    flask db seed-sku-counter
+=====================================================
+"""
+
+import threading
+from pymongo import ReturnDocument
+from config import SKU_BLOCK_SIZE
+
+
+COUNTERS_COLLECTION = "counters"
+SKU_COUNTER_ID = "sku"
+SKU_PREFIX = "SKU-"
+
+_lock = threading.Lock()
+_block = {"next": 0, "end": 0}   # rentang [next, end] milik worker ini
+_seeded = False
+
+
+def format_sku(number):
+    """Format angka menjadi SKU, minimal tiga digit (SKU-001)."""
+    return f"{SKU_PREFIX}{number:03d}"
+
+
+def seed_sku_counter(db):
+    """
+    Menyamakan counter dengan SKU numerik terbesar yang sudah ada.
+    Memakai `$max` sehingga aman dijalankan berulang / bersamaan.
+
+    Returns:
+        int: Nilai counter setelah seeding.
+    """
+    pipeline = [
+        {"$match": {"_id": {"$regex": r"^SKU-\d+$"}}},
+        {"$group": {"_id": None, "max_num": {"$max": {"$toLong": {"$substrCP": ["$_id", 4, 20]}}}}},
+    ]
+    result = list(db["master_product"].aggregate(pipeline))
+    max_num = int(result[0]["max_num"]) if result and result[0].get("max_num") else 0
+
+    counter = db[COUNTERS_COLLECTION].find_one_and_update(
+        {"_id": SKU_COUNTER_ID},
+        {"$max": {"seq": max_num}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return int(counter["seq"])
+
+
+def _reserve(db, count):
+    """Ambil `count` nomor berurutan secara atomik, kembalikan nomor terakhir."""
+    counter = db[COUNTERS_COLLECTION].find_one_and_update(
+        {"_id": SKU_COUNTER_ID},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return int(counter["seq"])
+
+
+def allocate_sku_numbers(db, count=1):
+    """
+    Mengalokasikan `count` nomor SKU sekaligus (satu round trip).
+
+    Returns:
+        range: Rentang nomor SKU yang boleh dipakai pemanggil.
+    """
+    global _seeded
+    if not _seeded:
+        if not db[COUNTERS_COLLECTION].find_one({"_id": SKU_COUNTER_ID}):
+            seed_sku_counter(db)
+        _seeded = True
+
+    end = _reserve(db, count)
+    return range(end - count + 1, end + 1)
+
+
+def allocate_sku(db):
+    """
+    Mengambil satu SKU baru yang unik.
+    Jika SKU_BLOCK_SIZE > 1, nomor diambil dari blok milik worker ini
+    dan database hanya disentuh saat blok habis.
+
+    Returns:
+        str: SKU baru, contoh "SKU-1001".
+    """
+    if SKU_BLOCK_SIZE <= 1:
+        return format_sku(allocate_sku_numbers(db, 1)[0])
+
+    with _lock:
+        if _block["next"] == 0 or _block["next"] > _block["end"]:
+            numbers = allocate_sku_numbers(db, SKU_BLOCK_SIZE)
+            _block["next"], _block["end"] = numbers[0], numbers[-1]
+        number = _block["next"]
+        _block["next"] += 1
+    return format_sku(number)
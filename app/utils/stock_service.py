@@ -0,0 +1,237 @@
+"""
+stock_service.py
+=====================================================
+Mutasi Stok Atomik untuk Seluruh Route
+=====================================================
+
+Semua perubahan stok (penjualan, barang masuk, barang keluar, koreksi,
+hapus transaksi) wajib melalui `adjust_stock()`:
+
+- Satu round trip `find_one_and_update` dengan guard kondisi,
+  contoh pengurangan 5 unit: {"_id": sku, "stock": {"$gte": 5}}.
+- Tidak ada pola baca → hitung di Python → `$set`, sehingga tidak ada
+  lost update maupun overselling saat banyak request bersamaan.
+- `stock_state` dihitung ulang di update yang sama (lihat `stock_state`).
+- `updated_at` di-set ke waktu server ($$NOW) untuk delta sync.
+- Nilai stok sebelum & sesudah dikembalikan tanpa query tambahan.
+
+Untuk banyak produk sekaligus (POS) gunakan `adjust_stock_many()`:
+satu `bulk_write` ordered dengan guard di dalam pipeline, semua-atau-tidak-
+sama-sekali, dengan error yang sama di mode biasa maupun mode transaksi.
+
+Kegagalan dilaporkan lewat exception turunan `StockError`
+(subclass ValueError) yang membawa HTTP status code.
+=====================================================
+"""
+
+from collections import namedtuple
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from .stock_state import STOCK_STATE_EXPR
+
+
+StockChange = namedtuple("StockChange", ["product", "stock_before", "stock_after"])
+
+
+class StockError(ValueError):
+    """Kesalahan mutasi stok; `code` adalah HTTP status yang disarankan."""
+    code = 400
+
+
+class ProductNotFound(StockError):
+    code = 404
+
+    def __init__(self, sku):
+        super().__init__(f"Produk dengan SKU '{sku}' tidak ditemukan")
+        self.sku = sku
+
+
+class InsufficientStock(StockError):
+    code = 400
+
+    def __init__(self, product, requested):
+        self.product = product
+        self.available = int(product.get("stock", 0) or 0)
+        self.requested = requested
+        super().__init__(f"Stok tidak cukup (tersisa {self.available})")
+
+
+class StockConflict(StockError):
+    """Riwayat transaksi diubah request lain saat pergerakan stok diproses."""
+    code = 409
+
+    def __init__(self):
+        super().__init__("Data berubah saat transaksi diproses, silakan ulangi")
+
+
+# Cabang "stok kurang" pada pengurangan massal: pembagian dengan nol yang
+# bergantung pada dokumen (tidak di-constant-fold), sehingga evaluasinya
+# selalu gagal dan `bulk_write` ordered berhenti tepat di baris tersebut
+# tanpa menulis apa pun ke dokumen itu.
+_GUARD_FAILED = {"$divide": [1, {"$multiply": [0, {"$ifNull": ["$stock", 0]}]}]}
+
+# Kode error "can't $divide by zero" (16608 di MongoDB < 5.0, BadValue sesudahnya)
+_GUARD_ERROR_CODES = (2, 16608)
+
+
+def _is_guard_error(write_error):
+    """True jika write error berasal dari `_GUARD_FAILED`, bukan error lain."""
+    return (
+        write_error.get("code") in _GUARD_ERROR_CODES
+        and "divide by zero" in write_error.get("errmsg", "")
+    )
+
+
+def _update_pipeline(delta, set_fields, floor, guard=False):
+    current = {"$ifNull": ["$stock", 0]}
+    new_stock = {"$add": [current, delta]}
+    if floor is not None:
+        new_stock = {"$max": [floor, new_stock]}
+    if guard and delta < 0:
+        new_stock = {"$cond": [{"$gte": [current, -delta]}, new_stock, _GUARD_FAILED]}
+
+    fields = {k: {"$literal": v} for k, v in (set_fields or {}).items()}
+    fields["stock"] = new_stock
+    return [
+        {"$set": fields},
+        {"$set": {"stock_state": STOCK_STATE_EXPR, "updated_at": "$$NOW"}},
+    ]
+
+
+def adjust_stock(db, sku, delta, set_fields=None, floor=None, session=None):
+    """
+    Ubah stok produk secara atomik.
+
+    Args:
+        db (Database): Database aktif.
+        sku (str): _id produk di master_product.
+        delta (int): Perubahan stok (negatif = keluar, positif = masuk).
+        set_fields (dict, optional): Field lain yang di-set bersamaan.
+        floor (int, optional): Jika diisi, stok dipotong di nilai ini
+            (tanpa guard), contoh floor=0 untuk hapus barang masuk.
+        session (ClientSession, optional): Untuk mode transaksi.
+
+    Returns:
+        StockChange: (product sebelum update, stock_before, stock_after)
+
+    Raises:
+        ProductNotFound: Produk tidak ada.
+        InsufficientStock: Stok tidak cukup untuk pengurangan.
+    """
+    delta = int(delta)
+    query = {"_id": sku}
+    if delta < 0 and floor is None:
+        query["stock"] = {"$gte": -delta}
+
+    before = db["master_product"].find_one_and_update(
+        query,
+        _update_pipeline(delta, set_fields, floor),
+        return_document=ReturnDocument.BEFORE,
+        session=session,
+    )
+
+    if before is None:
+        # Hanya di jalur gagal: bedakan produk tidak ada vs stok kurang
+        product = db["master_product"].find_one({"_id": sku}, session=session)
+        if not product:
+            raise ProductNotFound(sku)
+        raise InsufficientStock(product, -delta)
+
+    stock_before = int(before.get("stock", 0) or 0)
+    stock_after = stock_before + delta
+    if floor is not None:
+        stock_after = max(floor, stock_after)
+
+    return StockChange(before, stock_before, stock_after)
+
+
+def _bulk_ops(deltas, set_fields, guard=True):
+    # Tanpa upsert: produk yang tidak ada hanya tidak cocok (matched_count),
+    # tidak pernah membuat dokumen baru.
+    return [
+        UpdateOne({"_id": sku}, _update_pipeline(delta, set_fields, None, guard=guard))
+        for sku, delta in deltas
+    ]
+
+
+def adjust_stock_many(db, deltas, set_fields=None, session=None):
+    """
+    Ubah stok banyak produk dalam satu `bulk_write` (ordered), semua atau tidak sama sekali.
+
+    Guard stok dievaluasi di dalam update pipeline: baris dengan stok kurang
+    menghasilkan write error sehingga bulk berhenti di baris itu. Produk
+    yang tidak ada terdeteksi dari `matched_count`. Perubahan yang sudah
+    diterapkan (baris sebelum kegagalan) dikembalikan (kompensasi) sebelum
+    exception dilempar. Di dalam transaksi, kompensasi diserahkan ke abort.
+
+    Args:
+        db (Database): Database aktif.
+        deltas (dict): {sku: perubahan_stok}.
+        set_fields (dict, optional): Field lain yang di-set di setiap produk.
+        session (ClientSession, optional): Untuk mode transaksi.
+
+    Raises:
+        ProductNotFound: Salah satu produk tidak ada.
+        InsufficientStock: Stok salah satu produk tidak cukup.
+        StockConflict: Guard gagal, tetapi stok sudah cukup lagi saat
+            diperiksa (diubah request lain).
+        BulkWriteError: Write error lain (bukan guard stok).
+    """
+    items = [(sku, int(delta)) for sku, delta in deltas.items() if int(delta) != 0]
+    if not items:
+        return
+
+    error, failed = None, None
+    try:
+        result = db["master_product"].bulk_write(
+            _bulk_ops(items, set_fields), ordered=True, session=session
+        )
+        matched = result.matched_count
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if not errors:
+            raise
+        error, failed = e, errors[0]
+        matched = e.details.get("nMatched", 0)
+
+    last = len(items) if failed is None else failed["index"]
+    if error is None and matched == last:
+        return
+
+    # Write error di dalam transaksi membatalkan transaksi, sehingga
+    # pembacaan diagnosis dilakukan di luar session
+    read_session = session if error is None else None
+    attempted = [sku for sku, _ in items[:last]]
+    missing = set()
+    if matched < last:
+        found = {
+            p["_id"]
+            for p in db["master_product"].find({"_id": {"$in": attempted}}, {"_id": 1}, session=read_session)
+        }
+        missing = set(attempted) - found
+
+    in_transaction = session is not None and session.in_transaction
+    applied = [(sku, -delta) for sku, delta in items[:last] if sku not in missing]
+    if applied and not in_transaction:
+        db["master_product"].bulk_write(
+            _bulk_ops(applied, None, guard=False), ordered=False, session=session
+        )
+
+    if missing:
+        raise ProductNotFound(next(sku for sku in attempted if sku in missing))
+
+    if error is None:
+        # Produk yang tadi tidak cocok sudah dibuat lagi oleh request lain
+        raise StockConflict()
+    if not _is_guard_error(failed):
+        raise error
+
+    sku, delta = items[last]
+    product = db["master_product"].find_one({"_id": sku}, session=read_session)
+    if not product:
+        raise ProductNotFound(sku)
+    if int(product.get("stock", 0) or 0) < -delta:
+        raise InsufficientStock(product, -delta)
+    # Stok sudah diisi ulang request lain sebelum diagnosis
+    raise StockConflict()
@@ -0,0 +1,97 @@
+"""
+stock_state.py
+=====================================================
+Field Turunan `stock_state` pada master_product
+=====================================================
+
+Setiap produk menyimpan status stok yang sudah dihitung:
+
+- habis    : stock <= 0
+- menipis  : stock - min_stock <= 5
+- tersedia : selain di atas
+
+Dengan index gabungan (store_id, stock_state), widget status stok dan
+alert dashboard cukup melakukan count / lookup ber-index, tanpa `$expr`
+yang memaksa collection scan.
+
+Seluruh route yang mengubah `stock` / `min_stock` wajib memakai
+`stock_update()` (atau `compute_stock_state()` untuk insert) agar
+field ini selalu konsisten. Data lama diisi lewat:
+
+    flask db backfill-stock-state
+=====================================================
+"""
+
+STATE_HABIS = "habis"
+STATE_MENIPIS = "menipis"
+STATE_TERSEDIA = "tersedia"
+ALERT_STATES = [STATE_HABIS, STATE_MENIPIS]
+
+LOW_STOCK_MARGIN = 5
+
+# Ekspresi aggregation untuk menghitung stock_state di sisi server
+STOCK_STATE_EXPR = {
+    "$switch": {
+        "branches": [
+            {"case": {"$lte": [{"$ifNull": ["$stock", 0]}, 0]}, "then": STATE_HABIS},
+            {
+                "case": {"$lte": [
+                    {"$subtract": [{"$ifNull": ["$stock", 0]}, {"$ifNull": ["$min_stock", 0]}]},
+                    LOW_STOCK_MARGIN,
+                ]},
+                "then": STATE_MENIPIS,
+            },
+        ],
+        "default": STATE_TERSEDIA,
+    }
+}
+
+
+def compute_stock_state(stock, min_stock):
+    """Hitung stock_state di Python (untuk dokumen baru)."""
+    stock = int(stock or 0)
+    min_stock = int(min_stock or 0)
+    if stock <= 0:
+        return STATE_HABIS
+    if stock - min_stock <= LOW_STOCK_MARGIN:
+        return STATE_MENIPIS
+    return STATE_TERSEDIA
+
+
+def stock_update(set_fields=None, inc_stock=0, touch=True):
+    """
+    Bangun update pipeline (MongoDB 4.2+) yang mengubah field produk
+    sekaligus menghitung ulang `stock_state` secara atomik.
+
+    Args:
+        set_fields (dict): Field yang di-set (nilai literal).
+        inc_stock (int): Penambahan / pengurangan stok relatif.
+        touch (bool): Set `updated_at` ke waktu server ($$NOW, UTC) untuk
+            delta sync (/api/products/changes).
+
+    Returns:
+        list: Update pipeline untuk update_one / find_one_and_update.
+    """
+    fields = {k: {"$literal": v} for k, v in (set_fields or {}).items()}
+    if inc_stock and "stock" not in fields:
+        fields["stock"] = {"$add": [{"$ifNull": ["$stock", 0]}, inc_stock]}
+
+    pipeline = []
+    if fields:
+        pipeline.append({"$set": fields})
+    final = {"stock_state": STOCK_STATE_EXPR}
+    if touch:
+        final["updated_at"] = "$$NOW"
+    pipeline.append({"$set": final})
+    return pipeline
+
+
+def backfill_stock_state(db, query=None):
+    """
+    Mengisi / memperbaiki `stock_state` untuk produk yang sudah ada.
+
+    Returns:
+        int: Jumlah dokumen yang diperbarui.
+    """
+    result = db["master_product"].update_many(query or {}, stock_update(touch=False))
+    return result.modified_count
@@ -0,0 +1,86 @@
+"""
+store_registry.py
+=====================================================
+Registry Toko In-Process (master_store)
+=====================================================
+
+Data toko hampir tidak pernah berubah, tetapi dibaca di hampir setiap
+request (validasi `store_id` di route tulis dan `/api/stores` yang
+dipanggil setiap halaman). Registry ini menyimpan seluruh `master_store`
+di memori worker:
+
+- Dimuat sekali saat startup (`store_registry.load(db)`).
+- Dimuat ulang secara lazy setelah STORE_REGISTRY_REFRESH_SECONDS,
+  atau segera lewat `load()` (dipanggil admin lewat
+  POST /api/system/stores/reload).
+- `etag` berubah hanya jika isi daftar toko aktif berubah, sehingga
+  `/api/stores` dapat menjawab 304 Not Modified.
+=====================================================
+"""
+
+import hashlib
+import json
+import threading
+import time
+from config import STORE_REGISTRY_REFRESH_SECONDS
+
+
+class _StoreRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stores = {}
+        self._active = []
+        self._etag = None
+        self._loaded_at = 0.0
+
+    def load(self, db):
+        """Muat ulang seluruh toko dari database."""
+        docs = list(db["master_store"].find({}, {"_id": 1, "name": 1, "city": 1, "is_active": 1}))
+        stores = {d["_id"]: d for d in docs}
+        active = [
+            {"store_id": d["_id"], "name": d["name"], "city": d.get("city", "")}
+            for d in docs if d.get("is_active")
+        ]
+        digest = hashlib.sha1(json.dumps(active, sort_keys=True, default=str).encode()).hexdigest()
+
+        with self._lock:
+            self._stores = stores
+            self._active = active
+            self._etag = f"stores-{digest[:16]}"
+            self._loaded_at = time.monotonic()
+
+    def _ensure(self, db):
+        if time.monotonic() - self._loaded_at >= STORE_REGISTRY_REFRESH_SECONDS:
+            try:
+                self.load(db)
+            except Exception as e:
+                if not self._stores:
+                    raise
+                self._loaded_at = time.monotonic()
+                print(f"[StoreRegistry] Gagal memuat ulang, memakai data lama: {e}")
+
+    def get(self, db, store_id, active_only=True):
+        """
+        Ambil satu toko dari memori.
+
+        Returns:
+            dict | None: {"_id", "name", "city", "is_active"} atau None.
+        """
+        self._ensure(db)
+        store = self._stores.get(store_id)
+        if store and active_only and not store.get("is_active"):
+            return None
+        return store
+
+    def active_stores(self, db):
+        """Daftar toko aktif dalam format dropdown."""
+        self._ensure(db)
+        return self._active
+
+    def etag(self, db):
+        """ETag daftar toko aktif saat ini."""
+        self._ensure(db)
+        return self._etag
+
+
+store_registry = _StoreRegistry()
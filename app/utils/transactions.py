@@ -0,0 +1,58 @@
+"""
+transactions.py
+=====================================================
+Mode Transaksi Opsional untuk Mutasi Stok + Riwayat
+=====================================================
+
+Setiap pergerakan barang menulis ke dua koleksi: `master_product`
+(stok) dan koleksi riwayat (`master_supplier`, `master_supplier_out`,
+atau `sales`). Dengan MONGO_TRANSACTIONS = True kedua tulisan dibungkus
+multi-document transaction (`ClientSession.with_transaction`) sehingga
+crash di tengah jalan tidak membuat stok & riwayat tidak sinkron.
+
+Membutuhkan MongoDB replica set (single-node pun cukup), contoh lokal:
+
+    mongod --replSet rs0 --dbpath /tmp/rs0 --port 27017
+    mongosh --eval 'rs.initiate()'
+
+Jika MONGO_TRANSACTIONS = False, callback dijalankan tanpa session
+(perilaku sama seperti sebelumnya).
+
+Penggunaan di route:
+
+    def movement(session):
+        adjust_stock(db, sku, -qty, session=session)
+        db["sales"].insert_one(doc, session=session)
+
+    run_movement(db, movement)
+=====================================================
+"""
+
+from config import MONGO_TRANSACTIONS
+
+
+def run_movement(db, callback, transactional=None):
+    """
+    Jalankan satu pergerakan barang, dalam transaksi jika diaktifkan.
+
+    Args:
+        db (Database): Database aktif.
+        callback (callable): Fungsi `callback(session)`; session bernilai
+            None jika mode transaksi tidak aktif.
+        transactional (bool, optional): Override MONGO_TRANSACTIONS.
+
+    Returns:
+        any: Nilai kembalian callback.
+
+    Raises:
+        Exception: Exception dari callback diteruskan; dalam mode transaksi
+            seluruh tulisan dibatalkan (abort) lebih dulu.
+    """
+    if transactional is None:
+        transactional = MONGO_TRANSACTIONS
+
+    if not transactional:
+        return callback(None)
+
+    with db.client.start_session() as session:
+        return session.with_transaction(callback)
@@ -58,7 +58,7 @@ def parse_float(value, field="nilai"):
     except (ValueError, TypeError):
         raise ValueError(f"{field} harus berupa angka")
     
-def response(success=True, message=None, data=None, code=200):
+def response(success=True, message=None, data=None, code=200, meta=None):
     """
     Format standar response API.
 
@@ -67,6 +67,7 @@ def response(success=True, message=None, data=None, code=200):
         message (str): Pesan untuk user.
         data (dict | list | None): Payload data.
         code (int): HTTP status code.
+        meta (dict | None): Info tambahan, contoh cursor pagination.
 
     Returns:
         tuple: (JSON response, HTTP status code)
@@ -76,4 +77,6 @@ def response(success=True, message=None, data=None, code=200):
         body["message"] = message
     if data is not None:
         body["data"] = data
+    if meta is not None:
+        body["meta"] = meta
     return jsonify(body), code
\ No newline at end of file
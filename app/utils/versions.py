@@ -0,0 +1,112 @@
+"""
+versions.py
+=====================================================
+Version Counter per Koleksi / Toko untuk Conditional GET
+=====================================================
+
+Endpoint katalog (/api/products, dropdown produk) dibaca jauh lebih
+sering daripada datanya berubah. Setiap route tulis menaikkan version
+counter koleksi terkait, lalu endpoint baca membentuk weak ETag dari
+counter tersebut:
+
+    W/"master_product.41.7.3f9a0c1d"
+       └ koleksi      │  │  └ hash query string (limit, cursor, fields, ...)
+                      │  └ versi toko (atau versi global tanpa filter toko)
+                      └ epoch perubahan lintas toko
+
+Jika header `If-None-Match` cocok, route langsung menjawab 304 tanpa
+menjalankan query utama maupun serialisasi JSON.
+
+Counter disimpan di koleksi `counters` (bukan memori worker) agar
+seluruh worker/proses melihat versi yang sama:
+
+    {"_id": "version:master_product",       "seq": 41}  ← semua perubahan
+    {"_id": "version:master_product:*",     "seq": 7}   ← perubahan tanpa toko spesifik
+    {"_id": "version:master_product:S01",   "seq": 12}  ← perubahan di toko S01
+
+Pengecekan ETag hanya satu point-read `_id $in` di `counters`.
+=====================================================
+"""
+
+import hashlib
+from flask import request, make_response
+from pymongo import UpdateOne
+
+
+ANY_STORE = "*"
+
+
+def _key(collection, store_id=None):
+    return f"version:{collection}" + (f":{store_id}" if store_id else "")
+
+
+def bump_version(db, collection, *store_ids):
+    """
+    Naikkan version counter koleksi (dan toko terkait) dalam satu bulk_write.
+
+    Tanpa store_id (atau store tidak diketahui) → epoch lintas toko ikut
+    naik sehingga seluruh ETag per toko ikut berubah.
+    """
+    stores = {s for s in store_ids if s}
+    keys = [_key(collection)] + [_key(collection, s) for s in stores or [ANY_STORE]]
+    try:
+        db["counters"].bulk_write(
+            [UpdateOne({"_id": k}, {"$inc": {"seq": 1}}, upsert=True) for k in keys],
+            ordered=False,
+        )
+    except Exception as e:
+        # Gagal menaikkan versi tidak boleh menggagalkan transaksi yang sudah tersimpan
+        print(f"[Versions] Gagal bump {collection}: {e}")
+
+
+def collection_etag(db, collection, store_id=None):
+    """
+    Bentuk ETag (tanpa prefix W/) untuk request saat ini.
+
+    Args:
+        db (Database): Database aktif.
+        collection (str): Nama koleksi sumber data.
+        store_id (str, optional): Filter toko pada request.
+
+    Returns:
+        str: Contoh "master_product.41.7.3f9a0c1d".
+    """
+    if store_id and store_id != "all":
+        keys = [_key(collection, ANY_STORE), _key(collection, store_id)]
+    else:
+        keys = [_key(collection)]
+
+    seqs = {d["_id"]: d.get("seq", 0) for d in db["counters"].find({"_id": {"$in": keys}})}
+    versions = ".".join(str(seqs.get(k, 0)) for k in keys)
+    query_hash = hashlib.sha1(request.query_string).hexdigest()[:8]
+    return f"{collection}.{versions}.{query_hash}"
+
+
+def not_modified(etag):
+    """
+    Response 304 jika `If-None-Match` cocok dengan ETag, selain itu None.
+
+    Contoh:
+        etag = collection_etag(db, "master_product", store_id)
+        cached = not_modified(etag)
+        if cached:
+            return cached
+    """
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    resp = make_response("", 304)
+    resp.set_etag(etag, weak=True)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
+
+
+def with_etag(result, etag):
+    """
+    Tempelkan weak ETag + `Cache-Control: private, no-cache` (browser wajib
+    revalidasi) pada response sukses. Menerima tuple dari `response()`.
+    """
+    resp = make_response(result)
+    if resp.status_code == 200:
+        resp.set_etag(etag, weak=True)
+        resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
@@ -8,6 +8,67 @@ MONGODB_COLLECTION_PRODUCTS_COME = "master_supplier"
 MONGODB_COLLECTION_PRODUCTS_OUT = "master_supplier_out"
 MONGODB_COLLECTION_USER = "master_karyawan"
 
+# Connection pool (satu MongoClient per worker)
+MONGO_MIN_POOL_SIZE = 0
+MONGO_MAX_POOL_SIZE = 50
+MONGO_WAIT_QUEUE_TIMEOUT_MS = 2000
+
+# Buat index dari registry (app/utils/indexes.py) saat startup
+MONGO_ENSURE_INDEXES_ON_STARTUP = True
+
+# Bungkus mutasi stok + riwayat dalam multi-document transaction
+# (butuh replica set, lihat app/utils/transactions.py)
+MONGO_TRANSACTIONS = False
+
+# Pagination /api/products: ukuran halaman default & maksimum
+PRODUCT_PAGE_SIZE = 50
+PRODUCT_PAGE_MAX = 500
+
+# Pagination riwayat (barang masuk, barang keluar, penjualan)
+HISTORY_PAGE_SIZE = 50
+HISTORY_PAGE_MAX = 500
+
+# Impor massal barang masuk (CSV / NDJSON)
+IMPORT_CHUNK_SIZE = 1000            # baris per bulk_write
+IMPORT_MAX_ERRORS = 1000            # error per baris yang dikembalikan di laporan
+
+# Ekspor streaming (/api/export/<dataset>)
+EXPORT_BATCH_SIZE = 2000            # dokumen per batch cursor MongoDB
+EXPORT_FLUSH_ROWS = 500             # baris per chunk response
+EXPORT_GZIP_LEVEL = 6
+
+# Alokasi SKU: jumlah nomor yang dipesan sekaligus per worker (1 = tanpa blok)
+SKU_BLOCK_SIZE = 1
+
 # Auth DB
 MONGO_AUTH_DATABASE = "auth_db"
-MONGODB_COLLECTION_SESSIONS = "sessions" 
\ No newline at end of file
+MONGODB_COLLECTION_SESSIONS = "sessions"
+
+# Cache token terverifikasi (in-process, per worker)
+SESSION_CACHE_TTL_SECONDS = 30      # batas maksimal token basi di worker lain
+SESSION_CACHE_MAX_SIZE = 10000
+
+# Snapshot dashboard (in-process, per worker)
+DASHBOARD_SNAPSHOT_MAX_AGE_SECONDS = 300
+DASHBOARD_SNAPSHOT_MAX_STORES = 256
+DASHBOARD_QUERY_WORKERS = 8         # query widget yang dijalankan bersamaan
+
+# Registry toko in-process (master_store)
+STORE_REGISTRY_REFRESH_SECONDS = 600
+STORES_CLIENT_MAX_AGE_SECONDS = 300  # Cache-Control untuk /api/stores
+
+# Delta sync produk (/api/products/changes)
+DELTA_SYNC_LAG_SECONDS = 5          # perubahan lebih baru dari ini ditahan dulu
+TOMBSTONE_RETENTION_DAYS = 30       # cursor lebih tua dari ini harus full reload
+
+# Kompresi response (gzip / brotli jika paket `brotli` terpasang)
+COMPRESSION_MIN_BYTES = 1024        # response lebih kecil dikirim apa adanya
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 4
+COMPRESSION_MIMETYPES = {
+    "application/json", "application/x-ndjson", "text/csv", "text/html", "text/plain",
+}
+
+# Server-Sent Events dashboard
+SSE_KEEPALIVE_SECONDS = 25
+SSE_QUEUE_SIZE = 100
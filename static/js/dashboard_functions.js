@@ -23,6 +23,7 @@ const elements = {
   availableStockPercent: document.getElementById("availableStockPercent"),
   stockProgress: document.getElementById("stockProgress"),
   storeLabel: document.getElementById("storeLabel"),
+  snapshotAge: document.getElementById("snapshotAge"),
   salesGrowth: document.getElementById("salesGrowth"),
 
   // Tables
@@ -49,6 +50,18 @@ function formatNumber(value) {
   return isNaN(num) ? "0" : num.toLocaleString("id-ID");
 }
 
+// Show snapshot freshness (age in seconds)
+function updateSnapshotAge(value) {
+  const age = parseFloat(value);
+  if (!elements.snapshotAge || isNaN(age)) return;
+
+  const text =
+    age < 60
+      ? `${Math.round(age)} detik lalu`
+      : `${Math.round(age / 60)} menit lalu`;
+  elements.snapshotAge.textContent = `Data diperbarui ${text}`;
+}
+
 // Show notification
 function showNotification(message, type = "success") {
   // Create notification element
@@ -83,98 +96,86 @@ function showNotification(message, type = "success") {
   }, 5000);
 }
 
-// Load store options
-async function loadStoreOptions() {
-  try {
-    const response = await fetch("/api/stores");
-    const result = await response.json();
-    const stores = Array.isArray(result) ? result : result.data || [];
-
-    elements.storeFilter.innerHTML = '<option value="all">Semua Toko</option>';
-    stores.forEach((store) => {
-      const label = store.name + (store.city ? ` (${store.city})` : "");
-      elements.storeFilter.innerHTML += `<option value="${store.store_id}">${label}</option>`;
-    });
+let lastDashboard = null;
 
-    loadDashboardAll("all");
-  } catch (error) {
-    showNotification("Gagal memuat daftar toko.", "error");
-  }
+// Fill store dropdown (keeps current selection)
+function renderStoreOptions(stores) {
+  const selected = elements.storeFilter.value || "all";
+
+  elements.storeFilter.innerHTML = '<option value="all">Semua Toko</option>';
+  stores.forEach((store) => {
+    const label = store.name + (store.city ? ` (${store.city})` : "");
+    elements.storeFilter.innerHTML += `<option value="${store.store_id}">${label}</option>`;
+  });
+  elements.storeFilter.value = selected;
 }
 
-// Load dashboard data
+// Load all dashboard widgets in one request
 async function loadDashboardAll(storeId = "all") {
   try {
+    const response = await fetch(
+      `/api/analytics/dashboard?store_id=${storeId}`
+    );
+    const data = await response.json();
+    lastDashboard = data;
+
+    renderStoreOptions(data.stores || []);
+
     // Update store label
     const selectedOption =
       elements.storeFilter.options[elements.storeFilter.selectedIndex];
     elements.storeLabel.textContent = selectedOption.text;
 
-    // Load summary data
-    const summaryResponse = await fetch(
-      `/api/analytics/summary?store_id=${storeId}`
-    );
-    const summaryData = await summaryResponse.json();
-
-    // Update cards
-    elements.totalProducts.textContent = formatNumber(
-      summaryData.total_products || 0
-    );
-    elements.totalStock.textContent = formatNumber(
-      summaryData.total_stock || 0
-    );
-    elements.totalSupplier.textContent = formatNumber(
-      summaryData.total_supplier || 0
-    );
-    elements.totalSales.textContent = formatNumber(
-      summaryData.total_sales || 0
-    );
-    elements.distribusiRevenue.textContent = formatRupiah(
-      summaryData.total_distribusi_value || 0
-    );
-    elements.salesRevenue.textContent = formatRupiah(
-      summaryData.total_revenue || 0
-    );
-    elements.purchaseValue.textContent = formatRupiah(
-      summaryData.total_purchase_value || 0
-    );
-    elements.supplierPurchaseValue.textContent = formatRupiah(
-      summaryData.total_supplier_value || 0
-    );
-    elements.saleValue.textContent = formatRupiah(
-      summaryData.total_sale_stock || 0
-    );
+    updateSnapshotAge(data.snapshot_age);
+    renderSummary(data.summary || {});
 
     // Calculate and update stock progress
-    const stockData = await loadStockCards(storeId);
+    const stockData = renderStockCards(data.stock_status || {});
     updateStockProgress(stockData);
 
-    // Load other components
-    await loadCategoryPie(storeId);
-    await loadSupplierTable(storeId);
-    await loadRecentSales(storeId);
+    // Render other components
+    renderCategoryPie(data.category_pie || []);
+    renderSupplierTable(data.supplier_summary || []);
+    renderRecentSales(data.recent_sales || []);
   } catch (error) {
     showNotification("Gagal memuat data dashboard.", "error");
   }
 }
 
-// Load stock status
-async function loadStockCards(storeId = "all") {
-  try {
-    const response = await fetch(
-      `/api/analytics/stock_status?store_id=${storeId}`
-    );
-    const data = await response.json();
+// Update summary cards
+function renderSummary(summaryData) {
+  elements.totalProducts.textContent = formatNumber(
+    summaryData.total_products || 0
+  );
+  elements.totalStock.textContent = formatNumber(summaryData.total_stock || 0);
+  elements.totalSupplier.textContent = formatNumber(
+    summaryData.total_supplier || 0
+  );
+  elements.totalSales.textContent = formatNumber(summaryData.total_sales || 0);
+  elements.distribusiRevenue.textContent = formatRupiah(
+    summaryData.total_distribusi_value || 0
+  );
+  elements.salesRevenue.textContent = formatRupiah(
+    summaryData.total_revenue || 0
+  );
+  elements.purchaseValue.textContent = formatRupiah(
+    summaryData.total_purchase_value || 0
+  );
+  elements.supplierPurchaseValue.textContent = formatRupiah(
+    summaryData.total_supplier_value || 0
+  );
+  elements.saleValue.textContent = formatRupiah(
+    summaryData.total_sale_stock || 0
+  );
+}
 
-    elements.stockAvailable.textContent = formatNumber(data.tersedia || 0);
-    elements.stockLow.textContent = formatNumber(data.menipis || 0);
-    elements.stockOut.textContent = formatNumber(data.habis || 0);
+// Update stock status cards
+function renderStockCards(data) {
+  elements.stockAvailable.textContent = formatNumber(data.tersedia || 0);
+  elements.stockLow.textContent = formatNumber(data.menipis || 0);
+  elements.stockOut.textContent = formatNumber(data.habis || 0);
 
-    return data;
-  } catch (error) {
-    showNotification("Gagal memuat status stok.", "error");
-    return { tersedia: 0, menipis: 0, habis: 0 };
-  }
+  return data;
 }
 
 // Update stock progress bar
@@ -196,14 +197,9 @@ function updateStockProgress(stockData) {
   }
 }
 
-// Load supplier table
-async function loadSupplierTable(storeId = "all") {
+// Render supplier table
+function renderSupplierTable(data) {
   try {
-    const response = await fetch(
-      `/api/analytics/supplier_summary?store_id=${storeId}`
-    );
-    const data = await response.json();
-
     let tableHTML = "";
     if (data.length === 0) {
       tableHTML = `
@@ -244,14 +240,9 @@ async function loadSupplierTable(storeId = "all") {
   }
 }
 
-// Load recent sales
-async function loadRecentSales(storeId = "all") {
+// Render recent sales
+function renderRecentSales(data) {
   try {
-    const response = await fetch(
-      `/api/analytics/recent_sales?store_id=${storeId}`
-    );
-    const data = await response.json();
-
     let tableHTML = "";
     if (data.length === 0) {
       tableHTML = `
@@ -301,14 +292,9 @@ async function loadRecentSales(storeId = "all") {
   }
 }
 
-// Load category pie chart
-async function loadCategoryPie(storeId = "all") {
+// Render category pie chart
+function renderCategoryPie(data) {
   try {
-    const response = await fetch(
-      `/api/analytics/category_pie?store_id=${storeId}`
-    );
-    const data = await response.json();
-
     // Destroy existing chart if it exists
     if (categoryChartInstance) {
       categoryChartInstance.destroy();
@@ -373,8 +359,14 @@ async function showStockAlert() {
   const storeId = elements.storeFilter.value;
 
   try {
-    const response = await fetch(`/api/products/alert?store_id=${storeId}`);
-    const data = await response.json();
+    // Use alert data from the last dashboard load when it matches the store
+    let data;
+    if (lastDashboard && lastDashboard.store_id === storeId) {
+      data = lastDashboard.alert;
+    } else {
+      const response = await fetch(`/api/products/alert?store_id=${storeId}`);
+      data = await response.json();
+    }
 
     if (!data || data.length === 0) {
       elements.stockAlertBody.innerHTML = `
@@ -428,6 +420,97 @@ async function showStockAlert() {
   }
 }
 
+// =====================================================
+// Live dashboard (Server-Sent Events)
+// =====================================================
+let dashboardStream = null;
+
+function connectDashboardStream(storeId = "all") {
+  if (dashboardStream) dashboardStream.close();
+  dashboardStream = new EventSource(
+    `/api/analytics/stream?store_id=${storeId}`
+  );
+
+  const parse = (handler) => (event) => {
+    if (!lastDashboard) return;
+    handler(JSON.parse(event.data));
+    updateSnapshotAge(0);
+  };
+
+  dashboardStream.addEventListener(
+    "snapshot",
+    parse((data) => {
+      Object.assign(lastDashboard, data);
+      renderSummary(lastDashboard.summary || {});
+      updateStockProgress(renderStockCards(lastDashboard.stock_status || {}));
+      renderCategoryPie(lastDashboard.category_pie || []);
+      renderSupplierTable(lastDashboard.supplier_summary || []);
+      renderRecentSales(lastDashboard.recent_sales || []);
+    })
+  );
+
+  dashboardStream.addEventListener(
+    "summary",
+    parse((changed) => {
+      Object.assign(lastDashboard.summary, changed);
+      renderSummary(lastDashboard.summary);
+    })
+  );
+
+  dashboardStream.addEventListener(
+    "stock_status",
+    parse((changed) => {
+      Object.assign(lastDashboard.stock_status, changed);
+      updateStockProgress(renderStockCards(lastDashboard.stock_status));
+    })
+  );
+
+  dashboardStream.addEventListener(
+    "recent_sales",
+    parse((newSales) => {
+      lastDashboard.recent_sales = newSales
+        .concat(lastDashboard.recent_sales || [])
+        .slice(0, 10);
+      renderRecentSales(lastDashboard.recent_sales);
+    })
+  );
+
+  dashboardStream.addEventListener(
+    "alert",
+    parse((delta) => {
+      const updated = {};
+      delta.changed.concat(delta.entered).forEach((p) => (updated[p._id] = p));
+
+      lastDashboard.alert = (lastDashboard.alert || [])
+        .filter((p) => !delta.left.includes(p._id) && !updated[p._id])
+        .concat(Object.values(updated));
+
+      if (delta.entered.length > 0) {
+        showNotification(
+          `${delta.entered.length} produk stoknya menipis / habis.`,
+          "warning"
+        );
+      }
+    })
+  );
+
+  dashboardStream.addEventListener(
+    "category_pie",
+    parse((data) => {
+      lastDashboard.category_pie = data;
+      renderCategoryPie(data);
+    })
+  );
+
+  dashboardStream.addEventListener(
+    "supplier_summary",
+    parse((data) => {
+      lastDashboard.supplier_summary = data;
+      renderSupplierTable(data);
+    })
+  );
+}
+
 // Go to restock page
 function goToRestock() {
   showNotification("Mengarahkan ke halaman restock...", "info");
@@ -439,11 +522,12 @@ function goToRestock() {
 // Initialize
 document.addEventListener("DOMContentLoaded", function () {
   // Load initial data
-  loadStoreOptions();
+  loadDashboardAll("all");
 
   // Setup store filter
   elements.storeFilter.addEventListener("change", function () {
     loadDashboardAll(this.value);
+    if (dashboardStream) connectDashboardStream(this.value);
   });
 
   // Setup stock alert modal
@@ -469,9 +553,13 @@ document.addEventListener("DOMContentLoaded", function () {
     }
   });
 
-  // Auto-refresh dashboard every 5 minutes
-  setInterval(() => {
-    const storeId = elements.storeFilter.value;
-    loadDashboardAll(storeId);
-  }, 300000); // 5 minutes
+  // Live updates via Server-Sent Events, fallback to polling every 5 minutes
+  if (window.EventSource) {
+    connectDashboardStream("all");
+  } else {
+    setInterval(() => {
+      const storeId = elements.storeFilter.value;
+      loadDashboardAll(storeId);
+    }, 300000); // 5 minutes
+  }
 });
@@ -33,6 +33,11 @@ const elements = {
   lowStock: document.getElementById("lowStock"),
   outOfStock: document.getElementById("outOfStock"),
   tableCount: document.getElementById("tableCount"),
+
+  // Pagination
+  prevPageBtn: document.getElementById("prevPageBtn"),
+  nextPageBtn: document.getElementById("nextPageBtn"),
+  pageInfo: document.getElementById("pageInfo"),
 };
 
 // User role from template
@@ -40,6 +45,18 @@ const userRole = "{{ role }}".toUpperCase() || "ADMIN";
 let deleteProductId = null;
 let allProducts = [];
 
+// Server-side paging (keyset cursor dari /api/products)
+const PAGE_SIZE = 50;
+const PRODUCT_FIELDS =
+  "name,category,stock,min_stock,purchase_price,sale_price,store_id,store_name,supplier,updated_at";
+let pageCursors = [null]; // cursor awal tiap halaman yang sudah dikunjungi
+let pageIndex = 0;
+let nextCursor = null;
+
+// Pencarian nama produk di server (awalan, lewat index name_key)
+const SEARCH_DELAY_MS = 300;
+let searchTimer = null;
+
 // Show notification
 function showNotification(message, type = "success") {
   const colors = {
@@ -92,22 +109,29 @@ function getRowClass(stock, minStock) {
   return "";
 }
 
-// Update summary statistics
-function updateSummaryStats(products) {
-  const total = products.length;
-  const available = products.filter(
-    (p) => p.stock > (p.min_stock || 0) + 5
-  ).length;
-  const low = products.filter(
-    (p) => p.stock > 0 && p.stock <= (p.min_stock || 0) + 5
-  ).length;
-  const out = products.filter((p) => p.stock === 0).length;
-
-  elements.totalProducts.textContent = total;
-  elements.availableStock.textContent = available;
-  elements.lowStock.textContent = low;
-  elements.outOfStock.textContent = out;
-  elements.tableCount.textContent = total;
+// Update summary statistics (dihitung server untuk seluruh produk, bukan per halaman)
+async function updateSummaryStats(selectedStore = "all") {
+  try {
+    const response = await fetch(
+      `/api/analytics/stock_status?store_id=${encodeURIComponent(selectedStore)}`
+    );
+    const stats = await response.json();
+
+    elements.totalProducts.textContent = stats.total ?? 0;
+    elements.availableStock.textContent = stats.tersedia ?? 0;
+    elements.lowStock.textContent = stats.menipis ?? 0;
+    elements.outOfStock.textContent = stats.habis ?? 0;
+  } catch (error) {
+    showNotification("Gagal memuat ringkasan stok.", "error");
+  }
+}
+
+// Update pagination controls
+function updatePager(count) {
+  elements.tableCount.textContent = count;
+  elements.pageInfo.textContent = `Halaman ${pageIndex + 1}`;
+  elements.prevPageBtn.disabled = pageIndex === 0;
+  elements.nextPageBtn.disabled = !nextCursor;
 }
 
 // Load store options
@@ -127,8 +151,14 @@ async function loadStoreOptions() {
   }
 }
 
-// Load products
-async function loadProducts(selectedStore = "all") {
+// Load products (satu halaman dari server)
+async function loadProducts(selectedStore = "all", page = 0) {
+  if (page === 0) {
+    pageCursors = [null];
+    updateSummaryStats(selectedStore);
+  }
+  pageIndex = page;
+
   try {
     elements.productTableBody.innerHTML = `
                     <tr>
@@ -139,26 +169,31 @@ async function loadProducts(selectedStore = "all") {
                     </tr>
                 `;
 
-    const response = await fetch("/api/products");
+    const params = new URLSearchParams({
+      limit: PAGE_SIZE,
+      fields: PRODUCT_FIELDS,
+    });
+    if (selectedStore && selectedStore !== "all") {
+      params.set("store_id", selectedStore);
+    }
+    const searchTerm = elements.searchBox.value.trim();
+    if (searchTerm) {
+      params.set("name", searchTerm);
+    }
+    if (pageCursors[page]) {
+      params.set("cursor", pageCursors[page]);
+    }
+
+    const response = await fetch(`/api/products?${params}`);
     const result = await response.json();
 
     if (result.status) {
-      let data = result.data || [];
-
-      // Store all products for filtering
+      const data = result.data || [];
       allProducts = data;
 
-      // Filter by store if selected
-      if (selectedStore && selectedStore !== "all") {
-        data = data.filter(
-          (item) =>
-            item.store_id === selectedStore ||
-            (item.store_name &&
-              item.store_name
-                .toLowerCase()
-                .includes(selectedStore.toLowerCase()))
-        );
-      }
+      nextCursor = result.meta?.next || null;
+      pageCursors[page + 1] = nextCursor;
+      updatePager(data.length);
 
       if (data.length === 0) {
         elements.productTableBody.innerHTML = `
@@ -169,13 +204,9 @@ async function loadProducts(selectedStore = "all") {
                                 </td>
                             </tr>
                         `;
-        updateSummaryStats([]);
         return;
       }
 
-      // Update summary statistics
-      updateSummaryStats(data);
-
       // Build table rows
       let tableHTML = "";
       data.forEach((item) => {
@@ -351,9 +382,10 @@ async function updateProduct() {
       // Clear form
       clearForm();
 
-      // Reload products
+      // Reload halaman aktif dan ringkasan
       const selectedStore = elements.storeFilter.value;
-      await loadProducts(selectedStore);
+      updateSummaryStats(selectedStore);
+      await loadProducts(selectedStore, pageIndex);
 
       // Update the specific row in table
       const tableRows = elements.productTableBody.querySelectorAll("tr");
@@ -423,9 +455,10 @@ async function deleteProduct(id) {
       // Remove from allProducts array
       allProducts = allProducts.filter((p) => p._id !== id);
 
-      // Reload products
+      // Reload halaman aktif dan ringkasan
       const selectedStore = elements.storeFilter.value;
-      await loadProducts(selectedStore);
+      updateSummaryStats(selectedStore);
+      await loadProducts(selectedStore, pageIndex);
     } else {
       showNotification(
         result.message || result.error || "Gagal menghapus produk.",
@@ -531,26 +564,25 @@ document.addEventListener("DOMContentLoaded", function () {
     loadProducts(this.value);
   });
 
-  // Setup search
-  elements.searchBox.addEventListener("input", function () {
-    const searchTerm = this.value.toLowerCase().trim();
-    const rows = elements.productTableBody.querySelectorAll("tr");
-    let visibleCount = 0;
-
-    rows.forEach((row) => {
-      if (row.querySelector("td")) {
-        // Skip loading row
-        const text = row.textContent.toLowerCase();
-        if (searchTerm === "" || text.includes(searchTerm)) {
-          row.style.display = "";
-          visibleCount++;
-        } else {
-          row.style.display = "none";
-        }
-      }
-    });
+  // Setup pagination
+  elements.prevPageBtn.addEventListener("click", function () {
+    if (pageIndex > 0) {
+      loadProducts(elements.storeFilter.value, pageIndex - 1);
+    }
+  });
 
-    elements.tableCount.textContent = visibleCount;
+  elements.nextPageBtn.addEventListener("click", function () {
+    if (nextCursor) {
+      loadProducts(elements.storeFilter.value, pageIndex + 1);
+    }
+  });
+
+  // Setup search (server, debounce); kembali ke halaman pertama
+  elements.searchBox.addEventListener("input", function () {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(() => {
+      loadProducts(elements.storeFilter.value);
+    }, SEARCH_DELAY_MS);
   });
 
   // Setup form button
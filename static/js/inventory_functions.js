@@ -21,8 +21,25 @@ const elements = {
   detailContent: document.getElementById("detailContent"),
   logoutBtn: document.getElementById("logoutBtn"),
   formMessage: document.getElementById("formMessage"),
+
+  // Filter tanggal & pagination
+  dateFrom: document.getElementById("dateFrom"),
+  dateTo: document.getElementById("dateTo"),
+  prevPageBtn: document.getElementById("prevPageBtn"),
+  nextPageBtn: document.getElementById("nextPageBtn"),
+  pageInfo: document.getElementById("pageInfo"),
 };
 
+// Server-side paging (keyset cursor dari /api/product_masuk)
+const PAGE_SIZE = 50;
+let pageCursors = [null]; // cursor awal tiap halaman yang sudah dikunjungi
+let pageIndex = 0;
+let nextCursor = null;
+
+// Pencarian nama produk di server (awalan, lewat index name_key)
+const SEARCH_DELAY_MS = 300;
+let searchTimer = null;
+
 // User role simulation (replace with actual role from backend)
 const userRole = "{{ role }}".toUpperCase() || "ADMIN";
 
@@ -79,8 +96,18 @@ async function loadStoreOptions() {
   }
 }
 
-// Load products
-async function loadProducts(selectedStore = "all") {
+// Update pagination controls
+function updatePager() {
+  elements.pageInfo.textContent = `Halaman ${pageIndex + 1}`;
+  elements.prevPageBtn.disabled = pageIndex === 0;
+  elements.nextPageBtn.disabled = !nextCursor;
+}
+
+// Load products (satu halaman riwayat barang masuk dari server)
+async function loadProducts(selectedStore = "all", page = 0) {
+  if (page === 0) pageCursors = [null];
+  pageIndex = page;
+
   try {
     elements.productTableBody.innerHTML = `
                     <tr>
@@ -91,20 +118,29 @@ async function loadProducts(selectedStore = "all") {
                     </tr>
                 `;
 
-    const response = await fetch("/api/product_masuk");
+    const params = new URLSearchParams({ limit: PAGE_SIZE });
+    if (selectedStore && selectedStore !== "all") {
+      params.set("store_id", selectedStore);
+    }
+    if (elements.dateFrom.value) params.set("from", elements.dateFrom.value);
+    if (elements.dateTo.value) params.set("to", elements.dateTo.value);
+    const searchTerm = elements.searchBox.value.trim();
+    if (searchTerm) params.set("name", searchTerm);
+    if (pageCursors[page]) params.set("cursor", pageCursors[page]);
+
+    const response = await fetch(`/api/product_masuk?${params}`);
     const result = await response.json();
-    const data = Array.isArray(result) ? result : result.data || [];
 
-    let filtered = data;
-    if (selectedStore && selectedStore !== "all") {
-      filtered = data.filter(
-        (item) =>
-          item.store_id === selectedStore ||
-          (item.store_name &&
-            item.store_name.toLowerCase().includes(selectedStore.toLowerCase()))
-      );
+    if (result.status === false) {
+      showNotification(result.message || "Gagal memuat data produk.", "error");
+      return;
     }
 
+    const filtered = Array.isArray(result) ? result : result.data || [];
+    nextCursor = result.meta?.next || null;
+    pageCursors[page + 1] = nextCursor;
+    updatePager();
+
     if (filtered.length === 0) {
       elements.productTableBody.innerHTML = `
                         <tr>
@@ -523,14 +559,31 @@ document.addEventListener("DOMContentLoaded", function () {
   });
 
   // Setup search
-  elements.searchBox.addEventListener("input", function () {
-    const searchTerm = this.value.toLowerCase();
-    const rows = elements.productTableBody.querySelectorAll("tr");
+  // Setup filter tanggal & pagination
+  [elements.dateFrom, elements.dateTo].forEach((input) =>
+    input.addEventListener("change", function () {
+      loadProducts(elements.storeFilter.value);
+    })
+  );
 
-    rows.forEach((row) => {
-      const text = row.textContent.toLowerCase();
-      row.style.display = text.includes(searchTerm) ? "" : "none";
-    });
+  elements.prevPageBtn.addEventListener("click", function () {
+    if (pageIndex > 0) {
+      loadProducts(elements.storeFilter.value, pageIndex - 1);
+    }
+  });
+
+  elements.nextPageBtn.addEventListener("click", function () {
+    if (nextCursor) {
+      loadProducts(elements.storeFilter.value, pageIndex + 1);
+    }
+  });
+
+  // Cari di server (debounce); kembali ke halaman pertama
+  elements.searchBox.addEventListener("input", function () {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(() => {
+      loadProducts(elements.storeFilter.value);
+    }, SEARCH_DELAY_MS);
   });
 
   // Setup product selection
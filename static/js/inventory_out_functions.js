@@ -26,12 +26,30 @@ const elements = {
   formMessage: document.getElementById("formMessage"),
   selectedProductName: document.getElementById("selectedProductName"),
   selectedProductStock: document.getElementById("selectedProductStock"),
+
+  // Filter tipe/tanggal & pagination
+  typeFilter: document.getElementById("typeFilter"),
+  dateFrom: document.getElementById("dateFrom"),
+  dateTo: document.getElementById("dateTo"),
+  prevPageBtn: document.getElementById("prevPageBtn"),
+  nextPageBtn: document.getElementById("nextPageBtn"),
+  pageInfo: document.getElementById("pageInfo"),
 };
 
 // User role from template
 const userRole = "{{ role }}".toUpperCase() || "ADMIN";
 let deleteItemId = null;
 
+// Server-side paging (keyset cursor dari /api/products_keluar)
+const PAGE_SIZE = 50;
+let pageCursors = [null]; // cursor awal tiap halaman yang sudah dikunjungi
+let pageIndex = 0;
+let nextCursor = null;
+
+// Pencarian nama produk di server (awalan, lewat index name_key)
+const SEARCH_DELAY_MS = 300;
+let searchTimer = null;
+
 // Show notification
 function showNotification(message, type = "success") {
   const colors = {
@@ -56,6 +74,11 @@ function showNotification(message, type = "success") {
   }, 5000);
 }
 
+// Label tipe seperti di form ("penjualan" → "Penjualan")
+function formatTypeLabel(type) {
+  return type ? type.charAt(0).toUpperCase() + type.slice(1).toLowerCase() : "";
+}
+
 // Format transaction type badge
 function getTypeBadge(type) {
   const badges = {
@@ -65,7 +88,7 @@ function getTypeBadge(type) {
     Rusak: "badge-damaged",
     Expired: "badge-expired",
   };
-  return badges[type] || "badge-internal";
+  return badges[formatTypeLabel(type)] || "badge-internal";
 }
 
 // Load store options
@@ -89,8 +112,18 @@ async function loadStoreOptions() {
   }
 }
 
-// Load products (outgoing transactions)
-async function loadProducts(selectedStore = "all") {
+// Update pagination controls
+function updatePager() {
+  elements.pageInfo.textContent = `Halaman ${pageIndex + 1}`;
+  elements.prevPageBtn.disabled = pageIndex === 0;
+  elements.nextPageBtn.disabled = !nextCursor;
+}
+
+// Load products (outgoing transactions, satu halaman dari server)
+async function loadProducts(selectedStore = "all", page = 0) {
+  if (page === 0) pageCursors = [null];
+  pageIndex = page;
+
   try {
     elements.productTableBody.innerHTML = `
                     <tr>
@@ -101,20 +134,30 @@ async function loadProducts(selectedStore = "all") {
                     </tr>
                 `;
 
-    const response = await fetch("/api/products_keluar");
+    const params = new URLSearchParams({ limit: PAGE_SIZE });
+    if (selectedStore && selectedStore !== "all") {
+      params.set("store_id", selectedStore);
+    }
+    if (elements.typeFilter.value) params.set("type", elements.typeFilter.value);
+    if (elements.dateFrom.value) params.set("from", elements.dateFrom.value);
+    if (elements.dateTo.value) params.set("to", elements.dateTo.value);
+    const searchTerm = elements.searchBox.value.trim();
+    if (searchTerm) params.set("name", searchTerm);
+    if (pageCursors[page]) params.set("cursor", pageCursors[page]);
+
+    const response = await fetch(`/api/products_keluar?${params}`);
     const result = await response.json();
-    const data = Array.isArray(result) ? result : result.data || [];
 
-    let filtered = data;
-    if (selectedStore && selectedStore !== "all") {
-      filtered = data.filter(
-        (item) =>
-          item.store_id === selectedStore ||
-          (item.store_name &&
-            item.store_name.toLowerCase().includes(selectedStore.toLowerCase()))
-      );
+    if (result.status === false) {
+      showNotification(result.message || "Gagal memuat data barang keluar.", "error");
+      return;
     }
 
+    const filtered = Array.isArray(result) ? result : result.data || [];
+    nextCursor = result.meta?.next || null;
+    pageCursors[page + 1] = nextCursor;
+    updatePager();
+
     if (filtered.length === 0) {
       elements.productTableBody.innerHTML = `
                         <tr>
@@ -502,7 +545,7 @@ async function editProduct(id) {
     elements.comboProduk.value = item.product_sku || "";
     elements.fieldNamaProduk.value = item.name || "";
     elements.jumlah.value = item.jumlah || "";
-    elements.typeField.value = item.type || "";
+    elements.typeField.value = formatTypeLabel(item.type);
 
     // Build dynamic fields
     buildExtraFields(item.type);
@@ -719,15 +762,31 @@ document.addEventListener("DOMContentLoaded", function () {
     loadProductOptions(this.value);
   });
 
-  // Setup search
-  elements.searchBox.addEventListener("input", function () {
-    const searchTerm = this.value.toLowerCase();
-    const rows = elements.productTableBody.querySelectorAll("tr");
+  // Setup filter tipe/tanggal & pagination
+  [elements.typeFilter, elements.dateFrom, elements.dateTo].forEach((input) =>
+    input.addEventListener("change", function () {
+      loadProducts(elements.storeFilter.value);
+    })
+  );
 
-    rows.forEach((row) => {
-      const text = row.textContent.toLowerCase();
-      row.style.display = text.includes(searchTerm) ? "" : "none";
-    });
+  elements.prevPageBtn.addEventListener("click", function () {
+    if (pageIndex > 0) {
+      loadProducts(elements.storeFilter.value, pageIndex - 1);
+    }
+  });
+
+  elements.nextPageBtn.addEventListener("click", function () {
+    if (nextCursor) {
+      loadProducts(elements.storeFilter.value, pageIndex + 1);
+    }
+  });
+
+  // Setup search (server, debounce); kembali ke halaman pertama
+  elements.searchBox.addEventListener("input", function () {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(() => {
+      loadProducts(elements.storeFilter.value);
+    }, SEARCH_DELAY_MS);
   });
 
   // Setup store selection in form
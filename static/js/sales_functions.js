@@ -29,6 +29,12 @@ const elements = {
     "closeTransactionsModalBtn"
   ),
   transactionsBody: document.getElementById("transactionsBody"),
+  salesDateFrom: document.getElementById("salesDateFrom"),
+  salesDateTo: document.getElementById("salesDateTo"),
+  salesTotals: document.getElementById("salesTotals"),
+  salesPrevPageBtn: document.getElementById("salesPrevPageBtn"),
+  salesNextPageBtn: document.getElementById("salesNextPageBtn"),
+  salesPageInfo: document.getElementById("salesPageInfo"),
 
   deleteModal: document.getElementById("deleteModal"),
   confirmDeleteBtn: document.getElementById("confirmDeleteBtn"),
@@ -48,6 +54,18 @@ let cart = [];
 let allProducts = [];
 let deleteTransactionId = null;
 
+// Delta sync katalog (cursor dari /api/products/changes)
+const PRODUCT_SYNC_INTERVAL_MS = 30000;
+let syncCursor = null;
+let syncStoreId = "all";
+let syncInProgress = false;
+
+// Paging riwayat transaksi (keyset cursor dari /api/sales)
+const SALES_PAGE_SIZE = 50;
+let salesCursors = [null];
+let salesPageIndex = 0;
+let salesNextCursor = null;
+
 // Format Rupiah
 function formatRupiah(value) {
   if (!value && value !== 0) return "Rp 0";
@@ -115,31 +133,59 @@ async function loadStoreOptions() {
   }
 }
 
+// Field katalog POS (dipakai /api/products dan /api/products/changes)
+const POS_PRODUCT_FIELDS = "name,sale_price,stock,category,store_id,store_name";
+
+function toPosProduct(p) {
+  return {
+    _id: p._id,
+    name: p.name,
+    sale_price: Number(p.sale_price) || 0,
+    stock: Number(p.stock) || 0,
+    category: p.category || "-",
+    store_id: p.store_id || null,
+    store_name: p.store_name || "-",
+  };
+}
+
 // Load products
 async function loadProducts(storeId = "all") {
   try {
-    let url = "/api/products";
-    if (storeId !== "all") url += `?store_id=${storeId}`;
+    // Cursor delta sync diambil SEBELUM katalog penuh agar tidak ada
+    // perubahan yang terlewat di antara keduanya
+    syncStoreId = storeId;
+    syncCursor = null;
+    const start = await fetch("/api/products/changes");
+    const startResult = await start.json();
+    const startCursor = startResult?.meta?.next || null;
+
+    // Katalog POS diambil per halaman (cursor) hanya dengan field yang dipakai
+    const params = new URLSearchParams({
+      limit: 500,
+      fields: POS_PRODUCT_FIELDS,
+    });
+    if (storeId !== "all") params.set("store_id", storeId);
 
-    const response = await fetch(url);
-    const result = await response.json();
+    let products = [];
+    let cursor = null;
+    do {
+      if (cursor) params.set("cursor", cursor);
+      const response = await fetch(`/api/products?${params}`);
+      const result = await response.json();
 
-    if (!result || !result.status) {
-      showNotification(result?.message || "Gagal memuat produk.", "error");
-      return;
-    }
+      if (!result || !result.status) {
+        showNotification(result?.message || "Gagal memuat produk.", "error");
+        return;
+      }
+
+      products = products.concat(result.data || []);
+      cursor = result.meta?.next || null;
+    } while (cursor);
 
-    allProducts = (result.data || [])
+    allProducts = products
       .filter((p) => parseFloat(p.sale_price) > 0)
-      .map((p) => ({
-        _id: p._id,
-        name: p.name,
-        sale_price: Number(p.sale_price) || 0,
-        stock: Number(p.stock) || 0,
-        category: p.category || "-",
-        store_id: p.store_id || null,
-        store_name: p.store_name || "-",
-      }));
+      .map(toPosProduct);
+    syncCursor = startCursor;
 
     filterProducts();
   } catch (error) {
@@ -147,6 +193,55 @@ async function loadProducts(storeId = "all") {
   }
 }
 
+// Terapkan perubahan produk sejak sync terakhir (tanpa memuat ulang katalog)
+async function syncProducts() {
+  if (!syncCursor || syncInProgress) return;
+  syncInProgress = true;
+  try {
+    let hasMore = true;
+    let touched = false;
+    while (hasMore) {
+      const params = new URLSearchParams({
+        since: syncCursor,
+        limit: 500,
+        fields: POS_PRODUCT_FIELDS,
+      });
+      if (syncStoreId !== "all") params.set("store_id", syncStoreId);
+
+      const response = await fetch(`/api/products/changes?${params}`);
+      const result = await response.json();
+      if (!result || !result.status) return;
+
+      if (result.meta?.reset) {
+        // Cursor terlalu lama: muat ulang katalog penuh
+        syncInProgress = false;
+        await loadProducts(syncStoreId);
+        return;
+      }
+
+      const { changed = [], deleted = [] } = result.data || {};
+      if (deleted.length || changed.length) {
+        const byId = new Map(allProducts.map((p) => [p._id, p]));
+        deleted.forEach((sku) => byId.delete(sku));
+        changed.forEach((p) => {
+          if (parseFloat(p.sale_price) > 0) byId.set(p._id, toPosProduct(p));
+          else byId.delete(p._id);
+        });
+        allProducts = Array.from(byId.values());
+        touched = true;
+      }
+
+      syncCursor = result.meta?.next || syncCursor;
+      hasMore = Boolean(result.meta?.has_more);
+    }
+    if (touched) filterProducts();
+  } catch (error) {
+    // Sync berikutnya akan mencoba lagi dari cursor yang sama
+  } finally {
+    syncInProgress = false;
+  }
+}
+
 // Filter products
 function filterProducts() {
   const searchTerm = elements.searchBox.value.toLowerCase().trim();
@@ -442,9 +537,8 @@ async function checkout() {
       updateCartDisplay();
       elements.customerName.value = "";
 
-      // Reload products to update stock
-      const storeId = elements.storeFilter.value;
-      loadProducts(storeId);
+      // Ambil perubahan stok (delta) tanpa memuat ulang katalog
+      syncProducts();
     } else {
       showNotification(result.message || "Gagal menyimpan transaksi.", "error");
     }
@@ -453,10 +547,50 @@ async function checkout() {
   }
 }
 
-// Load recent transactions
-async function loadRecentTransactions() {
+// Filter riwayat transaksi (toko aktif + rentang tanggal)
+function salesFilterParams() {
+  const params = new URLSearchParams();
+  const storeId = elements.storeFilter.value;
+  if (storeId && storeId !== "all") params.set("store_id", storeId);
+  if (elements.salesDateFrom.value) params.set("from", elements.salesDateFrom.value);
+  if (elements.salesDateTo.value) params.set("to", elements.salesDateTo.value);
+  return params;
+}
+
+// Load totals for the current page (same cursor & limit as the table)
+async function loadSalesTotals(page = 0) {
+  try {
+    const params = salesFilterParams();
+    params.set("mode", "totals");
+    params.set("limit", SALES_PAGE_SIZE);
+    if (salesCursors[page]) params.set("cursor", salesCursors[page]);
+    const response = await fetch(`/api/sales?${params}`);
+    const result = await response.json();
+    if (!result || !result.status) return;
+
+    const totals = result.data || {};
+    elements.salesTotals.textContent = `Halaman ini: ${formatNumber(
+      totals.count || 0
+    )} transaksi · ${formatNumber(totals.quantity || 0)} unit · ${formatRupiah(
+      totals.revenue || 0
+    )}`;
+  } catch (error) {
+    elements.salesTotals.textContent = "";
+  }
+}
+
+// Load recent transactions (satu halaman dari server)
+async function loadRecentTransactions(page = 0) {
+  if (page === 0) salesCursors = [null];
+  salesPageIndex = page;
+  loadSalesTotals(page);
+
   try {
-    const response = await fetch("/api/sales");
+    const params = salesFilterParams();
+    params.set("limit", SALES_PAGE_SIZE);
+    if (salesCursors[page]) params.set("cursor", salesCursors[page]);
+
+    const response = await fetch(`/api/sales?${params}`);
     const result = await response.json();
 
     if (!result || !result.status) {
@@ -472,6 +606,11 @@ async function loadRecentTransactions() {
     }
 
     const transactions = result.data || [];
+    salesNextCursor = result.meta?.next || null;
+    salesCursors[page + 1] = salesNextCursor;
+    elements.salesPageInfo.textContent = `Halaman ${page + 1}`;
+    elements.salesPrevPageBtn.disabled = page === 0;
+    elements.salesNextPageBtn.disabled = !salesNextCursor;
 
     if (transactions.length === 0) {
       elements.transactionsBody.innerHTML = `
@@ -492,7 +631,7 @@ async function loadRecentTransactions() {
       tableHTML += `
                         <tr class="hover:bg-gray-50">
                             <td class="px-4 py-3 whitespace-nowrap text-sm text-gray-900">${
-                              index + 1
+                              salesPageIndex * SALES_PAGE_SIZE + index + 1
                             }</td>
                             <td class="px-4 py-3 whitespace-nowrap text-sm text-gray-900 font-mono">${
                               transaction.product_id || "-"
@@ -576,9 +715,8 @@ async function deleteTransaction(id) {
       // Reload transactions
       await loadRecentTransactions();
 
-      // Reload products to update stock
-      const storeId = elements.storeFilter.value;
-      loadProducts(storeId);
+      // Ambil perubahan stok (delta) tanpa memuat ulang katalog
+      syncProducts();
     } else {
       showNotification(result.message || "Gagal menghapus transaksi.", "error");
     }
@@ -625,6 +763,21 @@ document.addEventListener("DOMContentLoaded", function () {
     }
   });
 
+  // Riwayat transaksi: filter tanggal & pagination
+  [elements.salesDateFrom, elements.salesDateTo].forEach((input) =>
+    input.addEventListener("change", function () {
+      loadRecentTransactions();
+    })
+  );
+
+  elements.salesPrevPageBtn.addEventListener("click", function () {
+    if (salesPageIndex > 0) loadRecentTransactions(salesPageIndex - 1);
+  });
+
+  elements.salesNextPageBtn.addEventListener("click", function () {
+    if (salesNextCursor) loadRecentTransactions(salesPageIndex + 1);
+  });
+
   // Delete modal events
   elements.confirmDeleteBtn.addEventListener("click", function () {
     if (deleteTransactionId) {
@@ -664,6 +817,9 @@ document.addEventListener("DOMContentLoaded", function () {
     }
   });
 
+  // Sinkronkan stok katalog secara berkala
+  setInterval(syncProducts, PRODUCT_SYNC_INTERVAL_MS);
+
   // Auto-focus customer name field when cart has items
   setInterval(() => {
     if (cart.length > 0 && !elements.customerName.value.trim()) {